@@ -0,0 +1,214 @@
+"""
+Échantillonnage adaptatif des compositions.
+
+Pour chaque bucket de paramètres (fenêtres d'évaluation, matériel, pièces
+exclues), on compte combien de candidats de chaque composition ont été
+soumis au moteur et combien ont été acceptés. Ces statistiques sont
+conservées dans un fichier JSON ; les générations suivantes s'en servent
+pour tirer plus souvent les compositions productives.
+
+Les taux par composition sont lissés vers le taux du bucket (les
+compositions peu vues restent proches de la moyenne) et une part
+'exploration' du tirage garde les poids par défaut, pour que la couverture
+ne s'effondre pas sur quelques compositions.
+
+Rapport (appels moteur attendus par position acceptée, avant / après) :
+    python -m backend.adaptive_sampling backend/sampling_stats.json
+"""
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+
+import chess
+import numpy as np
+
+from backend.compositions import composition_table
+
+
+def sampling_bucket(windows, max_material, material_diff, excluded_pieces):
+    """
+    Clé (chaîne, pour le JSON) d'un bucket de paramètres de génération.
+
+    Args:
+        windows: (negative_min, negative_max, positive_min, positive_max)
+        max_material: Matériel maximum par côté
+        material_diff: Différence matérielle minimum
+        excluded_pieces: Liste des types de pièces exclus
+    """
+    excluded = '+'.join(sorted(excluded_pieces or [])) or '-'
+    return f"{','.join(str(w) for w in windows)}|{max_material}|{material_diff}|{excluded}"
+
+
+def composition_key(entry):
+    """Clé stable d'une composition : 'pièces fortes/pièces faibles' ('RBNPP/QPP')."""
+    strong, weak = entry[0], entry[1]
+    return '/'.join(''.join(chess.piece_symbol(pt).upper() for pt in sorted(side, reverse=True))
+                    for side in (strong, weak))
+
+
+class SamplingStats:
+    """Statistiques d'acceptation par bucket et par composition, persistées en JSON."""
+
+    def __init__(self, path=None, exploration=0.2, min_evaluations=200, prior_strength=20):
+        """
+        Args:
+            path: Fichier JSON (None = statistiques uniquement en mémoire)
+            exploration: Part du tirage gardée sur les poids par défaut (0-1)
+            min_evaluations: Évaluations moteur d'un bucket avant de biaiser le tirage
+            prior_strength: Poids (en évaluations) du taux du bucket dans le lissage
+        """
+        if not 0.0 <= exploration <= 1.0:
+            raise ValueError("exploration doit être entre 0 et 1")
+        self.path = Path(path) if path else None
+        self.exploration = exploration
+        self.min_evaluations = min_evaluations
+        self.prior_strength = prior_strength
+        self._lock = threading.Lock()
+        self._dirty = False
+        # {bucket: {composition: [évaluations, acceptations]}}
+        self._buckets = {}
+
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._buckets = json.load(f).get('buckets', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Statistiques d'échantillonnage illisibles ({self.path}): {e}")
+
+    def record(self, bucket, composition, accepted):
+        """Enregistre le verdict du moteur pour un candidat d'une composition."""
+        with self._lock:
+            counts = self._buckets.setdefault(bucket, {}).setdefault(composition, [0, 0])
+            counts[0] += 1
+            counts[1] += int(bool(accepted))
+            self._dirty = True
+
+    def save(self):
+        """Écrit les statistiques si elles ont changé (fichier temporaire puis renommage)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'buckets': self._buckets}, separators=(',', ':'))
+            self._dirty = False
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Impossible d'enregistrer les statistiques d'échantillonnage ({self.path}): {e}")
+
+    def _rates(self, bucket, table):
+        """
+        Taux d'acceptation lissés de chaque composition de la table.
+
+        Returns:
+            Tuple (taux par composition, évaluations du bucket) ou (None, évaluations)
+        """
+        with self._lock:
+            counts = dict(self._buckets.get(bucket, {}))
+        evaluations = sum(c[0] for c in counts.values())
+        accepted = sum(c[1] for c in counts.values())
+        if evaluations < self.min_evaluations or not accepted:
+            return None, evaluations
+
+        bucket_rate = accepted / evaluations
+        per_entry = np.array([counts.get(composition_key(entry), (0, 0)) for entry in table.entries],
+                             dtype=np.float64).reshape(-1, 2)
+        rates = (per_entry[:, 1] + self.prior_strength * bucket_rate) / (per_entry[:, 0] + self.prior_strength)
+        return rates, evaluations
+
+    def weights(self, bucket, table):
+        """
+        Poids de tirage adaptés pour une table de compositions.
+
+        Returns:
+            numpy.ndarray de poids (normalisés) ou None tant que le bucket n'a
+            pas assez d'évaluations
+        """
+        rates, _ = self._rates(bucket, table)
+        if rates is None:
+            return None
+        default = table.default_weights()
+        default = default / default.sum()
+        learned = default * rates
+        learned /= learned.sum()
+        return (1.0 - self.exploration) * learned + self.exploration * default
+
+    def report(self, bucket, table):
+        """
+        Appels moteur attendus par position acceptée, avec les poids par défaut
+        et avec les poids adaptés (estimés à partir des taux lissés).
+
+        Returns:
+            dict ou None si le bucket n'a pas assez d'évaluations
+        """
+        rates, evaluations = self._rates(bucket, table)
+        if rates is None:
+            return None
+        default = table.default_weights()
+        default = default / default.sum()
+        adapted = self.weights(bucket, table)
+        with self._lock:
+            accepted = sum(c[1] for c in self._buckets.get(bucket, {}).values())
+        return {
+            'engine_evaluations': evaluations,
+            'accepted': accepted,
+            'observed_calls_per_accept': round(evaluations / accepted, 1),
+            'expected_calls_per_accept_default': round(1.0 / float(default @ rates), 1),
+            'expected_calls_per_accept_adaptive': round(1.0 / float(adapted @ rates), 1),
+        }
+
+    def stats(self):
+        """Résumé par bucket (évaluations, acceptations, compositions vues)."""
+        with self._lock:
+            return {
+                'exploration': self.exploration,
+                'buckets': {
+                    bucket: {
+                        'engine_evaluations': sum(c[0] for c in counts.values()),
+                        'accepted': sum(c[1] for c in counts.values()),
+                        'compositions': len(counts),
+                    }
+                    for bucket, counts in self._buckets.items()
+                },
+            }
+
+    def buckets(self):
+        with self._lock:
+            return list(self._buckets)
+
+
+def _bucket_table(bucket):
+    """Table de compositions correspondant à une clé de bucket."""
+    _, max_material, material_diff, excluded = bucket.split('|')
+    excluded_pieces = [] if excluded == '-' else excluded.split('+')
+    return composition_table(int(max_material), int(material_diff), excluded_pieces)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Effet de l'échantillonnage adaptatif par bucket")
+    parser.add_argument('path', nargs='?', default=str(Path(__file__).parent / 'sampling_stats.json'),
+                        help="Fichier de statistiques")
+    parser.add_argument('--exploration', type=float, default=0.2)
+    parser.add_argument('--min-evaluations', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    stats = SamplingStats(args.path, exploration=args.exploration, min_evaluations=args.min_evaluations)
+    for bucket in stats.buckets():
+        report = stats.report(bucket, _bucket_table(bucket))
+        if report is None:
+            print(f"⏳ {bucket}: pas encore assez d'évaluations")
+            continue
+        print(f"📊 {bucket}: {report['accepted']} acceptées / {report['engine_evaluations']} évaluations | "
+              f"appels moteur par position : {report['expected_calls_per_accept_default']} (uniforme) → "
+              f"{report['expected_calls_per_accept_adaptive']} (adaptatif), "
+              f"{report['observed_calls_per_accept']} observés")
+
+
+if __name__ == '__main__':
+    main()
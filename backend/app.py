@@ -1,8 +1,11 @@
 from flask import Flask, request, jsonify, session, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import atexit
 import os
+import sys
 import json
+import multiprocessing
 import random
 from datetime import timedelta, datetime
 from pathlib import Path
@@ -12,8 +15,20 @@ import uuid
 # Importer les modules du backend
 from backend.db_models import db, init_db, create_tables
 from backend.auth import auth_bp
-from backend.chess_generator import generate_fen_position
-from backend.socket_manager import MatchmakingManager, games
+from backend.clock_scheduler import FLAG, IDLE, PENDING, clocks
+from backend.game_journal import journal
+from backend.persistence_queue import persistence_queue
+from backend.chess_generator import (engine_pool, engine_scheduler, eval_cache, get_cascade_stats,
+                                    generate_fen_position, get_static_filter_stats, known_positions,
+                                    sampling_stats, strategy_stats)
+from backend.generation_strategies import AUTO, get_strategy
+from backend.native_threads import run_in_native_thread
+from backend.position_dedup import dedupe_positions
+from backend.socket_manager import Game, MatchmakingManager, games
+from backend.position_reservoir import reservoir
+from backend.generation_jobs import job_manager
+from backend.position_index import PositionIndex, PIECE_BITS
+from backend.position_store import read_positions
 
 # Créer l'application Flask
 app = Flask(__name__)
@@ -76,34 +91,115 @@ socketio = SocketIO(
     manage_session=False
 )
 
-try:
-    with app.app_context():
-        create_tables(app)
-        print("✅ Tables créées avec succès!")
-except Exception as e:
-    print(f"⚠️ Avertissement lors de la création des tables: {e}")
-
-# Charger les positions depuis le fichier JSON
+# Charger les positions : format binaire (mmap, partagé entre workers) s'il
+# existe, sinon le fichier JSON
 POSITIONS_FILE = Path(__file__).parent / 'positions.json'
+POSITIONS_STORE_FILE = Path(os.environ.get('POSITIONS_STORE', Path(__file__).parent / 'positions.bin'))
 CACHED_POSITIONS = []
+POSITION_INDEX = PositionIndex([])
 
 def load_positions():
-    """Charge les positions depuis le fichier JSON"""
-    global CACHED_POSITIONS
+    """Charge les positions (binaire ou JSON) et construit leur index"""
+    global CACHED_POSITIONS, POSITION_INDEX
     try:
-        if POSITIONS_FILE.exists():
-            with open(POSITIONS_FILE, 'r', encoding='utf-8') as f:
-                CACHED_POSITIONS = json.load(f)
-                print(f"✅ {len(CACHED_POSITIONS)} positions chargées depuis positions.json")
+        if POSITIONS_STORE_FILE.exists():
+            CACHED_POSITIONS = read_positions(POSITIONS_STORE_FILE)
+            print(f"✅ {len(CACHED_POSITIONS)} positions chargées depuis {POSITIONS_STORE_FILE.name}")
+        elif POSITIONS_FILE.exists():
+            # Seuls les doublons exacts sont écartés (comme à la conversion en
+            # binaire) : les variantes symétriques sont gardées et l'index les
+            # tire une fois par forme canonique
+            CACHED_POSITIONS, duplicates = dedupe_positions(read_positions(POSITIONS_FILE), symmetric=False)
+            print(f"✅ {len(CACHED_POSITIONS)} positions chargées depuis positions.json "
+                  f"({duplicates} doublon(s) écarté(s))")
         else:
             print("⚠️ Fichier positions.json introuvable")
             CACHED_POSITIONS = []
     except Exception as e:
-        print(f"❌ Erreur chargement positions.json: {e}")
+        print(f"❌ Erreur chargement des positions: {e}")
         CACHED_POSITIONS = []
+    # Le générateur écarte les positions de la bibliothèque et leurs formes symétriques
+    if hasattr(CACHED_POSITIONS, 'columns'):
+        # Fichier binaire : hashs canoniques déjà calculés
+        known_positions.add_hashes(CACHED_POSITIONS.columns()['position_hash'])
+    else:
+        known_positions.add_many(position['fen'] for position in CACHED_POSITIONS)
+    POSITION_INDEX = PositionIndex(CACHED_POSITIONS)
+
+# Événement Socket.IO émis selon le statut d'une tâche de génération
+GENERATION_EVENTS = {
+    'done': 'generation_complete',
+    'failed': 'generation_failed',
+    'cancelled': 'generation_cancelled',
+    'expired': 'generation_failed',
+}
+
+def relay_generation_updates():
+    """
+    Relaie la progression des tâches de génération vers leurs rooms.
+    
+    Les tâches tournent dans des threads système : elles n'émettent jamais
+    elles-mêmes, cette tâche de fond Socket.IO publie leurs changements.
+    """
+    while True:
+        socketio.sleep(0.5)
+        try:
+            for snapshot in job_manager.drain_updates():
+                event = GENERATION_EVENTS.get(snapshot['status'], 'generation_progress')
+                socketio.emit(event, snapshot, to=f"generation:{snapshot['job_id']}")
+        except Exception as e:
+            print(f"❌ Erreur lors du relais de progression: {e}")
+
+def handle_flag_fall(game_id):
+    """Échéance de la pendule du camp au trait : fin de la partie au temps."""
+    game = games.get(game_id)
+    if game is None:
+        return
+    flagged = game.flag_result()
+    if flagged is None:
+        # Pendule pas tout à fait écoulée (ou un coup vient d'être joué) : reprogrammer
+        clocks.watch(game)
+        return
+    result, winner = flagged
+    with app.app_context():
+        if game.end(result):
+            print(f"⏱️ Partie {game_id}: drapeau tombé ({result})")
+            socketio.emit('game_over', {
+                'result': result,
+                'reason': 'timeout',
+                'winner': winner,
+                'white_time': max(0.0, game.time_left(chess.WHITE)),
+                'black_time': max(0.0, game.time_left(chess.BLACK))
+            }, to=game_id)
+        MatchmakingManager.remove_game(game_id)
+
+def reap_idle_game(game_id):
+    """Partie sans coup depuis GAME_IDLE_TIMEOUT : abandonnée et retirée de la mémoire."""
+    game = games.get(game_id)
+    if game is None:
+        return
+    with app.app_context():
+        if game.end('abandoned'):
+            print(f"🧹 Partie {game_id} abandonnée (inactivité)")
+            socketio.emit('game_over', {
+                'result': 'abandoned',
+                'reason': 'inactivity'
+            }, to=game_id)
+        MatchmakingManager.remove_game(game_id)
 
-# Charger les positions au démarrage
-load_positions()
+def expire_pending_game(game_id):
+    """Partie acceptée dont les joueurs ne se sont jamais connectés tous les deux."""
+    game_info = getattr(app, 'pending_games', {}).pop(game_id, None)
+    if game_info is None:
+        return
+    journal.pending_end(game_id)
+    print(f"🧹 Partie en attente expirée: {game_id}")
+    socketio.emit('game_over', {
+        'game_id': game_id,
+        'result': 'abandoned',
+        'reason': 'not_started'
+    }, to=game_id)
+    socketio.close_room(game_id)
 
 # ========================================
 # ROUTES POUR SERVIR LES FICHIERS FRONTEND
@@ -206,6 +302,19 @@ def health_check():
             'waiting_players': MatchmakingManager.get_waiting_players_count(),
             'async_mode': socketio.async_mode,
             'cached_positions': len(CACHED_POSITIONS),
+            'engine_pool': engine_pool.stats(),
+            'engine_scheduler': engine_scheduler.stats(),
+            'evaluation_cascade': get_cascade_stats(),
+            'static_prefilter': get_static_filter_stats(),
+            'adaptive_sampling': sampling_stats.stats(),
+            'generation_strategies': strategy_stats.stats(),
+            'evaluation_cache': eval_cache.stats(),
+            'known_positions': known_positions.stats(),
+            'reservoir': reservoir.stats(),
+            'generation_jobs': job_manager.stats(),
+            'clocks': clocks.stats(),
+            'journal': journal.stats(),
+            'persistence_queue': persistence_queue.stats(),
             'timestamp': datetime.utcnow().isoformat()
         })
     except Exception as e:
@@ -214,9 +323,62 @@ def health_check():
             'error': str(e)
         }), 500
 
+def parse_position_filters(args):
+    """
+    Lit les filtres de /api/random-position depuis la query string.
+    
+    Filtres acceptés : turn (w/b), material_diff, min_material_diff,
+    max_material_diff, eval_min, eval_max (centipions, ligne 1),
+    white_material_min/max, black_material_min/max, include_pieces et
+    exclude_pieces (listes séparées par des virgules).
+    
+    Returns:
+        dict: Arguments pour PositionIndex.random_position
+    
+    Raises:
+        ValueError: Si un filtre est invalide
+    """
+    def int_arg(name):
+        value = args.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f'{name} doit être un entier')
+    
+    def pieces_arg(name):
+        pieces = [p.strip() for p in args.get(name, '').split(',') if p.strip()]
+        for piece in pieces:
+            if piece not in PIECE_BITS:
+                raise ValueError(f'Pièce invalide: {piece}')
+        return pieces
+    
+    filters = {}
+    turn = args.get('turn')
+    if turn:
+        if turn.lower() not in ('w', 'b', 'white', 'black', 'blanc', 'noir'):
+            raise ValueError('turn doit valoir w ou b')
+        filters['turn'] = turn.lower() in ('w', 'white', 'blanc')
+    
+    material_diff = int_arg('material_diff')
+    filters['min_diff'] = material_diff if material_diff is not None else int_arg('min_material_diff')
+    filters['max_diff'] = material_diff if material_diff is not None else int_arg('max_material_diff')
+    filters['eval_min'] = int_arg('eval_min')
+    filters['eval_max'] = int_arg('eval_max')
+    filters['include_pieces'] = pieces_arg('include_pieces')
+    filters['exclude_pieces'] = pieces_arg('exclude_pieces')
+    
+    for side in ('white', 'black'):
+        low, high = int_arg(f'{side}_material_min'), int_arg(f'{side}_material_max')
+        if low is not None or high is not None:
+            filters[f'{side}_material'] = (low, high)
+    
+    return filters
+
 @app.route('/api/random-position', methods=['GET', 'OPTIONS'])
 def get_random_position():
-    """Retourne une position aléatoire depuis le fichier JSON"""
+    """Retourne une position aléatoire (éventuellement filtrée) depuis l'index des positions"""
     if request.method == 'OPTIONS':
         return '', 204
     
@@ -227,14 +389,24 @@ def get_random_position():
                 'error': 'Aucune position disponible dans le cache'
             }), 404
         
-        # Sélectionner une position aléatoire
-        position = random.choice(CACHED_POSITIONS)
+        # Tirage uniforme parmi les positions compatibles avec les filtres
+        position = POSITION_INDEX.random_position(**parse_position_filters(request.args))
+        if position is None:
+            return jsonify({
+                'success': False,
+                'error': 'Aucune position ne correspond aux filtres'
+            }), 404
         
         return jsonify({
             'success': True,
             'data': position
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         print(f"❌ Erreur lors de la récupération d'une position aléatoire: {e}")
         return jsonify({
@@ -242,6 +414,99 @@ def get_random_position():
             'error': str(e)
         }), 500
 
+def parse_generation_params(data, max_timeout=None):
+    """
+    Lit et valide les paramètres de génération d'une requête.
+    
+    Args:
+        data: Corps JSON de la requête
+        max_timeout: Délai maximal d'une tâche de fond (secondes) ; si fourni,
+            le délai 'timeout' de la requête est lu et validé
+    
+    Returns:
+        dict: Paramètres pour generate_fen_position (plus 'timeout' pour une
+        tâche de fond qui en précise un)
+    
+    Raises:
+        ValueError: Si un paramètre est invalide
+    """
+    data = data or {}
+    
+    # Récupérer les paramètres avec valeurs par défaut
+    negative_min = data.get('negative_min', -99)
+    negative_max = data.get('negative_max', -15)
+    positive_min = data.get('positive_min', 15)
+    positive_max = data.get('positive_max', 99)
+    material_diff = data.get('material_diff', 3)
+    max_material = data.get('max_material', 22)
+    max_attempts = data.get('max_attempts', 20000)
+    excluded_pieces = data.get('excluded_pieces', [])
+    seed = data.get('seed')
+    strategy = data.get('strategy', AUTO)
+    timeout = data.get('timeout')
+    
+    # Validations
+    if negative_min < -99 or negative_min > -15:
+        raise ValueError('negative_min doit être entre -99 et -15')
+    if negative_max < -99 or negative_max > -15:
+        raise ValueError('negative_max doit être entre -99 et -15')
+    if negative_min > negative_max:
+        raise ValueError('negative_min doit être inférieur à negative_max')
+    if positive_min < 15 or positive_min > 99:
+        raise ValueError('positive_min doit être entre 15 et 99')
+    if positive_max < 15 or positive_max > 99:
+        raise ValueError('positive_max doit être entre 15 et 99')
+    if positive_min > positive_max:
+        raise ValueError('positive_min doit être inférieur à positive_max')
+    if material_diff < 0 or material_diff > 6:
+        raise ValueError('material_diff doit être entre 0 et 6')
+    if max_material < 10 or max_material > 25:
+        raise ValueError('max_material doit être entre 10 et 25')
+    if max_attempts < 1000 or max_attempts > 50000:
+        raise ValueError('max_attempts doit être entre 1000 et 50000')
+    
+    # Valider excluded_pieces
+    if not isinstance(excluded_pieces, list):
+        raise ValueError('excluded_pieces doit être une liste')
+    
+    valid_pieces = ['queen', 'rook', 'bishop', 'knight', 'pawn']
+    for piece in excluded_pieces:
+        if piece not in valid_pieces:
+            raise ValueError(f'Pièce invalide: {piece}')
+    
+    params = {
+        'negative_min': negative_min,
+        'negative_max': negative_max,
+        'positive_min': positive_min,
+        'positive_max': positive_max,
+        'material_diff': material_diff,
+        'max_material': max_material,
+        'max_attempts': max_attempts,
+        'excluded_pieces': excluded_pieces
+    }
+    
+    # Graine optionnelle : génération reproductible (et mise en cache)
+    if seed is not None:
+        if not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+            raise ValueError('seed doit être un entier positif')
+        params['seed'] = seed
+    
+    # Stratégie imposée ('placement', 'playout'...) ; 'auto' laisse choisir la moins chère
+    if strategy != AUTO:
+        if not isinstance(strategy, str):
+            raise ValueError('strategy doit être une chaîne')
+        params['strategy'] = get_strategy(strategy).name
+    
+    # Délai optionnel d'une tâche de fond
+    if max_timeout is not None and timeout is not None:
+        if not isinstance(timeout, (int, float)) or isinstance(timeout, bool):
+            raise ValueError('timeout doit être un nombre de secondes')
+        if timeout < 1 or timeout > max_timeout:
+            raise ValueError(f'timeout doit être entre 1 et {max_timeout:g} secondes')
+        params['timeout'] = timeout
+    
+    return params
+
 @app.route('/api/generate', methods=['POST', 'OPTIONS'])
 def generate_position():
     """Génère une nouvelle position avec Stockfish (pour la page generator)"""
@@ -249,104 +514,27 @@ def generate_position():
         return '', 204
         
     try:
-        data = request.get_json()
-        
-        # Récupérer les paramètres avec valeurs par défaut
-        negative_min = data.get('negative_min', -99)
-        negative_max = data.get('negative_max', -15)
-        positive_min = data.get('positive_min', 15)
-        positive_max = data.get('positive_max', 99)
-        material_diff = data.get('material_diff', 3)
-        max_material = data.get('max_material', 22)
-        max_attempts = data.get('max_attempts', 20000)
-        excluded_pieces = data.get('excluded_pieces', [])
-        
-        # Validations
-        if negative_min < -99 or negative_min > -15:
-            return jsonify({
-                'success': False,
-                'error': 'negative_min doit être entre -99 et -15'
-            }), 400
-        
-        if negative_max < -99 or negative_max > -15:
-            return jsonify({
-                'success': False,
-                'error': 'negative_max doit être entre -99 et -15'
-            }), 400
-        
-        if negative_min > negative_max:
-            return jsonify({
-                'success': False,
-                'error': 'negative_min doit être inférieur à negative_max'
-            }), 400
-        
-        if positive_min < 15 or positive_min > 99:
-            return jsonify({
-                'success': False,
-                'error': 'positive_min doit être entre 15 et 99'
-            }), 400
-        
-        if positive_max < 15 or positive_max > 99:
-            return jsonify({
-                'success': False,
-                'error': 'positive_max doit être entre 15 et 99'
-            }), 400
-        
-        if positive_min > positive_max:
-            return jsonify({
-                'success': False,
-                'error': 'positive_min doit être inférieur à positive_max'
-            }), 400
-        
-        if material_diff < 0 or material_diff > 6:
-            return jsonify({
-                'success': False,
-                'error': 'material_diff doit être entre 0 et 6'
-            }), 400
-        
-        if max_material < 10 or max_material > 25:
-            return jsonify({
-                'success': False,
-                'error': 'max_material doit être entre 10 et 25'
-            }), 400
-        
-        if max_attempts < 1000 or max_attempts > 50000:
-            return jsonify({
-                'success': False,
-                'error': 'max_attempts doit être entre 1000 et 50000'
-            }), 400
-        
-        # Valider excluded_pieces
-        if not isinstance(excluded_pieces, list):
-            return jsonify({
-                'success': False,
-                'error': 'excluded_pieces doit être une liste'
-            }), 400
+        params = parse_generation_params(request.get_json())
         
-        valid_pieces = ['queen', 'rook', 'bishop', 'knight', 'pawn']
-        for piece in excluded_pieces:
-            if piece not in valid_pieces:
-                return jsonify({
-                    'success': False,
-                    'error': f'Pièce invalide: {piece}'
-                }), 400
-                
-        result = generate_fen_position(
-            negative_min=negative_min,
-            negative_max=negative_max,
-            positive_min=positive_min,
-            positive_max=positive_max,
-            material_diff=material_diff,
-            max_material=max_material,
-            max_attempts=max_attempts,
-            excluded_pieces=excluded_pieces
-        )
+        client = session.get('user_id') or request.remote_addr
+        if 'seed' in params or 'strategy' in params:
+            # Reproductible ou stratégie imposée : jamais servie depuis le réservoir
+            result = run_in_native_thread(generate_fen_position, client=client, **params)
+        else:
+            # Servie depuis le réservoir si possible, sinon génération en direct
+            result = reservoir.take(params, client=client)
         
         return jsonify({
             'success': True,
             'data': result
         })
         
+    except ValueError as e:
+        # Paramètres invalides ou incompatibles (ex: aucune composition réalisable)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         print(f"❌ Erreur lors de la génération: {e}")
         return jsonify({
@@ -354,6 +542,66 @@ def generate_position():
             'error': str(e)
         }), 500
 
+@app.route('/api/generate/jobs', methods=['POST', 'OPTIONS'])
+def submit_generation_job():
+    """Lance une génération en tâche de fond et retourne son identifiant"""
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    try:
+        data = request.get_json() or {}
+        params = parse_generation_params(data, max_timeout=job_manager.max_timeout)
+        timeout = params.pop('timeout', None)
+        job = job_manager.submit(params, timeout=timeout, owner=session.get('user_id'))
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'room': f'generation:{job.id}'
+        }), 202
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        print(f"❌ Erreur lors de la création de la tâche: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/generate/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    """Retourne l'état et la progression d'une tâche de génération"""
+    snapshot = job_manager.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({
+            'success': False,
+            'error': 'Tâche introuvable'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': snapshot
+    })
+
+@app.route('/api/generate/jobs/<job_id>', methods=['DELETE'])
+def cancel_generation_job(job_id):
+    """Annule une tâche de génération en attente ou en cours"""
+    if not job_manager.cancel(job_id):
+        return jsonify({
+            'success': False,
+            'error': 'Tâche introuvable ou déjà terminée'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'message': 'Annulation demandée'
+    })
+
 @app.route('/api/reload-positions', methods=['POST', 'OPTIONS'])
 def reload_positions():
     """Recharge les positions depuis le fichier JSON"""
@@ -383,6 +631,26 @@ def handle_connect():
     print(f"✅ Client connecté: {request.sid}")
     emit('connection_established', {'sid': request.sid, 'async_mode': socketio.async_mode})
 
+@socketio.on('subscribe_generation')
+def handle_subscribe_generation(data):
+    """Abonne le client aux événements de progression d'une tâche de génération"""
+    job_id = (data or {}).get('job_id')
+    snapshot = job_manager.snapshot(job_id) if job_id else None
+    if snapshot is None:
+        emit('error', {'message': 'Tâche de génération introuvable'})
+        return
+    
+    join_room(f'generation:{job_id}', sid=request.sid)
+    # État courant immédiatement, les mises à jour suivent via le relais
+    emit(GENERATION_EVENTS.get(snapshot['status'], 'generation_progress'), snapshot)
+
+@socketio.on('cancel_generation')
+def handle_cancel_generation(data):
+    """Annule une tâche de génération depuis la socket"""
+    job_id = (data or {}).get('job_id')
+    if not job_id or not job_manager.cancel(job_id):
+        emit('error', {'message': 'Tâche introuvable ou déjà terminée'})
+
 @socketio.on('join_game')
 def handle_join_game(data):
     """Permet aux joueurs de rejoindre une partie créée"""
@@ -398,12 +666,18 @@ def handle_join_game(data):
         if game_id in games:
             game = games[game_id]
             print(f"✅ Joueur {user_id} rejoint la partie existante {game_id}")
+            if game.get_player_color_enum(request.sid) is None:
+                # Reconnexion (partie restaurée après un redémarrage) : nouveau SID
+                games.rebind(game_id, user_id, request.sid)
             join_room(game_id, sid=request.sid)
             
             emit('game_joined', {
                 'game_id': game_id,
                 'color': game.get_player_color(request.sid),
                 'fen': game.fen,
+                'white_time': max(0.0, game.time_left(chess.WHITE)),
+                'black_time': max(0.0, game.time_left(chess.BLACK)),
+                'time_control': game.time_control,
                 'opponent': {
                     'username': game.get_opponent_id(request.sid)
                 }
@@ -434,63 +708,31 @@ def handle_join_game(data):
         
         # Si les deux joueurs sont connectés, créer l'objet Game
         if len(game_info['sids']) == 2:
-            from backend.socket_manager import Game
-            
             challenger_sid = game_info['sids'][game_info['challenger_id']]
             accepter_sid = game_info['sids'][game_info['accepter_id']]
             
-            game = Game.__new__(Game)
-            game.game_id = game_id
-            game.board = chess.Board(game_info['fen'])
-            game.starting_fen = game_info['fen']
-            game.moves_history = []
-            game.started_at = game_info['created']
-            
-            # Ajout du time control
-            tc = game_info.get('time_control', {'minutes': 5, 'increment': 0})
-            game.time_control = tc
-            game.white_time = tc['minutes'] * 60
-            game.black_time = tc['minutes'] * 60
-            game.increment = tc.get('increment', 0)
-            game.last_move_time = game_info['created']
-            
-            from backend.db_models import User
-            game.user1 = User.query.get(game_info['challenger_id'])
-            game.user2 = User.query.get(game_info['accepter_id'])
-            
-            # Assigner les couleurs
-            if game_info['challenger_color'] == 'white':
-                game.players = {
-                    challenger_sid: {
-                        'color': chess.WHITE,
-                        'user_id': game_info['challenger_id'],
-                        'username': game_info['challenger_name']
-                    },
-                    accepter_sid: {
-                        'color': chess.BLACK,
-                        'user_id': game_info['accepter_id'],
-                        'username': game_info['accepter_name']
-                    }
-                }
-            else:
-                game.players = {
-                    challenger_sid: {
-                        'color': chess.BLACK,
-                        'user_id': game_info['challenger_id'],
-                        'username': game_info['challenger_name']
-                    },
-                    accepter_sid: {
-                        'color': chess.WHITE,
-                        'user_id': game_info['accepter_id'],
-                        'username': game_info['accepter_name']
-                    }
-                }
+            game = Game(
+                challenger_sid,
+                accepter_sid,
+                game_info['challenger_id'],
+                game_info['accepter_id'],
+                game_info['fen'],
+                time_control=game_info.get('time_control', {'minutes': 5, 'increment': 0}),
+                player1_name=game_info['challenger_name'],
+                player2_name=game_info['accepter_name'],
+                player1_color=chess.WHITE if game_info['challenger_color'] == 'white' else chess.BLACK,
+                game_id=game_id,
+                started_at=game_info['created']
+            )
             
             join_room(game_id, sid=challenger_sid)
             join_room(game_id, sid=accepter_sid)
             
-            games[game_id] = game
+            games.add(game)
             del app.pending_games[game_id]
+            clocks.unwatch_pending(game_id)
+            clocks.watch(game)
+            journal.create(game)
             
             print(f"✅ Partie {game_id} complètement initialisée avec les deux joueurs")
             
@@ -576,6 +818,9 @@ def handle_make_move(data):
             
             if info.get('result'):
                 MatchmakingManager.remove_game(game_id)
+            else:
+                # Nouvelle échéance : pendule du camp qui doit maintenant jouer
+                clocks.watch(game)
             
         except ValueError as e:
             emit('invalid_move', {'message': str(e)})
@@ -601,12 +846,12 @@ def handle_resign(data):
         player_color = game.get_player_color_enum(request.sid)
         result = 'black_win' if player_color == chess.WHITE else 'white_win'
         
-        game.save_to_database(result)
-        
-        emit('game_over', {
-            'result': result,
-            'reason': 'resignation'
-        }, room=game_id)
+        # La partie a pu se terminer entre-temps (drapeau tombé)
+        if game.end(result):
+            emit('game_over', {
+                'result': result,
+                'reason': 'resignation'
+            }, room=game_id)
         
         MatchmakingManager.remove_game(game_id)
         
@@ -651,12 +896,11 @@ def handle_accept_draw(data):
             emit('error', {'message': 'Partie introuvable'})
             return
         
-        game.save_to_database('draw')
-        
-        emit('game_over', {
-            'result': 'draw',
-            'reason': 'agreement'
-        }, room=game_id)
+        if game.end('draw'):
+            emit('game_over', {
+                'result': 'draw',
+                'reason': 'agreement'
+            }, room=game_id)
         
         MatchmakingManager.remove_game(game_id)
         
@@ -860,17 +1104,11 @@ def get_online_players():
         
         players_list = []
         for player in online_players:
-            in_game = False
-            for game_id, game in games.items():
-                if any(p['user_id'] == player.id for p in game.players.values()):
-                    in_game = True
-                    break
-            
             players_list.append({
                 'id': player.id,
                 'username': player.username,
                 'elo': player.elo_rating,
-                'in_game': in_game,
+                'in_game': games.is_playing(player.id),
                 'games_played': player.games_played,
                 'games_won': player.games_won
             })
@@ -888,6 +1126,39 @@ def get_online_players():
             'error': 'Erreur serveur'
         }), 500
 
+@app.route('/api/games/current', methods=['GET'])
+def get_current_games():
+    """Parties en cours de l'utilisateur (pour les reprendre avec join_game après une reconnexion)"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({
+            'success': False,
+            'error': 'Non authentifié'
+        }), 401
+    
+    current = []
+    for game_id in games.game_ids_for_user(user_id):
+        game = games.get(game_id)
+        if game is None:
+            continue
+        color = chess.WHITE if game.white_user_id == user_id else chess.BLACK
+        current.append({
+            'game_id': game_id,
+            'color': 'white' if color == chess.WHITE else 'black',
+            'fen': game.fen,
+            'opponent': {
+                'username': game.black_username if color == chess.WHITE else game.white_username
+            },
+            'white_time': max(0.0, game.time_left(chess.WHITE)),
+            'black_time': max(0.0, game.time_left(chess.BLACK)),
+            'time_control': game.time_control
+        })
+    
+    return jsonify({
+        'success': True,
+        'games': current
+    })
+
 @app.route('/api/players/set-online', methods=['POST'])
 def set_player_online():
     try:
@@ -991,6 +1262,7 @@ def get_challenges():
         
         for challenge_id in expired:
             del challenges[challenge_id]
+            journal.challenge_end(challenge_id)
         
         challenges_list = []
         for challenge_id, challenge in challenges.items():
@@ -1057,6 +1329,7 @@ def create_challenge():
             'time_control': time_control,
             'created_at': datetime.utcnow()
         }
+        journal.challenge(challenge_id, challenges[challenge_id])
         
         print(f"✅ Défi créé: {challenge_id} par {user.username} ({time_control['minutes']}+{time_control['increment']})")
         
@@ -1125,6 +1398,7 @@ def accept_challenge(challenge_id):
         print(f"   Cadence: {challenge['time_control']['minutes']}+{challenge['time_control']['increment']}")
         
         del challenges[challenge_id]
+        journal.challenge_end(challenge_id)
         
         # Attribution aléatoire des couleurs
         colors = ['white', 'black']
@@ -1149,6 +1423,8 @@ def accept_challenge(challenge_id):
         if not hasattr(app, 'pending_games'):
             app.pending_games = {}
         app.pending_games[game_id] = game_info
+        clocks.watch_pending(game_id)
+        journal.pending(game_id, game_info)
         
         # Note: Les joueurs rejoindront la room via join_game car on n'a pas les SID ici
         
@@ -1211,6 +1487,7 @@ def cancel_challenge(challenge_id):
             }), 403
         
         del challenges[challenge_id]
+        journal.challenge_end(challenge_id)
         
         print(f"✅ Défi annulé: {challenge_id}")
         
@@ -1230,9 +1507,98 @@ def cancel_challenge(challenge_id):
             'error': 'Erreur serveur'
         }), 500
 
+# ========================================
+# REPRISE APRÈS REDÉMARRAGE
+# ========================================
+
+def restore_live_state():
+    """
+    Restaure les parties en cours, les parties en attente et les défis
+    depuis le journal, puis démarre son écriture.
+    """
+    state = journal.recover()
+    if state is None:
+        return
+    # Les pendules ne tournent pas pendant l'interruption
+    downtime = max(0.0, datetime.now().timestamp() - state.last_seen) if state.last_seen else 0.0
+    for data in state.games.values():
+        try:
+            game = Game.from_journal(data, downtime)
+        except Exception as e:
+            print(f"❌ Partie {data.get('game_id')} non restaurée: {e}")
+            continue
+        games.add(game)
+        clocks.watch(game)
+    if state.pending:
+        if not hasattr(app, 'pending_games'):
+            app.pending_games = {}
+        for game_id, game_info in state.pending.items():
+            app.pending_games[game_id] = game_info
+            clocks.watch_pending(game_id)
+    challenges.update(state.challenges)
+    if state.games or state.pending or state.challenges:
+        print(f"♻️ Reprise: {len(state.games)} partie(s), {len(state.pending)} en attente, "
+              f"{len(state.challenges)} défi(s) (interruption de {downtime:.1f} s)")
+    journal.start()
+    atexit.register(journal.close)
+
+def start_application():
+    """
+    Démarrage du processus serveur : tables, positions, réservoir, tâches
+    de fond et reprise des parties en cours.
+    """
+    try:
+        with app.app_context():
+            create_tables(app)
+            print("✅ Tables créées avec succès!")
+    except Exception as e:
+        print(f"⚠️ Avertissement lors de la création des tables: {e}")
+
+    # Charger les positions au démarrage
+    load_positions()
+
+    # Réservoir de positions pré-générées (réalimenté en arrière-plan)
+    if os.environ.get('RESERVOIR_ENABLED', '1') != '0':
+        reservoir.start()
+
+    socketio.start_background_task(relay_generation_updates)
+
+    # Parties terminées écrites par lots hors des handlers, file vidée à l'arrêt
+    persistence_queue.init_app(app)
+    socketio.start_background_task(persistence_queue.run)
+    atexit.register(persistence_queue.drain)
+
+    # Une seule tâche de fond sert les horloges de toutes les parties
+    clocks.on(FLAG, handle_flag_fall)
+    clocks.on(IDLE, reap_idle_game)
+    clocks.on(PENDING, expire_pending_game)
+    socketio.start_background_task(clocks.run, socketio.sleep)
+
+    restore_live_state()
+
+def is_server_process():
+    """
+    Les processus d'échantillonnage de chess_generator (forkserver/spawn)
+    réimportent le script principal sous le nom __mp_main__ (dans le
+    processus serveur, multiprocessing y range le vrai __main__).
+
+    Returns:
+        bool: True dans le processus serveur (python backend/app.py ou
+        worker gunicorn), False dans un processus enfant de multiprocessing
+    """
+    main_module = sys.modules.get('__mp_main__')
+    return (multiprocessing.parent_process() is None
+            and getattr(main_module, '__name__', '__main__') != '__mp_main__')
+
+# Le démarrage n'a lieu que dans le processus serveur
+if is_server_process():
+    start_application()
+
 # ========================================
 # DÉMARRAGE DE L'APPLICATION
 # ========================================
 
 if __name__ == '__main__':
+    # En mode debug, les index du registre des parties sont vérifiés à chaque accès
+    games.debug = True
     socketio.run(app, debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,161 @@
+"""
+Échantillonneur vectorisé de positions candidates.
+
+Au lieu de construire un chess.Board par tentative, on place des milliers de
+compositions d'un coup dans des tableaux NumPy, on applique les contrôles de
+légalité (rangées des pions, couleur des fous, distance des rois, rois en
+échec) à l'aide de tables d'attaques précalculées, et seules les positions
+survivantes sont converties en FEN / chess.Board.
+"""
+import chess
+import numpy as np
+
+# --- Tables précalculées ---
+
+_SQUARES = np.arange(64)
+_ONE = np.uint64(1)
+_SQUARE_BITS = np.left_shift(_ONE, _SQUARES.astype(np.uint64))
+
+KNIGHT_ATTACKS = np.array(chess.BB_KNIGHT_ATTACKS, dtype=np.uint64)
+# Indexé par [couleur, case] avec chess.BLACK = 0 et chess.WHITE = 1
+PAWN_ATTACKS = np.array(chess.BB_PAWN_ATTACKS, dtype=np.uint64)
+LIGHT_SQUARES = np.array([bool(chess.BB_LIGHT_SQUARES & chess.BB_SQUARES[sq]) for sq in chess.SQUARES])
+
+# BETWEEN[a, b] : cases strictement entre a et b (0 si non alignées)
+# ALIGNMENT[a, b] : 0 = non alignées, 1 = même colonne/rangée, 2 = même diagonale
+BETWEEN = np.zeros((64, 64), dtype=np.uint64)
+ALIGNMENT = np.zeros((64, 64), dtype=np.int8)
+for _a in chess.SQUARES:
+    for _b in chess.SQUARES:
+        if _a == _b or not chess.ray(_a, _b):
+            continue
+        BETWEEN[_a, _b] = chess.between(_a, _b)
+        same_line = (chess.square_file(_a) == chess.square_file(_b)
+                     or chess.square_rank(_a) == chess.square_rank(_b))
+        ALIGNMENT[_a, _b] = 1 if same_line else 2
+
+PIECE_SYMBOLS = {
+    (piece_type, color): chess.Piece(piece_type, color).symbol()
+    for piece_type in chess.PIECE_TYPES
+    for color in chess.COLORS
+}
+
+# Pions : uniquement les rangées 2 à 7
+PAWN_SQUARES = np.arange(8, 56)
+
+
+def _board_fen(squares, types, colors):
+    """Construit la partie 'placement' d'une FEN à partir des pièces placées."""
+    grid = [None] * 64
+    for square, piece_type, color in zip(squares, types, colors):
+        if piece_type:
+            grid[square] = PIECE_SYMBOLS[(int(piece_type), bool(color))]
+
+    rows = []
+    for rank in range(7, -1, -1):
+        row = []
+        empty = 0
+        for file in range(8):
+            symbol = grid[rank * 8 + file]
+            if symbol is None:
+                empty += 1
+            else:
+                if empty:
+                    row.append(str(empty))
+                    empty = 0
+                row.append(symbol)
+        if empty:
+            row.append(str(empty))
+        rows.append(''.join(row))
+    return '/'.join(rows)
+
+
+def sample_legal_positions(compositions, rng):
+    """
+    Place un lot de compositions au hasard et ne garde que les positions légales.
+
+    Args:
+        compositions: Liste de tuples (pièces blanches, pièces noires), chaque
+            élément étant une liste de types chess (sans les rois)
+        rng: numpy.random.Generator
+
+    Returns:
+        Liste de tuples (index de la composition, fen, board) pour les survivants
+    """
+    batch = len(compositions)
+    if batch == 0:
+        return []
+
+    width = 2 + max(len(white) + len(black) for white, black in compositions)
+    types = np.zeros((batch, width), dtype=np.int8)
+    colors = np.zeros((batch, width), dtype=bool)
+
+    # Rois en colonnes 0 (blanc) et 1 (noir), puis les pièces de chaque camp
+    types[:, 0] = chess.KING
+    types[:, 1] = chess.KING
+    colors[:, 0] = chess.WHITE
+    for row, (white, black) in enumerate(compositions):
+        end_white = 2 + len(white)
+        types[row, 2:end_white] = white
+        colors[row, 2:end_white] = chess.WHITE
+        types[row, end_white:end_white + len(black)] = black
+
+    occupied = types != 0
+    is_pawn = types == chess.PAWN
+    is_other = occupied & ~is_pawn
+
+    # Pions : permutation aléatoire des 48 cases centrales
+    pawn_rank = np.clip(np.cumsum(is_pawn, axis=1) - 1, 0, len(PAWN_SQUARES) - 1)
+    pawn_order = PAWN_SQUARES[np.argsort(rng.random((batch, len(PAWN_SQUARES))), axis=1)]
+    pawn_squares = np.take_along_axis(pawn_order, pawn_rank, axis=1)
+
+    # Autres pièces : permutation des 64 cases, celles des pions reléguées à la fin
+    priority = rng.random((batch, 64))
+    pawn_rows, _ = np.nonzero(is_pawn)
+    priority[pawn_rows, pawn_squares[is_pawn]] = 2.0
+    other_rank = np.clip(np.cumsum(is_other, axis=1) - 1, 0, 63)
+    other_order = np.argsort(priority, axis=1)
+    other_squares = np.take_along_axis(other_order, other_rank, axis=1)
+
+    squares = np.where(is_pawn, pawn_squares, np.where(is_other, other_squares, 0))
+
+    # Distance minimale de 2 entre les rois
+    white_king = squares[:, 0]
+    black_king = squares[:, 1]
+    king_distance = np.maximum(np.abs((white_king & 7) - (black_king & 7)),
+                               np.abs((white_king >> 3) - (black_king >> 3)))
+    keep = king_distance >= 2
+
+    # Au plus un fou par couleur de case et par camp
+    is_bishop = types == chess.BISHOP
+    on_light = LIGHT_SQUARES[squares]
+    for color in chess.COLORS:
+        side_bishops = is_bishop & (colors == color)
+        keep &= (side_bishops & on_light).sum(axis=1) <= 1
+        keep &= (side_bishops & ~on_light).sum(axis=1) <= 1
+
+    # Aucun roi en échec : chaque pièce vise le roi adverse
+    occupancy = np.bitwise_or.reduce(np.where(occupied, _SQUARE_BITS[squares], np.uint64(0)), axis=1)
+    targets = np.where(colors, black_king[:, None], white_king[:, None])
+    target_bits = _SQUARE_BITS[targets]
+
+    knight_checks = (types == chess.KNIGHT) & ((KNIGHT_ATTACKS[squares] & target_bits) != 0)
+    pawn_checks = is_pawn & ((PAWN_ATTACKS[colors.astype(np.int8), squares] & target_bits) != 0)
+    alignment = ALIGNMENT[squares, targets]
+    slider_aligned = (((types == chess.BISHOP) & (alignment == 2))
+                      | ((types == chess.ROOK) & (alignment == 1))
+                      | ((types == chess.QUEEN) & (alignment != 0)))
+    path_clear = (BETWEEN[squares, targets] & occupancy[:, None]) == 0
+    checks = knight_checks | pawn_checks | (slider_aligned & path_clear)
+    keep &= ~checks.any(axis=1)
+
+    survivors = np.nonzero(keep)[0]
+    white_to_move = rng.random(len(survivors)) < 0.5
+    fullmoves = rng.integers(10, 51, size=len(survivors))
+
+    positions = []
+    for row, white_turn, fullmove in zip(survivors, white_to_move, fullmoves):
+        placement = _board_fen(squares[row], types[row], colors[row])
+        fen = f"{placement} {'w' if white_turn else 'b'} - - 0 {fullmove}"
+        positions.append((int(row), fen, chess.Board(fen)))
+    return positions
@@ -0,0 +1,165 @@
+"""
+Benchmark de l'empreinte mémoire d'une partie en cours.
+
+Compare, pour N parties de M coups chacune :
+- l'ancienne représentation (chess.Board avec sa pile de coups, liste des
+  coups UCI, deux instances User chargées par partie, dict de dicts par
+  joueur), reproduite ici par LegacyGame ;
+- socket_manager.Game (__slots__, joueurs scalaires, coups en array('H'),
+  échiquier sans pile).
+
+La mémoire est mesurée avec tracemalloc (octets alloués par partie, objets
+partagés exclus), le temps par coup avec perf_counter lors d'une passe
+séparée (tracemalloc ralentit fortement les allocations).
+
+Exemples:
+    python -m backend.benchmark_game_memory
+    python -m backend.benchmark_game_memory --games 2000 --moves 120
+"""
+import argparse
+import contextlib
+import gc
+import io
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import chess
+
+# Permet aussi l'exécution directe (python backend/benchmark_game_memory.py)
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+class LegacyGame:
+    """Disposition mémoire de Game avant le passage aux __slots__ (sans la logique de jeu)."""
+
+    def __init__(self, player1_sid, player2_sid, user1, user2, fen_start):
+        self.game_id = f"legacy-{player1_sid}"
+        self.board = chess.Board(fen_start)
+        self.starting_fen = fen_start
+        self.moves_history = []
+        self.started_at = datetime.now()
+        self.time_control = {'minutes': 5, 'increment': 0}
+        self.white_time = 300
+        self.black_time = 300
+        self.increment = 0
+        self.last_move_time = datetime.now()
+        self.user1 = user1
+        self.user2 = user2
+        self.players = {
+            player1_sid: {'color': chess.WHITE, 'user_id': user1.id, 'username': user1.username},
+            player2_sid: {'color': chess.BLACK, 'user_id': user2.id, 'username': user2.username},
+        }
+
+    def make_move(self, player_sid, uci_move):
+        move = chess.Move.from_uci(uci_move)
+        if move not in self.board.legal_moves:
+            raise ValueError("Mouvement illégal.")
+        self.board.push(move)
+        self.last_move_time = datetime.now()
+        self.moves_history.append(uci_move)
+        # Mêmes contrôles de fin de partie que Game.make_move
+        (self.board.is_checkmate() or self.board.is_stalemate() or self.board.is_insufficient_material()
+         or self.board.can_claim_fifty_moves() or self.board.can_claim_threefold_repetition()
+         or self.board.is_check())
+
+
+def random_games(count, moves, seed):
+    """Parties aléatoires (listes de coups UCI) d'au plus `moves` demi-coups."""
+    rng = random.Random(seed)
+    scripts = []
+    for _ in range(count):
+        board = chess.Board()
+        script = []
+        while len(script) < moves and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            script.append(move.uci())
+        scripts.append(script)
+    return scripts
+
+
+def _play(factory, scripts):
+    """Crée une partie par script et y joue ses coups.
+
+    Returns:
+        Tuple (parties, secondes passées dans make_move, coups joués)
+    """
+    kept = []
+    elapsed = 0.0
+    played = 0
+    for i, script in enumerate(scripts):
+        game, sids = factory(i)
+        started = time.perf_counter()
+        for ply, uci in enumerate(script):
+            game.make_move(sids[ply % 2], uci)
+        elapsed += time.perf_counter() - started
+        played += len(script)
+        kept.append(game)
+    return kept, elapsed, played
+
+
+def measure(factory, scripts):
+    """
+    Mesure le temps par coup, puis la mémoire retenue par partie.
+
+    Returns:
+        dict: octets par partie, microsecondes par coup
+    """
+    _, elapsed, played = _play(factory, scripts)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept, _, _ = _play(factory, scripts)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return {
+        'bytes_per_game': round(retained / len(scripts)),
+        'us_per_move': round(1e6 * elapsed / played, 1) if played else 0.0,
+        'moves_per_game': round(played / len(scripts), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mémoire par partie : ancienne disposition contre Game compact")
+    parser.add_argument('--games', type=int, default=200, help="Nombre de parties")
+    parser.add_argument('--moves', type=int, default=80, help="Demi-coups par partie (au plus)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from backend.db_models import User
+    from backend.socket_manager import Game
+
+    scripts = random_games(args.games, args.moves, args.seed)
+
+    def legacy(i):
+        # Chaque partie chargeait ses deux User (User.query.get) : des instances distinctes
+        user1 = User(id=f"user-a{i}", username=f"joueur_a{i}", email=f"a{i}@example.com")
+        user2 = User(id=f"user-b{i}", username=f"joueur_b{i}", email=f"b{i}@example.com")
+        return LegacyGame(f"a{i}", f"b{i}", user1, user2, chess.STARTING_FEN), (f"a{i}", f"b{i}")
+
+    def compact(i):
+        game = Game(f"a{i}", f"b{i}", f"user-a{i}", f"user-b{i}", chess.STARTING_FEN,
+                    player1_name=f"joueur_a{i}", player2_name=f"joueur_b{i}", player1_color=chess.WHITE)
+        return game, (f"a{i}", f"b{i}")
+
+    # Les messages de création de partie fausseraient les temps
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {'legacy': measure(legacy, scripts), 'compact': measure(compact, scripts)}
+
+    for name, result in results.items():
+        print(f"📊 {name:8s}: {result['bytes_per_game']:>8,} octets/partie, {result['us_per_move']} µs/coup "
+              f"({result['moves_per_game']} coups/partie)")
+    ratio = results['legacy']['bytes_per_game'] / max(1, results['compact']['bytes_per_game'])
+    print(f"✅ Mémoire divisée par {ratio:.1f} ({args.games} parties)")
+    return results
+
+
+if __name__ == '__main__':
+    main()
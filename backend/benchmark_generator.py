@@ -0,0 +1,253 @@
+"""
+Benchmark du générateur de positions.
+
+Mesure, pour chaque jeu de paramètres de la matrice :
+- l'échantillonneur seul : tentatives et candidats par seconde, taux de
+  légalité, taux de compensation matérielle, part des candidats gardés par
+  le pré-filtre statique ;
+- generate_fen_position de bout en bout : temps par appel (moyenne, médiane,
+  p95), appels moteur par position acceptée, échecs.
+
+Par défaut le moteur est le moteur de substitution déterministe
+(backend/standin_engine.py) : graines fixes + évaluations déterministes =
+charge identique d'une version à l'autre. Les résultats sont écrits en JSON
+et peuvent être comparés à une exécution précédente.
+
+Exemples:
+    python -m backend.benchmark_generator -o bench.json
+    python -m backend.benchmark_generator --runs 10 --latency-ms 5 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Permet aussi l'exécution directe (python backend/benchmark_generator.py)
+sys.path.append(str(Path(__file__).parent.parent))
+
+STANDIN_ENGINE = Path(__file__).parent / 'standin_engine.py'
+
+# Matrice par défaut : paramètres de l'API, du matchmaking et variantes de matériel
+PARAMETER_MATRIX = [
+    {'name': 'default'},
+    {'name': 'matchmaking', 'negative_max': -25, 'positive_min': 25},
+    {'name': 'balanced', 'material_diff': 0},
+    {'name': 'large_imbalance', 'material_diff': 5},
+    {'name': 'low_material', 'max_material': 14},
+    {'name': 'no_queens', 'excluded_pieces': ['queen']},
+    {'name': 'minor_pieces', 'max_material': 14, 'material_diff': 1, 'excluded_pieces': ['queen', 'rook']},
+]
+
+
+def _configure_environment(args):
+    """Variables lues par chess_generator à l'import : à fixer avant de l'importer."""
+    if args.engine:
+        os.environ['STOCKFISH_PATH'] = args.engine
+    else:
+        os.environ['STOCKFISH_PATH'] = str(STANDIN_ENGINE)
+        os.environ['STANDIN_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['STOCKFISH_POOL_SIZE'] = str(args.pool_size)
+    # Ni cache d'évaluations ni statistiques adaptatives : chaque exécution part de zéro
+    os.environ['EVAL_CACHE_PATH'] = ''
+    os.environ['SAMPLING_STATS_PATH'] = ''
+    os.environ['ADAPTIVE_SAMPLING'] = '0'
+    os.environ['STRATEGY_STATS_PATH'] = ''
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_sampler(generator, params, attempts, seed):
+    """
+    Débit de l'échantillonneur seul (sans moteur).
+
+    Returns:
+        dict de métriques
+    """
+    import numpy as np
+    from backend.static_eval import is_plausible
+
+    windows = (params['negative_min'], params['negative_max'], params['positive_min'], params['positive_max'])
+    min_piece_diff = 1 if params['material_diff'] >= 2 else 0
+    rng = np.random.default_rng(seed)
+
+    started = time.perf_counter()
+    candidates = []
+    done = 0
+    while done < attempts:
+        batch = min(generator.ATTEMPTS_CHUNK, attempts - done)
+        batch_candidates, _ = generator.generate_candidate_batch(
+            params['max_material'], params['material_diff'], params['excluded_pieces'], batch, rng)
+        candidates.extend(batch_candidates)
+        done += batch
+    sampling_seconds = time.perf_counter() - started
+
+    compensated = sum(
+        1 for _, board, _, _, _ in candidates
+        if generator.is_material_compensated(board, params['material_diff'])[0]
+        and generator.check_piece_difference(board, min_piece_diff)
+    )
+    started = time.perf_counter()
+    plausible = sum(1 for _, board, _, _, _ in candidates
+                    if board.is_check() or is_plausible(board, windows, generator.STATIC_FILTER_CONFIG['margin'])[0])
+    static_seconds = time.perf_counter() - started
+
+    n = len(candidates)
+    return {
+        'attempts': attempts,
+        'attempts_per_second': round(attempts / sampling_seconds, 1),
+        'candidates_per_second': round(n / sampling_seconds, 1),
+        'legality_rate': round(n / attempts, 4),
+        'compensation_rate': round(compensated / n, 4) if n else 0.0,
+        'static_pass_rate': round(plausible / n, 4) if n else 0.0,
+        'static_eval_us': round(1e6 * static_seconds / n, 1) if n else 0.0,
+    }
+
+
+def bench_generation(generator, params, runs, seed, parallel=False, strategy=None):
+    """
+    generate_fen_position de bout en bout, une graine par exécution.
+
+    Avec une graine, la génération est séquentielle (un échantillonneur, un
+    consommateur) ; parallel=True mesure le pipeline complet, sans graine
+    (charge non reproductible). strategy impose une stratégie de génération.
+
+    Returns:
+        dict de métriques
+    """
+    times, evaluations, attempts = [], [], []
+    failures = 0
+    for run in range(runs):
+        started = time.perf_counter()
+        try:
+            options = {} if parallel else {'seed': seed + run}
+            if strategy:
+                options['strategy'] = strategy
+            position = generator.generate_fen_position(**options, **params)
+        except Exception as e:
+            failures += 1
+            print(f"⚠️ Échec (graine {seed + run}): {e}")
+            continue
+        times.append(time.perf_counter() - started)
+        evaluations.append(position['engine_evaluations'])
+        attempts.append(position['attempts'])
+
+    if not times:
+        return {'runs': runs, 'failures': failures}
+    return {
+        'runs': runs,
+        'failures': failures,
+        'mean_seconds': round(statistics.mean(times), 4),
+        'median_seconds': round(statistics.median(times), 4),
+        'p95_seconds': round(_percentile(times, 0.95), 4),
+        'engine_calls_per_accept': round(sum(evaluations) / len(evaluations), 2),
+        'attempts_per_accept': round(sum(attempts) / len(attempts), 1),
+    }
+
+
+def compare(current, previous_path):
+    """Affiche l'évolution des principales métriques par rapport à un fichier précédent."""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {r['name']: r for r in json.load(f)['results']}
+
+    metrics = (('sampler', 'candidates_per_second', True), ('generation', 'median_seconds', False),
+               ('generation', 'engine_calls_per_accept', False))
+    print(f"\n📈 Comparaison avec {previous_path}")
+    for result in current['results']:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        parts = []
+        for section, metric, higher_is_better in metrics:
+            before, after = old.get(section, {}).get(metric), result.get(section, {}).get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            better = change > 0 if higher_is_better else change < 0
+            parts.append(f"{metric} {before} → {after} ({change:+.1%}{' ✅' if better else ''})")
+        print(f"   {result['name']}: " + ' | '.join(parts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de chess_generator (résultats JSON)")
+    parser.add_argument('-o', '--output', default='generator_benchmark.json', help="Fichier JSON de résultats")
+    parser.add_argument('--runs', type=int, default=5, help="Générations complètes par jeu de paramètres")
+    parser.add_argument('--sampler-attempts', type=int, default=20000, help="Tentatives pour la mesure de l'échantillonneur")
+    parser.add_argument('--latency-ms', type=float, default=20, help="Durée d'une recherche du moteur de substitution")
+    parser.add_argument('--pool-size', type=int, default=2, help="Taille du pool de moteurs")
+    parser.add_argument('--engine', help="Moteur UCI réel à la place du moteur de substitution")
+    parser.add_argument('--seed', type=int, default=0, help="Première graine")
+    parser.add_argument('--parallel', action='store_true',
+                        help="Générations sans graine (pipeline parallèle complet, non reproductible)")
+    parser.add_argument('--strategy', help="Stratégie de génération (placement, playout...)")
+    parser.add_argument('--only', action='append', help="Ne lancer que ce jeu de paramètres (répétable)")
+    parser.add_argument('--compare', help="Fichier JSON d'une exécution précédente")
+    args = parser.parse_args(argv)
+
+    _configure_environment(args)
+    from backend import chess_generator as generator
+    from backend.position_reservoir import DEFAULT_PARAMS
+
+    matrix = [entry for entry in PARAMETER_MATRIX if not args.only or entry['name'] in args.only]
+    results = []
+    total_start = time.perf_counter()
+    for entry in matrix:
+        params = dict(DEFAULT_PARAMS, **{k: v for k, v in entry.items() if k != 'name'})
+        print(f"⏱️ {entry['name']}: {params}")
+        try:
+            generator.composition_table(params['max_material'], params['material_diff'], params['excluded_pieces'])
+        except ValueError as e:
+            print(f"⚠️ Ignoré: {e}")
+            results.append({'name': entry['name'], 'params': params, 'error': str(e)})
+            continue
+        result = {
+            'name': entry['name'],
+            'params': params,
+            'sampler': bench_sampler(generator, params, args.sampler_attempts, args.seed),
+            'generation': bench_generation(generator, params, args.runs, args.seed, args.parallel, args.strategy),
+        }
+        results.append(result)
+        sampler, generation = result['sampler'], result['generation']
+        print(f"   {sampler['candidates_per_second']} candidats/s, légalité {sampler['legality_rate']:.1%}, "
+              f"compensation {sampler['compensation_rate']:.1%} | "
+              f"{generation.get('median_seconds', '-')} s/position (médiane), "
+              f"{generation.get('engine_calls_per_accept', '-')} appels moteur/position")
+
+    report = {
+        'revision': _git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'engine': generator.engine_config(),
+        'standin_latency_ms': None if args.engine else args.latency_ms,
+        'pool_size': args.pool_size,
+        'seeded': not args.parallel,
+        'strategy': args.strategy,
+        'total_seconds': round(time.perf_counter() - total_start, 1),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Résultats écrits dans {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
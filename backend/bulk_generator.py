@@ -0,0 +1,312 @@
+"""
+Génération en masse de positions, parallèle et reprenable.
+
+Chaque position acceptée est ajoutée immédiatement (une ligne JSON) au
+fichier de sortie : un arrêt brutal ne perd que les recherches en cours, et
+une relance sur le même fichier reprend là où elle s'était arrêtée.
+
+Avec --augment, chaque position trouvée par le moteur est complétée par ses
+formes symétriques (miroir des colonnes, inversion des couleurs) qui restent
+dans les fenêtres, sans appel moteur supplémentaire.
+
+--strategy impose une stratégie de génération (placement, playout) ; par
+défaut ('auto'), la moins chère de chaque bucket est choisie, les autres
+étant encore essayées de temps en temps (voir backend/generation_strategies.py).
+
+Exemples:
+    python -m backend.bulk_generator --count 200 --workers 4 --augment
+    python -m backend.bulk_generator --count 20 --strategy playout
+    python -m backend.bulk_generator -o positions.jsonl --count 50 \\
+        --bucket material_diff=2 --bucket negative_max=-25,positive_min=25,excluded_pieces=queen+rook
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Permet aussi l'exécution directe (python backend/bulk_generator.py)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.engine_scheduler import BACKGROUND
+from backend.generation_strategies import AUTO, STRATEGIES
+from backend.position_dedup import DedupIndex
+from backend.position_reservoir import BUCKET_PARAMS, DEFAULT_PARAMS, bucket_key, bucket_params
+
+
+def parse_bucket(spec):
+    """
+    Convertit une spécification 'clé=valeur,...' en paramètres de génération.
+
+    Les valeurs sont entières, sauf excluded_pieces (types séparés par '+').
+
+    Args:
+        spec: Chaîne de spécification (vide = paramètres par défaut)
+
+    Returns:
+        dict: Paramètres complets (défauts inclus)
+    """
+    params = dict(DEFAULT_PARAMS)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, sep, value = item.partition('=')
+        if not sep or name not in BUCKET_PARAMS:
+            raise argparse.ArgumentTypeError(f"Paramètre de bucket invalide: {item}")
+        if name == 'excluded_pieces':
+            params[name] = [piece for piece in value.split('+') if piece]
+        else:
+            try:
+                params[name] = int(value)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"{name} doit être un entier: {value}")
+    return bucket_params(bucket_key(params))
+
+
+def load_checkpoint(path, seen=None):
+    """
+    Relit un fichier de sortie existant et compte les positions par bucket.
+
+    Une dernière ligne tronquée (arrêt pendant l'écriture) est supprimée du
+    fichier pour que les ajouts suivants restent du JSONL valide.
+
+    Args:
+        path: Fichier JSONL
+        seen: DedupIndex complété avec les positions déjà écrites
+
+    Returns:
+        dict {clé de bucket: nombre de positions déjà générées}
+    """
+    counts = {}
+    if not path.exists():
+        return counts
+
+    valid_size = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"⚠️ Ligne illisible ignorée dans {path}")
+            else:
+                key = bucket_key(record.get('params', {}))
+                counts[key] = counts.get(key, 0) + 1
+                if seen is not None and 'fen' in record:
+                    seen.add(record['fen'])
+            valid_size += len(line)
+
+    if valid_size < path.stat().st_size:
+        print(f"⚠️ Dernière ligne incomplète supprimée de {path}")
+        with open(path, 'r+b') as f:
+            f.truncate(valid_size)
+    return counts
+
+
+class BulkGenerator:
+    """Répartit les générations entre workers et écrit les résultats au fil de l'eau."""
+
+    def __init__(self, generate_fn, output, buckets, count, workers=1, max_attempts=20000,
+                 sampler_processes=1, max_failures=10, engine_stats=None, augment=False, strategy=None):
+        """
+        Args:
+            generate_fn: Fonction de génération (generate_fen_position)
+            output: Fichier JSONL de sortie (Path)
+            buckets: Liste de paramètres de génération
+            count: Nombre de positions visé par bucket
+            workers: Nombre de générations simultanées
+            max_attempts: max_attempts de chaque génération
+            sampler_processes: Processus échantillonneurs par génération
+            max_failures: Échecs consécutifs avant d'abandonner un bucket
+            engine_stats: Callable retournant les statistiques du pool de moteurs
+            augment: Écrit aussi les positions symétriques de chaque position trouvée
+            strategy: Stratégie de génération, 'auto' pour la moins chère de chaque bucket
+                (défaut: GENERATION_STRATEGY)
+        """
+        self.generate_fn = generate_fn
+        self.output = output
+        self.count = count
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.sampler_processes = sampler_processes
+        self.max_failures = max_failures
+        self.engine_stats = engine_stats or (lambda: {'engine_seconds': 0.0})
+        self.augment = augment
+        self.strategy = strategy
+
+        self.keys = list(dict.fromkeys(bucket_key(params) for params in buckets))
+        self.done = {key: 0 for key in self.keys}
+        self.in_flight = {key: 0 for key in self.keys}
+        self.failures = {key: 0 for key in self.keys}
+        self.generated = 0
+        self.augmented = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.by_strategy = {}
+        # Avec augment, les formes symétriques sont voulues : seuls les doublons exacts sont écartés
+        self.seen = DedupIndex(symmetric=not augment)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _remaining(self, key):
+        return self.count - self.done[key] - self.in_flight[key]
+
+    def _next_bucket(self):
+        """Choisit le bucket le moins avancé qui a encore besoin de positions."""
+        with self._lock:
+            candidates = [key for key in self.keys
+                          if self._remaining(key) > 0 and self.failures[key] < self.max_failures]
+            if not candidates:
+                return None
+            key = max(candidates, key=self._remaining)
+            self.in_flight[key] += 1
+            return key
+
+    def _worker(self, output):
+        while not self._stop.is_set():
+            key = self._next_bucket()
+            if key is None:
+                return
+            params = bucket_params(key)
+            options = {'augment': True} if self.augment else {}
+            try:
+                # Génération de fond : en mode 'auto', les stratégies peu mesurées sont aussi essayées
+                position = self.generate_fn(max_attempts=self.max_attempts, sampler_processes=self.sampler_processes,
+                                            priority=BACKGROUND, strategy=self.strategy, **options, **params)
+            except Exception as e:
+                with self._lock:
+                    self.in_flight[key] -= 1
+                    self.failures[key] += 1
+                    self.failed += 1
+                print(f"❌ Échec pour {params}: {e}")
+                continue
+
+            variants = position.pop('augmented', [])
+            with self._lock:
+                if self._stop.is_set():
+                    return
+                self.in_flight[key] -= 1
+                self.failures[key] = 0
+                strategy = position.get('strategy')
+                self.by_strategy[strategy] = self.by_strategy.get(strategy, 0) + 1
+                for record in [position] + variants:
+                    if self.done[key] >= self.count:
+                        break
+                    if not self.seen.add(record['fen']):
+                        self.duplicates += 1
+                        continue
+                    output.write(json.dumps(dict(record, params=params), ensure_ascii=False) + '\n')
+                    self.done[key] += 1
+                    if record is position:
+                        self.generated += 1
+                    else:
+                        self.augmented += 1
+                output.flush()
+
+    def summary(self, elapsed, engine_seconds):
+        """Ligne de résumé du débit courant."""
+        with self._lock:
+            total_done = sum(self.done.values())
+            generated, augmented, failed = self.generated, self.augmented, self.failed
+        target = self.count * len(self.keys)
+        stored = generated + augmented
+        per_minute = 60 * stored / elapsed if elapsed else 0.0
+        engine_per_position = engine_seconds / stored if stored else 0.0
+        line = (f"📊 {total_done}/{target} positions | {per_minute:.1f} positions/min | "
+                f"{engine_per_position:.1f} s moteur/position | {failed} échec(s) | {elapsed:.0f}s")
+        if self.augment and generated:
+            # Temps moteur économisé par position écrite, par rapport à sans augmentation
+            saved = engine_seconds / generated - engine_per_position
+            line += f" | {augmented} symétrique(s), {saved:.1f} s moteur économisées/position"
+        return line
+
+    def run(self, report_interval=10):
+        """
+        Lance les workers jusqu'à atteindre la cible de chaque bucket.
+
+        Returns:
+            int: Nombre de positions écrites pendant cette exécution (symétriques comprises)
+        """
+        for key, existing in load_checkpoint(self.output, self.seen).items():
+            if key in self.done:
+                self.done[key] = min(existing, self.count)
+
+        missing = sum(max(0, self.count - done) for done in self.done.values())
+        print(f"🚀 {len(self.keys)} bucket(s), {self.count} position(s) visée(s) par bucket, "
+              f"{missing} à générer avec {self.workers} worker(s) → {self.output}")
+        if not missing:
+            return 0
+
+        start = time.time()
+        engine_start = self.engine_stats()['engine_seconds']
+        with open(self.output, 'a', encoding='utf-8') as output:
+            threads = [threading.Thread(target=self._worker, args=(output,), daemon=True)
+                       for _ in range(self.workers)]
+            for thread in threads:
+                thread.start()
+            try:
+                while any(thread.is_alive() for thread in threads):
+                    for thread in threads:
+                        thread.join(timeout=report_interval / len(threads))
+                    if any(thread.is_alive() for thread in threads):
+                        print(self.summary(time.time() - start,
+                                           self.engine_stats()['engine_seconds'] - engine_start))
+            except KeyboardInterrupt:
+                print("\n⏹️ Interruption : les recherches en cours sont abandonnées, relancez pour reprendre")
+                with self._lock:
+                    self._stop.set()
+
+        print(self.summary(time.time() - start, self.engine_stats()['engine_seconds'] - engine_start))
+        abandoned = [bucket_params(key) for key in self.keys if self.failures[key] >= self.max_failures]
+        for params in abandoned:
+            print(f"⚠️ Bucket abandonné après {self.max_failures} échecs consécutifs: {params}")
+        if self.duplicates:
+            print(f"ℹ️ {self.duplicates} position(s) déjà présente(s) non réécrite(s)")
+        if self.by_strategy:
+            print("ℹ️ Positions trouvées par stratégie: " +
+                  ', '.join(f"{name}: {count}" for name, count in sorted(self.by_strategy.items())))
+        return self.generated + self.augmented
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génération de positions en masse (JSONL, reprenable)")
+    parser.add_argument('-o', '--output', default='generated_positions.jsonl', help="Fichier JSONL de sortie")
+    parser.add_argument('-n', '--count', type=int, default=50, help="Nombre de positions par bucket")
+    parser.add_argument('-b', '--bucket', action='append', type=parse_bucket, default=None,
+                        help="Paramètres d'un bucket 'clé=valeur,...' (répétable ; défaut: paramètres par défaut)")
+    parser.add_argument('-w', '--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Générations simultanées")
+    parser.add_argument('--max-attempts', type=int, default=20000, help="max_attempts de chaque génération")
+    parser.add_argument('--sampler-processes', type=int, default=1,
+                        help="Processus échantillonneurs par génération")
+    parser.add_argument('--max-failures', type=int, default=10,
+                        help="Échecs consécutifs avant d'abandonner un bucket")
+    parser.add_argument('--augment', action='store_true',
+                        help="Écrire aussi les positions symétriques (sans appel moteur)")
+    parser.add_argument('--strategy', choices=[AUTO] + list(STRATEGIES),
+                        help="Stratégie de génération ('auto' : la moins chère de chaque bucket ; "
+                             "défaut: GENERATION_STRATEGY)")
+    parser.add_argument('--report-interval', type=float, default=10, help="Secondes entre deux résumés")
+    args = parser.parse_args(argv)
+
+    from backend.chess_generator import engine_pool, generate_fen_position
+
+    generator = BulkGenerator(
+        generate_fen_position,
+        Path(args.output),
+        args.bucket or [dict(DEFAULT_PARAMS)],
+        args.count,
+        workers=max(1, args.workers),
+        max_attempts=args.max_attempts,
+        sampler_processes=args.sampler_processes,
+        max_failures=args.max_failures,
+        engine_stats=engine_pool.stats,
+        augment=args.augment,
+        strategy=args.strategy,
+    )
+    generator.run(report_interval=args.report_interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Processus échantillonneurs du générateur.
+
+Ce module est préchargé par le serveur forkserver (voir chess_generator) :
+il ne doit avoir aucun effet de bord à l'import. Pas de pool de moteurs, de
+cache d'évaluations ni de statistiques ici, seulement la table des
+compositions, l'échantillonneur vectorisé et le pré-filtre statique.
+"""
+import queue
+import random
+
+import numpy as np
+
+from backend.batch_sampler import sample_legal_positions
+from backend.compositions import composition_table
+from backend.static_eval import is_plausible
+
+ATTEMPTS_CHUNK = 512  # Tentatives réservées d'un coup (= taille d'un lot vectorisé)
+
+
+def generate_candidate_batch(max_material, material_diff, excluded_pieces, batch_size, np_rng):
+    """
+    Génère un lot de candidats avec l'échantillonneur vectorisé.
+
+    Les compositions sont tirées dans la table exacte des compositions
+    réalisables (compensation matérielle et différence de pièces déjà
+    appliquées), placées en bloc et filtrées par les contrôles de légalité
+    vectorisés. Seuls les survivants deviennent des chess.Board.
+
+    Args:
+        max_material: Matériel maximum par côté
+        material_diff: Différence matérielle minimum
+        excluded_pieces: Liste des pièces à exclure
+        batch_size: Nombre de tentatives du lot
+        np_rng: numpy.random.Generator
+
+    Returns:
+        Tuple (candidats [(fen, board, white_mat, black_mat, indice de composition)],
+        nb de positions légales)
+    """
+    table = composition_table(max_material, material_diff, excluded_pieces)
+    indices = table.sample_indices(np_rng, batch_size)
+    strong_is_white = np_rng.random(batch_size) < 0.5
+    
+    compositions = []
+    materials = []
+    for index, white_is_strong in zip(indices, strong_is_white):
+        pieces_strong, pieces_weak, strong_mat, weak_mat = table.entries[index]
+        if white_is_strong:
+            compositions.append((pieces_strong, pieces_weak))
+            materials.append((strong_mat, weak_mat))
+        else:
+            compositions.append((pieces_weak, pieces_strong))
+            materials.append((weak_mat, strong_mat))
+    
+    candidates = []
+    for index, fen, board in sample_legal_positions(compositions, np_rng):
+        white_mat, black_mat = materials[index]
+        candidates.append((fen, board, white_mat, black_mat, int(indices[index])))
+    return candidates, len(candidates)
+
+
+def candidate_sampler(params, candidate_queue, stop_event, attempts_counter, legal_counter, static_counters,
+                      max_attempts, seed):
+    """
+    Processus producteur : génère des candidats jusqu'à épuisement du budget
+    de tentatives partagé ou jusqu'à l'arrêt demandé.
+
+    Args:
+        params: (max_material, material_diff, excluded_pieces, static_filter, weights) où
+            static_filter vaut None ou (windows, margin, audit_rate) et weights
+            les poids de tirage des compositions (None = poids par défaut)
+        candidate_queue: File bornée des candidats (fen, white_mat, black_mat, audit, composition)
+        stop_event: Événement d'arrêt partagé
+        attempts_counter: Compteur partagé de tentatives (multiprocessing.Value)
+        legal_counter: Compteur partagé de positions légales produites
+        static_counters: Compteurs partagés du pré-filtre [examinés, rejetés]
+        max_attempts: Budget total de tentatives
+        seed: Graine propre au processus
+    """
+    # Sans cela, des échantillonneurs forkés partageraient le même état aléatoire
+    random.seed(seed)
+    np_rng = np.random.default_rng(seed)
+    candidate_queue.cancel_join_thread()
+    max_material, material_diff, excluded_pieces, static_filter, weights = params
+    if weights is not None:
+        # La table est propre au processus : les poids ne valent que pour cette génération
+        composition_table(max_material, material_diff, excluded_pieces).set_weights(weights)
+    
+    while not stop_event.is_set():
+        with attempts_counter.get_lock():
+            budget = min(ATTEMPTS_CHUNK, max_attempts - attempts_counter.value)
+            if budget <= 0:
+                return
+            attempts_counter.value += budget
+        
+        candidates, n_legal = generate_candidate_batch(max_material, material_diff, excluded_pieces, budget, np_rng)
+        with legal_counter.get_lock():
+            legal_counter.value += n_legal
+        
+        if static_filter is not None:
+            windows, margin, audit_rate = static_filter
+            kept = []
+            for fen, board, white_mat, black_mat, composition in candidates:
+                if board.is_check() or is_plausible(board, windows, margin)[0]:
+                    kept.append((fen, white_mat, black_mat, False, composition))
+                elif audit_rate and random.random() < audit_rate:
+                    kept.append((fen, white_mat, black_mat, True, composition))
+            with static_counters.get_lock():
+                static_counters[0] += len(candidates)
+                static_counters[1] += len(candidates) - sum(1 for item in kept if not item[3])
+        else:
+            kept = [(fen, white_mat, black_mat, False, composition)
+                    for fen, _, white_mat, black_mat, composition in candidates]
+        
+        for item in kept:
+            while not stop_event.is_set():
+                try:
+                    candidate_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                return
@@ -1,11 +1,28 @@
 import chess
 import chess.engine
+import json
+import multiprocessing
+import queue
 import random
 import os
 import sys
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 
+from backend.adaptive_sampling import SamplingStats, composition_key, sampling_bucket
+from backend.candidate_sampler import ATTEMPTS_CHUNK, candidate_sampler, generate_candidate_batch
+from backend.compositions import MATERIAL_VALUES, composition_table
+from backend.engine_calibration import load_engine_profile
+from backend.engine_pool import create_engine_pool
+from backend.engine_scheduler import BACKGROUND, INTERACTIVE, create_engine_scheduler
+from backend.generation_strategies import AUTO, STRATEGIES, StrategyStats, get_strategy
+from backend.eval_cache import EvaluationCache
+from backend.position_dedup import DedupIndex
+from backend.static_eval import is_plausible
+from backend.symmetry import symmetric_variants
+
 # --- CORRECTION CRITIQUE DU CHEMIN ---
 BASE_DIR = Path(__file__).parent.parent
 
@@ -16,7 +33,8 @@ else:  # Linux/Unix
     STOCKFISH_EXECUTABLE = "stockfish"  # NOM SIMPLIFIÉ
     STOCKFISH_PATH = BASE_DIR / "stockfish" / STOCKFISH_EXECUTABLE
 
-STOCKFISH_PATH = str(STOCKFISH_PATH)
+# Permet de pointer vers un autre binaire (installation système, moteur de test...)
+STOCKFISH_PATH = os.environ.get('STOCKFISH_PATH', str(STOCKFISH_PATH))
 
 # Vérification au démarrage
 if not os.path.exists(STOCKFISH_PATH):
@@ -34,180 +52,90 @@ else:
 
 # --- FIN DE LA CORRECTION CRITIQUE ---
 
-STOCKFISH_DEPTH = 26
-STOCKFISH_TIME_LIMIT = 0.5
+# --- Profil moteur calibré ---
+# Threads, Hash, taille du pool et limites de recherche mesurés sur la machine
+# par backend/engine_calibration.py. Les variables d'environnement restent
+# prioritaires ; sans profil, valeurs par défaut historiques.
+ENGINE_PROFILE_PATH = os.environ.get('ENGINE_PROFILE_PATH', str(BASE_DIR / 'backend' / 'engine_profile.json'))
+ENGINE_PROFILE = load_engine_profile(ENGINE_PROFILE_PATH or None)
 
-MATERIAL_VALUES = {
-    chess.PAWN: 1,
-    chess.KNIGHT: 3,
-    chess.BISHOP: 3,
-    chess.ROOK: 5,
-    chess.QUEEN: 9,
-}
+def _profile_setting(env_name, key, default, cast=int):
+    if env_name in os.environ:
+        return cast(os.environ[env_name]) if os.environ[env_name] else None
+    return ENGINE_PROFILE.get(key, default)
 
-# --- Initialisation du moteur Stockfish (à l'extérieur de la fonction generate_fen_position) ---
-# On tente de l'initialiser une fois pour toutes.
-engine = None
-try:
-    if os.path.exists(STOCKFISH_PATH):
-        # Utilisation de SimpleEngine.popen_uci pour l'initialisation
-        engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
-        # Définir les options du moteur (si nécessaire, mais souvent non nécessaire pour SimpleEngine)
-        # engine.configure({"Threads": 2, "Hash": 1024}) 
-    else:
-        print("ERREUR FATALE: Le moteur Stockfish n'existe pas ou le chemin est incorrect.", file=sys.stderr)
-except Exception as e:
-    print(f"ERREUR lors de l'initialisation de l'Engine Stockfish: {e}", file=sys.stderr)
-    engine = None
+STOCKFISH_DEPTH = _profile_setting('STOCKFISH_DEPTH', 'depth', 26)
+STOCKFISH_TIME_LIMIT = _profile_setting('STOCKFISH_TIME_LIMIT', 'time_limit', 0.5, float)
+STOCKFISH_NODES = _profile_setting('STOCKFISH_NODES', 'nodes', None)
 
-# --- Reste des fonctions (inchangées, sauf l'appel à l'engine) ---
+# Générations avec graine : recherche bornée en profondeur et en nœuds, sans
+# limite de temps (le résultat ne doit pas dépendre de la charge de la machine)
+SEEDED_SEARCH_NODES = int(os.environ.get('SEEDED_SEARCH_NODES', STOCKFISH_NODES or 500000))
 
-def generate_pieces_with_imbalance(max_material, material_diff, excluded_pieces=None):
-    """Génère une liste de pièces garantissant un déséquilibre matériel.
-    
-    Args:
-        max_material: Matériel maximum par côté
-        material_diff: Différence matérielle entre les camps
-        excluded_pieces: Liste des types de pièces à exclure (ex: ['queen', 'rook'])
+def search_limit(reproducible=False):
     """
-    if excluded_pieces is None:
-        excluded_pieces = []
-    
-    # Convertir les noms en types chess
-    piece_mapping = {
-        'queen': chess.QUEEN,
-        'rook': chess.ROOK,
-        'bishop': chess.BISHOP,
-        'knight': chess.KNIGHT,
-        'pawn': chess.PAWN
-    }
-    
-    excluded_types = [piece_mapping.get(p) for p in excluded_pieces if p in piece_mapping]
-    
-    # Calculer les limites basées sur les paramètres
-    max_strong = min(max_material, 22)
-    min_weak = max(10, max_strong - 6)
-    
-    strong_side_material = random.randint(max_strong - 3, max_strong)
-    
-    if material_diff == 0:
-        weak_side_material = strong_side_material
-    else:
-        weak_side_material = strong_side_material - random.randint(material_diff, min(material_diff + 2, 6))
-    
-    weak_side_material = max(weak_side_material, 10)
-    
-    pieces_strong = []
-    pieces_weak = []
-    
-    for pieces_list, target_material in [(pieces_strong, strong_side_material), 
-                                         (pieces_weak, weak_side_material)]:
-        current = 0
-        # Créer la liste des pièces disponibles en excluant celles filtrées
-        available = []
-        
-        if chess.QUEEN not in excluded_types:
-            available.append(chess.QUEEN)
-        if chess.ROOK not in excluded_types:
-            available.extend([chess.ROOK, chess.ROOK])
-        if chess.BISHOP not in excluded_types:
-            available.extend([chess.BISHOP, chess.BISHOP])
-        if chess.KNIGHT not in excluded_types:
-            available.extend([chess.KNIGHT, chess.KNIGHT])
-        if chess.PAWN not in excluded_types:
-            available.extend([chess.PAWN] * 6)
-        
-        # Si aucune pièce n'est disponible, lever une erreur
-        if not available:
-            raise ValueError("Impossible de générer une position : toutes les pièces sont exclues")
-        
-        random.shuffle(available)
-        
-        for piece in available:
-            value = MATERIAL_VALUES[piece]
-            if current + value <= target_material:
-                pieces_list.append(piece)
-                current += value
-            if current >= target_material - 1:
-                break
-    
-    return pieces_strong, pieces_weak
+    Limite de la recherche profonde (profondeur, temps et/ou nœuds).
 
-def get_square_color(square: chess.Square) -> bool:
-    """Détermine la couleur de la case."""
-    return (chess.square_rank(square) + chess.square_file(square)) % 2 == 0
-
-def generate_optimized_random_fen(max_material, material_diff, excluded_pieces=None):
-    """Génère une FEN avec déséquilibre matériel intégré.
-    
     Args:
-        max_material: Matériel maximum par côté
-        material_diff: Différence matérielle
-        excluded_pieces: Liste des pièces à exclure
+        reproducible: Génération avec graine : profondeur et nœuds seulement
     """
-    board = chess.Board(None)
-    
-    king_squares = random.sample(chess.SQUARES, 2)
-    while chess.square_distance(king_squares[0], king_squares[1]) < 2:
-        king_squares = random.sample(chess.SQUARES, 2)
-    
-    board.set_piece_at(king_squares[0], chess.Piece(chess.KING, chess.WHITE))
-    board.set_piece_at(king_squares[1], chess.Piece(chess.KING, chess.BLACK))
-    
-    available_squares = list(set(chess.SQUARES) - set(king_squares))
-    random.shuffle(available_squares)
-    
-    pieces_strong, pieces_weak = generate_pieces_with_imbalance(max_material, material_diff, excluded_pieces)
-    
-    if random.choice([True, False]):
-        white_pieces, black_pieces = pieces_strong, pieces_weak
-    else:
-        white_pieces, black_pieces = pieces_weak, pieces_strong
-    
-    bishops_on_light = {chess.WHITE: False, chess.BLACK: False}
-    bishops_on_dark = {chess.WHITE: False, chess.BLACK: False}
-    
-    for color, pieces_list in [(chess.WHITE, white_pieces), (chess.BLACK, black_pieces)]:
-        for piece_type in pieces_list:
-            if not available_squares:
-                break
-            
-            valid_squares = available_squares[:]
-            
-            if piece_type == chess.PAWN:
-                valid_squares = [sq for sq in valid_squares if chess.square_rank(sq) not in (0, 7)]
-            
-            elif piece_type == chess.BISHOP:
-                allowed = []
-                if not bishops_on_light[color]:
-                    allowed.extend([sq for sq in valid_squares if get_square_color(sq)])
-                if not bishops_on_dark[color]:
-                    allowed.extend([sq for sq in valid_squares if not get_square_color(sq)])
-                valid_squares = allowed
-            
-            if not valid_squares:
-                continue
-            
-            square = random.choice(valid_squares)
-            
-            if piece_type == chess.BISHOP:
-                if get_square_color(square):
-                    bishops_on_light[color] = True
-                else:
-                    bishops_on_dark[color] = True
-            
-            board.set_piece_at(square, chess.Piece(piece_type, color))
-            available_squares.remove(square)
-    
-    fen_parts = board.fen().split(' ')
-    white_turn = random.choice([True, False])
-    fen_parts[1] = 'w' if white_turn else 'b'
-    fen_parts[2] = '-'
-    fen_parts[3] = '-'
-    fen_parts[4] = '0'
-    fen_parts[5] = str(random.randint(10, 50))
-    
-    return ' '.join(fen_parts), board
+    if reproducible:
+        return chess.engine.Limit(depth=STOCKFISH_DEPTH, nodes=SEEDED_SEARCH_NODES)
+    return chess.engine.Limit(depth=STOCKFISH_DEPTH, time=STOCKFISH_TIME_LIMIT, nodes=STOCKFISH_NODES)
+
+# --- Pool de moteurs Stockfish ---
+# Les moteurs sont démarrés à la demande puis réutilisés d'un batch à l'autre
+# (plus de popen_uci / chargement NNUE / handshake UCI à chaque batch).
+# Par défaut chaque moteur tourne sur un seul thread : le parallélisme vient du nombre de moteurs.
+STOCKFISH_OPTIONS = {
+    "Threads": _profile_setting('STOCKFISH_THREADS', 'threads', 1),
+    "Hash": _profile_setting('STOCKFISH_HASH_MB', 'hash_mb', 16),
+}
+STOCKFISH_PIN_CPUS = _profile_setting('STOCKFISH_PIN_CPUS', 'pin_cpus', False, lambda v: v != '0')
+
+engine_pool = create_engine_pool(STOCKFISH_PATH,
+                                 size=None if 'STOCKFISH_POOL_SIZE' in os.environ else ENGINE_PROFILE.get('pool_size'),
+                                 options=STOCKFISH_OPTIONS, pin_cpus=STOCKFISH_PIN_CPUS)
+# Créneaux de recherche attribués par priorité et par client (voir engine_scheduler)
+engine_scheduler = create_engine_scheduler(engine_pool.size)
+
+# --- Cache des évaluations (LRU mémoire + SQLite) ---
+# Une entrée n'est réutilisée pour la passe profonde que si elle a atteint
+# CACHE_DEEP_MIN_DEPTH : la limite temps coupe souvent avant STOCKFISH_DEPTH.
+EVAL_CACHE_PATH = os.environ.get('EVAL_CACHE_PATH', str(BASE_DIR / 'backend' / 'eval_cache.sqlite3'))
+CACHE_DEEP_MIN_DEPTH = int(os.environ.get('EVAL_CACHE_DEEP_MIN_DEPTH', 16))
+
+eval_cache = EvaluationCache(EVAL_CACHE_PATH or None,
+                             max_memory_entries=int(os.environ.get('EVAL_CACHE_MEMORY_ENTRIES', 100000)))
+
+# --- Échantillonnage adaptatif des compositions ---
+# Acceptations par bucket et par composition, persistées entre les exécutions
+# et utilisées pour biaiser le tirage (voir backend/adaptive_sampling.py).
+ADAPTIVE_SAMPLING_ENABLED = os.environ.get('ADAPTIVE_SAMPLING', '1') != '0'
+SAMPLING_STATS_PATH = os.environ.get('SAMPLING_STATS_PATH', str(BASE_DIR / 'backend' / 'sampling_stats.json'))
+
+sampling_stats = SamplingStats(SAMPLING_STATS_PATH or None,
+                               exploration=float(os.environ.get('ADAPTIVE_SAMPLING_EXPLORATION', 0.2)),
+                               min_evaluations=int(os.environ.get('ADAPTIVE_SAMPLING_MIN_EVALUATIONS', 200)))
+
+# --- Stratégies de génération ---
+# Placement aléatoire ou partie guidée par le moteur ; en mode 'auto', la
+# moins chère (secondes moteur par position) de chaque bucket de paramètres
+# (voir backend/generation_strategies.py).
+GENERATION_STRATEGY = os.environ.get('GENERATION_STRATEGY', AUTO)
+STRATEGY_STATS_PATH = os.environ.get('STRATEGY_STATS_PATH', str(BASE_DIR / 'backend' / 'strategy_stats.json'))
+
+strategy_stats = StrategyStats(STRATEGY_STATS_PATH or None,
+                               exploration=float(os.environ.get('STRATEGY_EXPLORATION', 0.1)),
+                               min_generations=int(os.environ.get('STRATEGY_MIN_GENERATIONS', 5)))
+
+# --- Positions déjà connues (bibliothèque + positions acceptées) ---
+# Un candidat équivalent (à une symétrie près) à une position connue n'est
+# pas soumis au moteur.
+known_positions = DedupIndex(symmetric=True)
+
+if not os.path.exists(STOCKFISH_PATH):
+    print("ERREUR FATALE: Le moteur Stockfish n'existe pas ou le chemin est incorrect.", file=sys.stderr)
 
 def is_fen_legal(fen_and_board: tuple):
     """Vérifie légalité basique."""
@@ -256,60 +184,440 @@ def check_piece_difference(board: chess.Board, min_piece_diff: int):
     
     return major_diff >= min_piece_diff or minor_diff >= min_piece_diff
 
+def format_score(score):
+    """Convertit un score (point de vue des Blancs) en (centipions, texte)."""
+    if score.is_mate():
+        evaluation_cp = 99999 if score.mate() > 0 else -99999
+        evaluation_str = f"Mat en {score.mate()}"
+    else:
+        evaluation_cp = score.cp
+        evaluation_str = f"{evaluation_cp / 100.0:+.2f}"
+    return evaluation_cp, evaluation_str
+
+def analyse_cached(pooled, board, limit, multipv, min_depth, use_cache=True):
+    """
+    Analyse une position en passant d'abord par le cache d'évaluations.
+
+    Args:
+        pooled: PooledEngine emprunté au pool
+        board: Position à analyser
+        limit: Limite de recherche si le cache ne suffit pas
+        multipv: Nombre de lignes principales demandées
+        min_depth: Profondeur minimale qu'une entrée du cache doit avoir atteinte
+        use_cache: Lire le cache (False pour une génération reproductible : une
+            entrée a pu être calculée avec une autre limite de recherche)
+
+    Returns:
+        Tuple (scores_cp, scores_str), une valeur par ligne (point de vue des Blancs)
+    """
+    cached = eval_cache.get(board, min_depth, multipv, engine_version=pooled.version) if use_cache else None
+    if cached:
+        return cached['scores_cp'][:multipv], cached['scores_str'][:multipv]
+    
+    info = pooled.analyse(board, limit, multipv=multipv)
+    scores = [format_score(pv_info["score"].white()) for pv_info in info]
+    scores_cp = [cp for cp, _ in scores]
+    scores_str = [text for _, text in scores]
+    depth = min(pv_info.get("depth", 0) for pv_info in info)
+    eval_cache.put(board, scores_cp, scores_str, depth, engine_version=pooled.version)
+    return scores_cp, scores_str
+
+def evaluate_fen(pooled, fen: str, reproducible=False):
+    """
+    Évalue une position (2 lignes principales) avec un moteur du pool.
+
+    Args:
+        pooled: PooledEngine emprunté au pool
+        fen: Position à analyser
+        reproducible: Génération avec graine (voir search_limit), sans lecture du cache
+
+    Returns:
+        Tuple (scores_cp, scores_str) ou (None, None) si l'analyse a échoué
+    """
+    try:
+        scores_cp, scores_str = analyse_cached(
+            pooled, chess.Board(fen),
+            search_limit(reproducible),
+            multipv=2, min_depth=CACHE_DEEP_MIN_DEPTH, use_cache=not reproducible)
+        
+        if len(scores_cp) < 2:
+            return None, None
+        
+        return scores_cp, scores_str
+    except Exception:
+        return None, None
+
 def get_stockfish_evaluation_batch(fens: list):
-    """Évalue plusieurs positions en batch."""
-    # Utilise l'objet engine initialisé globalement
-    if not engine:
+    """Évalue plusieurs positions en batch avec un moteur emprunté au pool."""
+    if not os.path.exists(STOCKFISH_PATH):
+        print("Engine non trouvé pour l'analyse en batch.", file=sys.stderr)
         return [(None, None)] * len(fens)
 
     results = []
     
-    # Ouvrir l'engine de nouveau pour éviter les problèmes de timeout/thread (solution plus robuste)
-    temp_engine = None
+    with engine_pool.engine() as pooled:
+        for fen in fens:
+            results.append(evaluate_fen(pooled, fen))
+            if pooled.broken:
+                # Moteur planté : on le rend au pool (qui le redémarrera)
+                # et on poursuit le batch avec un autre moteur.
+                break
+
+    if len(results) < len(fens):
+        results.extend(get_stockfish_evaluation_batch(fens[len(results):]))
+
+    return results
+
+def is_in_eval_window(cp, negative_min, negative_max, positive_min, positive_max):
+    """Vérifie qu'une évaluation tombe dans l'une des deux fenêtres cibles."""
+    return (negative_min <= cp <= negative_max) or (positive_min <= cp <= positive_max)
+
+# --- Cascade d'évaluation ---
+# 1. Passe rapide (multipv=1, faible profondeur) : élimine les positions très
+#    loin des fenêtres, élargies de 'shallow_margin' centipions.
+# 2. Recherche profonde sur la ligne 1 uniquement.
+# 3. Seulement si la ligne 1 est dans la fenêtre : recherche à 2 lignes.
+CASCADE_CONFIG = {
+    'enabled': os.environ.get('CASCADE_ENABLED', '1') != '0',
+    'shallow_depth': int(os.environ.get('CASCADE_SHALLOW_DEPTH', 8)),
+    'shallow_nodes': int(os.environ['CASCADE_SHALLOW_NODES']) if os.environ.get('CASCADE_SHALLOW_NODES') else None,
+    'shallow_margin': int(os.environ.get('CASCADE_SHALLOW_MARGIN', 100)),
+}
+
+_cascade_lock = threading.Lock()
+CASCADE_STATS = {
+    'candidates': 0,
+    'rejected_shallow': 0,
+    'rejected_deep_line1': 0,
+    'rejected_deep_line2': 0,
+    'accepted': 0,
+    'engine_errors': 0,
+}
+
+def _count_cascade(key):
+    with _cascade_lock:
+        CASCADE_STATS[key] += 1
+
+def get_cascade_stats():
+    """
+    Retourne le nombre de positions écartées par chaque étage de la cascade.
+
+    Returns:
+        dict: Compteurs et taux de rejet par étage
+    """
+    with _cascade_lock:
+        stats = dict(CASCADE_STATS)
+    total = stats['candidates']
+    stats['shallow_rejection_rate'] = round(stats['rejected_shallow'] / total, 4) if total else 0.0
+    stats['acceptance_rate'] = round(stats['accepted'] / total, 4) if total else 0.0
+    stats['config'] = dict(CASCADE_CONFIG)
+    return stats
+
+def evaluate_candidate(pooled, fen: str, windows, reproducible=False):
+    """
+    Évalue un candidat à travers la cascade peu profonde puis profonde.
+
+    Args:
+        pooled: PooledEngine emprunté au pool
+        fen: Position à analyser
+        windows: (negative_min, negative_max, positive_min, positive_max)
+        reproducible: Génération avec graine : limites sans temps (voir
+            search_limit) et cache d'évaluations ignoré
+
+    Returns:
+        Tuple (accepté, scores_str, score_cp) — scores_str contient les 2 lignes
+        si accepté ; score_cp est la meilleure estimation de la ligne 1 (None si
+        le moteur a échoué)
+    """
+    if not CASCADE_CONFIG['enabled']:
+        scores_cp, scores_str = evaluate_fen(pooled, fen, reproducible)
+        accepted = bool(scores_cp) and len(scores_cp) >= 2 and all(
+            is_in_eval_window(cp, *windows) for cp in scores_cp[:2])
+        return accepted, scores_str, scores_cp[0] if scores_cp else None
+    
+    _count_cascade('candidates')
+    negative_min, negative_max, positive_min, positive_max = windows
+    margin = CASCADE_CONFIG['shallow_margin']
+    board = chess.Board(fen)
+    score_cp = None
+    use_cache = not reproducible
+    # Passe rapide plafonnée au budget temps de la passe profonde, sauf en mode reproductible
+    time_limit = None if reproducible else STOCKFISH_TIME_LIMIT
+    
     try:
-        if os.path.exists(STOCKFISH_PATH):
-            temp_engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
+        # Étage 1 : passe rapide
+        if CASCADE_CONFIG['shallow_nodes']:
+            shallow_limit = chess.engine.Limit(nodes=CASCADE_CONFIG['shallow_nodes'], time=time_limit)
+            shallow_min_depth = 1
         else:
-             print("Engine non trouvé pour l'analyse en batch.", file=sys.stderr)
-             return [(None, None)] * len(fens)
-             
-        for fen in fens:
-            try:
-                board = chess.Board(fen)
-                info = temp_engine.analyse(board, 
-                                         chess.engine.Limit(depth=STOCKFISH_DEPTH, 
-                                                               time=STOCKFISH_TIME_LIMIT),
-                                         multipv=2)
-                
-                if len(info) < 2:
-                    results.append((None, None))
-                    continue
-                
-                scores_cp = []
-                scores_str = []
-                
-                for pv_info in info:
-                    score = pv_info["score"].white()
-                    if score.is_mate():
-                        evaluation_cp = 99999 if score.mate() > 0 else -99999
-                        evaluation_str = f"Mat en {score.mate()}"
+            shallow_limit = chess.engine.Limit(depth=CASCADE_CONFIG['shallow_depth'], time=time_limit)
+            shallow_min_depth = CASCADE_CONFIG['shallow_depth']
+        shallow_cp, _ = analyse_cached(pooled, board, shallow_limit, 1, shallow_min_depth, use_cache)
+        score_cp = shallow_cp[0]
+        if not is_in_eval_window(score_cp, negative_min - margin, negative_max + margin,
+                                 positive_min - margin, positive_max + margin):
+            _count_cascade('rejected_shallow')
+            return False, None, score_cp
+        
+        deep_limit = search_limit(reproducible)
+        
+        # Étage 2 : recherche profonde, ligne 1 seulement
+        line1_cp, _ = analyse_cached(pooled, board, deep_limit, 1, CACHE_DEEP_MIN_DEPTH, use_cache)
+        score_cp = line1_cp[0]
+        if not is_in_eval_window(score_cp, *windows):
+            _count_cascade('rejected_deep_line1')
+            return False, None, score_cp
+        
+        # Étage 3 : deuxième ligne (le hash du moteur est déjà chaud)
+        scores_cp, scores_str = analyse_cached(pooled, board, deep_limit, 2, CACHE_DEEP_MIN_DEPTH, use_cache)
+        if len(scores_cp) < 2 or not all(is_in_eval_window(cp, *windows) for cp in scores_cp[:2]):
+            _count_cascade('rejected_deep_line2')
+            return False, None, score_cp
+    except Exception:
+        _count_cascade('engine_errors')
+        return False, None, score_cp
+    
+    _count_cascade('accepted')
+    return True, scores_str[:2], scores_cp[0]
+
+def window_distance(cp, windows):
+    """
+    Distance (en centipions) entre un score et la fenêtre d'évaluation la plus proche.
+
+    Args:
+        cp: Score en centipions (point de vue des Blancs)
+        windows: (negative_min, negative_max, positive_min, positive_max)
+
+    Returns:
+        0 si le score est dans une des fenêtres, sinon l'écart minimal
+    """
+    negative_min, negative_max, positive_min, positive_max = windows
+    return min(max(negative_min - cp, 0, cp - negative_max),
+               max(positive_min - cp, 0, cp - positive_max))
+
+# --- Pipeline parallèle producteurs / consommateurs ---
+# Des processus échantillonneurs produisent des candidats (légaux et compensés)
+# dans une file bornée ; autant de threads que de moteurs du pool les évaluent.
+# Le premier candidat accepté arrête tout le monde.
+
+SAMPLER_PROCESSES = int(os.environ.get('GENERATOR_SAMPLER_PROCESSES', max(1, (os.cpu_count() or 2) // 2)))
+CANDIDATE_QUEUE_SIZE = 32
+PROGRESS_INTERVAL = 0.5  # Secondes entre deux rapports de progression / vérifications d'annulation
+
+# Pré-filtre statique dans les échantillonneurs : les candidats dont
+# l'évaluation statique est à plus de 'margin' centipions des fenêtres ne sont
+# pas envoyés au moteur. Une fraction 'audit_rate' des rejets est tout de même
+# analysée (ligne 1 profonde) pour mesurer le taux de faux rejets.
+# Calibrage de la marge : python -m backend.static_eval --samples 300
+STATIC_FILTER_CONFIG = {
+    'enabled': os.environ.get('STATIC_PREFILTER', '1') != '0',
+    'margin': int(os.environ.get('STATIC_PREFILTER_MARGIN', 700)),
+    'audit_rate': float(os.environ.get('STATIC_PREFILTER_AUDIT_RATE', 0.0)),
+}
+
+_static_filter_lock = threading.Lock()
+STATIC_FILTER_STATS = {
+    'examined': 0,
+    'rejected': 0,
+    'audited': 0,
+    'false_rejections': 0,
+}
+
+def _count_static_filter(**counts):
+    with _static_filter_lock:
+        for key, value in counts.items():
+            STATIC_FILTER_STATS[key] += value
+
+def get_static_filter_stats():
+    """
+    Retourne l'effet du pré-filtre statique.
+
+    Returns:
+        dict: Compteurs, part des appels moteur économisés et taux de faux
+        rejets mesuré sur les rejets audités
+    """
+    with _static_filter_lock:
+        stats = dict(STATIC_FILTER_STATS)
+    stats['engine_calls_saved_rate'] = round(stats['rejected'] / stats['examined'], 4) if stats['examined'] else 0.0
+    stats['false_rejection_rate'] = round(stats['false_rejections'] / stats['audited'], 4) if stats['audited'] else None
+    stats['config'] = dict(STATIC_FILTER_CONFIG)
+    return stats
+
+class GenerationCancelled(Exception):
+    """La génération a été annulée avant de trouver une position."""
+
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    # Pas de fork() direct d'un processus qui fait tourner des threads moteurs
+    _mp_context = multiprocessing.get_context('forkserver')
+    # Module sans effet de bord à l'import (ni pool de moteurs, ni cache, ni statistiques)
+    _mp_context.set_forkserver_preload(['backend.candidate_sampler'])
+else:
+    _mp_context = multiprocessing.get_context('spawn')
+
+def _audit_static_rejection(pooled, fen, windows):
+    """Analyse (ligne 1 profonde) un candidat écarté par le pré-filtre statique."""
+    limit = search_limit()
+    try:
+        scores_cp, _ = analyse_cached(pooled, chess.Board(fen), limit, 1, CACHE_DEEP_MIN_DEPTH)
+    except Exception:
+        return
+    _count_static_filter(audited=1, false_rejections=int(is_in_eval_window(scores_cp[0], *windows)))
+
+def _playout_candidate(pooled, playout, outcome, should_stop):
+    """
+    Produit un candidat avec une stratégie guidée par le moteur.
+
+    Le temps moteur du guidage est compté dans outcome['engine_seconds'] et
+    les positions examinées dans le budget de tentatives. La partie est
+    abandonnée dès que should_stop() est vrai.
+
+    Returns:
+        Candidat au format de la file (fen, white_mat, black_mat, audit, composition) ou None
+    """
+    started = time.monotonic()
+    board, white_mat, black_mat, composition, plies = playout['strategy'].candidate(
+        pooled, playout['table'], playout['rng'], should_stop)
+    with outcome['lock']:
+        outcome['engine_seconds'] += time.monotonic() - started
+    with playout['attempts'].get_lock():
+        playout['attempts'].value += plies
+    if board is None:
+        return None
+    with playout['legal'].get_lock():
+        playout['legal'].value += 1
+
+    static_filter, static_counters = playout['static_filter'], playout['static_counters']
+    if static_filter is not None:
+        windows, margin, _ = static_filter
+        rejected = not board.is_check() and not is_plausible(board, windows, margin)[0]
+        with static_counters.get_lock():
+            static_counters[0] += 1
+            static_counters[1] += int(rejected)
+        if rejected:
+            return None
+    return board.fen(), white_mat, black_mat, False, composition
+
+def _engine_consumer(candidate_queue, stop_event, samplers, windows, outcome, sampling=None,
+                     priority=INTERACTIVE, client=None, skip_known=True, playout=None, reproducible=False):
+    """
+    Thread consommateur : évalue les candidats avec un moteur du pool.
+
+    Args:
+        candidate_queue: File des candidats
+        stop_event: Événement d'arrêt partagé
+        samplers: Processus producteurs (pour détecter la fin de production)
+        windows: (negative_min, negative_max, positive_min, positive_max)
+        outcome: Dictionnaire partagé recevant la première position acceptée
+            et le meilleur candidat vu jusqu'ici
+        sampling: (bucket, table de compositions) pour les statistiques
+            d'échantillonnage adaptatif, ou None
+        priority: Classe de priorité auprès de l'ordonnanceur
+        client: Identifiant du demandeur (partage équitable)
+        skip_known: Ne pas évaluer les candidats équivalents à une position connue
+        playout: Candidats produits ici par une stratégie guidée par le moteur
+            (dict: strategy, table, rng, attempts, legal, max_attempts,
+            static_filter, static_counters) au lieu de la file
+        reproducible: Génération avec graine : hash du moteur vidé avant chaque
+            candidat, limites sans temps et cache d'évaluations ignoré
+    """
+    while not stop_event.is_set():
+        slot = engine_scheduler.acquire(priority, client, cancel_event=stop_event)
+        if slot is None:
+            return
+        preempted = False
+
+        def should_stop():
+            return stop_event.is_set() or slot.should_yield()
+
+        try:
+            with engine_pool.engine() as pooled:
+                while not stop_event.is_set() and not pooled.broken:
+                    if slot.should_yield():
+                        # Créneau rendu à un demandeur plus prioritaire ou moins servi
+                        preempted = True
+                        break
+                    if reproducible:
+                        # Le résultat ne doit pas dépendre des analyses précédentes du moteur
+                        pooled.new_game()
+                    if playout is not None:
+                        if playout['attempts'].value >= playout['max_attempts']:
+                            return
+                        item = _playout_candidate(pooled, playout, outcome, should_stop)
+                        if item is None:
+                            continue
+                        fen, w_mat, b_mat, audit, composition = item
                     else:
-                        evaluation_cp = score.cp
-                        evaluation_str = f"{evaluation_cp / 100.0:+.2f}"
+                        try:
+                            fen, w_mat, b_mat, audit, composition = candidate_queue.get(timeout=0.1)
+                        except queue.Empty:
+                            if not any(p.is_alive() for p in samplers):
+                                return
+                            continue
                     
-                    scores_cp.append(evaluation_cp)
-                    scores_str.append(evaluation_str)
-                
-                results.append((scores_cp, scores_str))
-            except Exception:
-                results.append((None, None))
-    finally:
-        if temp_engine:
-            temp_engine.quit()
+                    if audit:
+                        _audit_static_rejection(pooled, fen, windows)
+                        continue
+                    
+                    if skip_known and known_positions.contains(fen):
+                        continue
+                    
+                    started = time.monotonic()
+                    accepted, scores_str, score_cp = evaluate_candidate(pooled, fen, windows, reproducible)
+                    engine_seconds = time.monotonic() - started
+                    if sampling is not None and score_cp is not None:
+                        bucket, table = sampling
+                        sampling_stats.record(bucket, composition_key(table.entries[composition]), accepted)
+                    with outcome['lock']:
+                        outcome['evaluations'] += 1
+                        outcome['engine_seconds'] += engine_seconds
+                        if score_cp is not None:
+                            distance = window_distance(score_cp, windows)
+                            best = outcome['best']
+                            if best is None or distance < best['distance_cp']:
+                                outcome['best'] = {'fen': fen, 'score_cp': score_cp, 'distance_cp': distance}
+                    
+                    if accepted:
+                        with outcome['lock']:
+                            if outcome['result'] is None:
+                                outcome['result'] = (fen, w_mat, b_mat, scores_str)
+                                known_positions.add(fen)
+                        stop_event.set()
+                        return
+        finally:
+            engine_scheduler.release(slot, preempted=preempted)
+        # Moteur planté (rendu au pool) ou créneau cédé : on repart avec un nouveau créneau
 
-    return results
+# --- Cache des résultats des générations avec graine ---
+# Une génération avec graine est rejouable : même graine + mêmes paramètres +
+# même configuration moteur donnent la même position, servie ici sans calcul.
+RESULT_CACHE_SIZE = int(os.environ.get('GENERATION_RESULT_CACHE_SIZE', 256))
+
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+def engine_config():
+    """Configuration moteur et filtres dont dépend le résultat d'une génération."""
+    return {
+        'engine_version': engine_pool.stats()['engine_version'],
+        'options': STOCKFISH_OPTIONS,
+        'depth': STOCKFISH_DEPTH,
+        'time_limit': STOCKFISH_TIME_LIMIT,
+        'nodes': STOCKFISH_NODES,
+        'seeded_nodes': SEEDED_SEARCH_NODES,
+        'cascade': CASCADE_CONFIG,
+        'static_filter': {k: STATIC_FILTER_CONFIG[k] for k in ('enabled', 'margin')},
+    }
 
-def generate_fen_position(negative_min=-99, negative_max=-15, positive_min=15, positive_max=99, material_diff=3, max_material=22, max_attempts=20000, excluded_pieces=None):
+def _result_cache_key(params, seed):
+    """Clé du cache des résultats, ou None tant que la version du moteur est inconnue (aucun moteur démarré)."""
+    config = engine_config()
+    if config['engine_version'] is None:
+        return None
+    return json.dumps({'params': params, 'seed': seed, 'engine': config}, sort_keys=True)
+
+def generate_fen_position(negative_min=-99, negative_max=-15, positive_min=15, positive_max=99, material_diff=3, max_material=22, max_attempts=20000, excluded_pieces=None, sampler_processes=None,
+                          progress_callback=None, cancel_event=None, deadline=None, priority=INTERACTIVE, client=None,
+                          augment=False, seed=None, strategy=None):
     """Fonction principale appelée par l'API
     
     Args:
@@ -321,12 +629,36 @@ def generate_fen_position(negative_min=-99, negative_max=-15, positive_min=15, p
         max_material: Matériel maximum par côté (10-25)
         max_attempts: Nombre maximum de tentatives
         excluded_pieces: Liste des types de pièces à exclure (['queen', 'rook', etc.])
+        sampler_processes: Nombre de processus échantillonneurs (défaut: SAMPLER_PROCESSES)
+        progress_callback: Appelée toutes les PROGRESS_INTERVAL secondes avec un dict
+            (attempts, legal_positions, legality_rate, engine_evaluations, static_rejected,
+            best_candidate, elapsed_seconds)
+        cancel_event: Événement (is_set()) demandant l'arrêt de la recherche
+        deadline: Instant limite (time.time()) au-delà duquel la recherche est abandonnée
+        priority: Classe de priorité des recherches (INTERACTIVE, MATCHMAKING, BACKGROUND)
+        client: Identifiant du demandeur, pour le partage équitable du moteur entre clients
+        augment: Ajoute sous 'augmented' les positions symétriques (miroir des
+            colonnes, inversion des couleurs) qui restent dans les fenêtres
+        seed: Graine (entier) pour une génération reproductible : un seul
+            échantillonneur et un seul consommateur, candidats évalués dans
+            l'ordre, sans biais adaptatif ni exclusion des positions connues,
+            recherches bornées en profondeur et en nœuds (SEEDED_SEARCH_NODES)
+            sans limite de temps, hash vidé avant chaque candidat et cache
+            d'évaluations ignoré. Reproductible à moteur et options identiques
+            (Threads=1 : une recherche multi-thread ne l'est pas). Le résultat
+            est mis en cache (paramètres, graine, configuration moteur)
+        strategy: Stratégie de génération ('placement', 'playout'...) ou 'auto'
+            (défaut: GENERATION_STRATEGY) pour la moins chère du bucket ; seules
+            les générations BACKGROUND explorent. Avec une graine, 'auto'
+            désigne la stratégie par défaut
+    
+    Raises:
+        GenerationCancelled: Si cancel_event est levé avant qu'une position soit trouvée
+        TimeoutError: Si deadline est dépassé avant qu'une position soit trouvée
     """
-    global engine
     start_time = time.time()
-    tentatives = 0
     
-    if not engine:
+    if not engine_pool.is_available():
         raise Exception(f"Le moteur Stockfish n'est pas initialisé. Chemin: {STOCKFISH_PATH}")
     
     # Validation des paramètres (BIEN INDENTÉ - 4 espaces)
@@ -350,53 +682,160 @@ def generate_fen_position(negative_min=-99, negative_max=-15, positive_min=15, p
     if excluded_pieces is None:
         excluded_pieces = []
     
+    # Lève ValueError tout de suite si aucune composition n'est réalisable,
+    # plutôt qu'après max_attempts tentatives vaines
+    table = composition_table(max_material, material_diff, excluded_pieces)
+    
+    windows = (negative_min, negative_max, positive_min, positive_max)
+    bucket = sampling_bucket(windows, max_material, material_diff, excluded_pieces)
+    strategy = strategy or GENERATION_STRATEGY
+    if strategy == AUTO:
+        strategy = next(iter(STRATEGIES)) if seed is not None else strategy_stats.choose(
+            bucket, explore=priority == BACKGROUND)
+    selected = get_strategy(strategy)
+    
+    if sampler_processes is None:
+        sampler_processes = SAMPLER_PROCESSES
+    
+    consumer_count = engine_pool.size
+    cache_params = None
+    rng = random
+    if seed is not None:
+        cache_params = {
+            'negative_min': negative_min, 'negative_max': negative_max, 'positive_min': positive_min,
+            'positive_max': positive_max, 'material_diff': material_diff, 'max_material': max_material,
+            'max_attempts': max_attempts, 'excluded_pieces': sorted(excluded_pieces), 'augment': augment,
+            'strategy': selected.name,
+        }
+        cache_key = _result_cache_key(cache_params, seed)
+        with _result_cache_lock:
+            cached = _result_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                _result_cache.move_to_end(cache_key)
+                return dict(json.loads(cached), cached=True)
+        # Instance propre à la requête : aucune interférence entre générations concurrentes
+        rng = random.Random(seed)
+        sampler_processes = consumer_count = 1
+    
+    static_filter = None
+    if STATIC_FILTER_CONFIG['enabled']:
+        static_filter = (windows, STATIC_FILTER_CONFIG['margin'], STATIC_FILTER_CONFIG['audit_rate'])
+    weights = sampling = None
+    if ADAPTIVE_SAMPLING_ENABLED and seed is None and not selected.engine_guided:
+        sampling = (bucket, table)
+        weights = sampling_stats.weights(*sampling)
+    params = (max_material, material_diff, list(excluded_pieces), static_filter, weights)
+    
+    candidate_queue = _mp_context.Queue(CANDIDATE_QUEUE_SIZE)
+    stop_event = _mp_context.Event()
+    attempts_counter = _mp_context.Value('i', 0)
+    legal_counter = _mp_context.Value('i', 0)
+    static_counters = _mp_context.Array('i', 2)
+    outcome = {'lock': threading.Lock(), 'result': None, 'evaluations': 0, 'engine_seconds': 0.0, 'best': None}
+    
+    samplers = [
+        _mp_context.Process(target=candidate_sampler,
+                            args=(params, candidate_queue, stop_event, attempts_counter,
+                                  legal_counter, static_counters, max_attempts, rng.getrandbits(64)),
+                            daemon=True)
+        for _ in range(0 if selected.engine_guided else max(1, sampler_processes))
+    ]
+    playout = None
+    if selected.engine_guided:
+        # Les candidats sont produits par les consommateurs eux-mêmes, avec leur moteur
+        playout = {'strategy': selected, 'table': table, 'rng': random.Random(rng.getrandbits(64)),
+                   'attempts': attempts_counter, 'legal': legal_counter, 'max_attempts': max_attempts,
+                   'static_filter': static_filter, 'static_counters': static_counters}
+    consumers = [
+        threading.Thread(target=_engine_consumer,
+                         args=(candidate_queue, stop_event, samplers, windows, outcome, sampling,
+                               priority, client, seed is None, playout, seed is not None),
+                         daemon=True)
+        for _ in range(consumer_count)
+    ]
+    
+    def progress():
+        attempts = attempts_counter.value
+        legal = legal_counter.value
+        with outcome['lock']:
+            evaluations = outcome['evaluations']
+            best = dict(outcome['best']) if outcome['best'] else None
+        return {
+            "attempts": attempts,
+            "legal_positions": legal,
+            "legality_rate": round(legal / attempts, 4) if attempts else 0.0,
+            "engine_evaluations": evaluations,
+            "static_rejected": static_counters[1],
+            "best_candidate": best,
+            "elapsed_seconds": round(time.time() - start_time, 1)
+        }
+    
+    stopped = None
     try:
-        BATCH_SIZE = 5
-        candidates_buffer = []
-        
-        min_piece_diff = 1 if material_diff >= 2 else 0
-        
-        while tentatives < max_attempts:
-            tentatives += 1
-            
-            fen, board = generate_optimized_random_fen(max_material, material_diff, excluded_pieces)
-            is_legal, board = is_fen_legal((fen, board))
-            
-            if not is_legal:
+        for process in samplers:
+            process.start()
+        for thread in consumers:
+            thread.start()
+        while True:
+            alive = [thread for thread in consumers if thread.is_alive()]
+            if not alive:
+                break
+            alive[0].join(timeout=PROGRESS_INTERVAL)
+            if stopped is None and cancel_event is not None and cancel_event.is_set():
+                stopped = GenerationCancelled("Génération annulée")
+                stop_event.set()
+            elif stopped is None and deadline is not None and time.time() >= deadline:
+                stopped = TimeoutError("Délai de génération dépassé")
+                stop_event.set()
+            if progress_callback is not None:
+                progress_callback(progress())
+    finally:
+        stop_event.set()
+        for process in samplers:
+            if process.pid is None:  # jamais démarré
                 continue
-            
-            is_compensated_mat, white_mat, black_mat = is_material_compensated(board, material_diff)
-            is_compensated_piece = check_piece_difference(board, min_piece_diff)
-            
-            if is_compensated_mat and is_compensated_piece:
-                candidates_buffer.append((fen, board, white_mat, black_mat))
-                
-                if len(candidates_buffer) >= BATCH_SIZE:
-                    fens_to_analyze = [c[0] for c in candidates_buffer]
-                    results = get_stockfish_evaluation_batch(fens_to_analyze)
-                    
-                    for (fen, board, w_mat, b_mat), (scores_cp, scores_str) in zip(candidates_buffer, results):
-                        if scores_cp and len(scores_cp) >= 2:
-                            valid_count = sum(1 for cp in scores_cp[:2] 
-                                          if (negative_min <= cp <= negative_max) or 
-                                             (positive_min <= cp <= positive_max))
-                            
-                            if valid_count >= 2:
-                                return {
-                                    "fen": fen,
-                                    "white_material": w_mat,
-                                    "black_material": b_mat,
-                                    "material_difference": abs(w_mat - b_mat),
-                                    "turn": "Blanc" if board.turn else "Noir",
-                                    "eval_line1": scores_str[0],
-                                    "eval_line2": scores_str[1],
-                                    "attempts": tentatives,
-                                    "time_seconds": round(time.time() - start_time, 1)
-                                }
-                    
-                    candidates_buffer = []
-            
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        candidate_queue.close()
+        _count_static_filter(examined=static_counters[0], rejected=static_counters[1])
+        sampling_stats.save()
+        # Une génération annulée ou hors délai ne dit rien du coût de la stratégie
+        if outcome['result'] is not None or stopped is None:
+            strategy_stats.record(bucket, selected.name, outcome['result'] is not None, outcome['evaluations'],
+                                  int(outcome['result'] is not None), outcome['engine_seconds'],
+                                  attempts_counter.value)
+            strategy_stats.save()
+    
+    if outcome['result'] is None:
+        if stopped is not None:
+            raise stopped
         raise Exception("Position non trouvée après maximum de tentatives")
     
-    finally:
-        pass
+    fen, w_mat, b_mat, scores_str = outcome['result']
+    position = {
+        "fen": fen,
+        "white_material": w_mat,
+        "black_material": b_mat,
+        "material_difference": abs(w_mat - b_mat),
+        "turn": "Blanc" if chess.Board(fen).turn else "Noir",
+        "eval_line1": scores_str[0],
+        "eval_line2": scores_str[1],
+        "attempts": attempts_counter.value,
+        "engine_evaluations": outcome['evaluations'],
+        "engine_seconds": round(outcome['engine_seconds'], 2),
+        "strategy": selected.name,
+        "time_seconds": round(time.time() - start_time, 1)
+    }
+    if augment:
+        position['augmented'] = symmetric_variants(position, windows)
+    if seed is not None:
+        position['seed'] = seed
+        # Clé calculée maintenant : la version du moteur est connue après sa première analyse
+        cache_key = _result_cache_key(cache_params, seed)
+        if cache_key is not None:
+            with _result_cache_lock:
+                _result_cache[cache_key] = json.dumps(position)
+                while len(_result_cache) > RESULT_CACHE_SIZE:
+                    _result_cache.popitem(last=False)
+    return position
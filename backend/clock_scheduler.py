@@ -0,0 +1,274 @@
+"""
+Horloges des parties, servies par une seule tâche de fond.
+
+Les pendules n'étaient mises à jour que dans Game.make_move : un joueur qui
+ne jouait plus ne tombait jamais et sa partie restait en mémoire. Toutes
+les échéances (chute du drapeau, inactivité, parties en attente jamais
+commencées) sont rangées dans une roue de temporisation hiérarchique : une
+seule greenlet (ou un seul thread en mode threading) avance la roue d'un
+cran par tick, quel que soit le nombre de parties.
+
+Chaque cran coûte O(1) : seules les échéances du cran courant sont
+examinées, les niveaux supérieurs ne sont redistribués qu'une fois tous les
+64^niveau crans (coût amorti constant par échéance). Une échéance n'est
+jamais servie en avance et l'est au plus un tick en retard (CLOCK_TICK_MS).
+
+Variables d'environnement :
+    CLOCK_TICK_MS          Durée d'un cran (défaut: 50)
+    GAME_IDLE_TIMEOUT      Partie sans coup déclarée abandonnée après N s (défaut: 1800, 0 = jamais)
+    PENDING_GAME_TIMEOUT   Partie acceptée jamais commencée oubliée après N s (défaut: 300)
+"""
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+# Types d'échéances
+FLAG = 'flag'
+IDLE = 'idle'
+PENDING = 'pending'
+
+
+class TimerWheel:
+    """
+    Roue de temporisation hiérarchique (type noyau Linux).
+
+    Le niveau 0 compte 64 crans d'un tick ; chaque niveau suivant compte 64
+    crans de 64 fois la durée du précédent. Une échéance est rangée au
+    niveau le plus fin qui couvre son délai, puis redescend d'un niveau à
+    chaque fois que la roue inférieure fait un tour complet.
+    """
+
+    BITS = 6
+    LEVELS = 4
+
+    def __init__(self, tick=0.05, clock=time.monotonic):
+        """
+        Args:
+            tick: Durée d'un cran (secondes)
+            clock: Horloge monotone (secondes)
+        """
+        if tick <= 0:
+            raise ValueError("La durée d'un tick doit être positive")
+        self.tick = tick
+        self.clock = clock
+        self._size = 1 << self.BITS
+        self._mask = self._size - 1
+        self._max_delta = (1 << (self.BITS * self.LEVELS)) - 1
+        # Par niveau et par cran : {clé: tick d'échéance}
+        self._levels = [[{} for _ in range(self._size)] for _ in range(self.LEVELS)]
+        # Clé -> (niveau, cran), pour annuler ou replanifier en O(1)
+        self._where = {}
+        # Prochain tick à traiter
+        self._current = math.floor(clock() / tick)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    @property
+    def next_tick_time(self):
+        """Instant (horloge de la roue) du prochain cran à traiter."""
+        return self._current * self.tick
+
+    def _place(self, key, expires):
+        delta = min(max(expires - self._current, 0), self._max_delta)
+        at = self._current + delta
+        level = 0
+        while delta >= 1 << (self.BITS * (level + 1)):
+            level += 1
+        slot = (at >> (self.BITS * level)) & self._mask
+        self._levels[level][slot][key] = expires
+        self._where[key] = (level, slot)
+
+    def _unplace(self, key):
+        where = self._where.pop(key, None)
+        if where is not None:
+            level, slot = where
+            del self._levels[level][slot][key]
+
+    def schedule(self, key, deadline):
+        """
+        Programme (ou reprogramme) une échéance.
+
+        Args:
+            key: Clé hashable, unique par échéance
+            deadline: Instant de l'échéance (horloge de la roue, secondes)
+        """
+        expires = math.ceil(deadline / self.tick)
+        with self._lock:
+            self._unplace(key)
+            self._place(key, expires)
+
+    def cancel(self, key):
+        """Annule une échéance (sans effet si elle n'existe pas)."""
+        with self._lock:
+            self._unplace(key)
+
+    def _cascade(self, level, slot):
+        entries = self._levels[level][slot]
+        self._levels[level][slot] = {}
+        for key, expires in entries.items():
+            self._place(key, expires)
+
+    def advance(self, now=None):
+        """
+        Avance la roue jusqu'à l'instant now.
+
+        Returns:
+            Liste des clés échues (dans l'ordre des échéances)
+        """
+        target = math.floor((self.clock() if now is None else now) / self.tick)
+        expired = []
+        with self._lock:
+            while self._current <= target:
+                tick = self._current
+                index = tick & self._mask
+                level = 1
+                # Tour complet d'un niveau : redistribuer le cran courant du niveau supérieur
+                while index == 0 and level < self.LEVELS:
+                    index = (tick >> (self.BITS * level)) & self._mask
+                    self._cascade(level, index)
+                    level += 1
+                slot = self._levels[0][tick & self._mask]
+                if slot:
+                    self._levels[0][tick & self._mask] = {}
+                    for key, expires in slot.items():
+                        del self._where[key]
+                        if expires <= tick:
+                            expired.append(key)
+                        else:
+                            self._place(key, expires)
+                self._current = tick + 1
+        return expired
+
+
+class ClockScheduler:
+    """
+    Échéances de toutes les parties : chute du drapeau, inactivité et
+    parties en attente.
+
+    Le scheduler ne connaît ni Socket.IO ni la base : l'application
+    enregistre un traitement par type d'échéance (on), appelé avec le
+    game_id depuis la tâche de fond.
+    """
+
+    def __init__(self, tick=0.05, idle_timeout=1800, pending_timeout=300, clock=time.monotonic):
+        """
+        Args:
+            tick: Durée d'un cran de la roue (secondes)
+            idle_timeout: Délai sans coup avant abandon d'une partie (0 = jamais)
+            pending_timeout: Délai avant d'oublier une partie acceptée mais jamais commencée
+            clock: Horloge monotone (secondes)
+        """
+        self.wheel = TimerWheel(tick, clock)
+        self.clock = clock
+        self.idle_timeout = idle_timeout
+        self.pending_timeout = pending_timeout
+        self._handlers = {}
+        self._running = False
+        self._fired = Counter()
+        self._errors = 0
+
+    def on(self, kind, handler):
+        """
+        Enregistre le traitement d'un type d'échéance.
+
+        Args:
+            kind: FLAG, IDLE ou PENDING
+            handler: Fonction appelée avec le game_id échu
+        """
+        self._handlers[kind] = handler
+
+    def watch(self, game):
+        """
+        (Re)programme la chute du drapeau du camp au trait et le délai
+        d'inactivité. À appeler au début de la partie et après chaque coup.
+
+        Args:
+            game: Game en cours
+        """
+        now = self.clock()
+        self.wheel.schedule((FLAG, game.game_id), now + max(0.0, game.time_left(game.board.turn)))
+        if self.idle_timeout:
+            self.wheel.schedule((IDLE, game.game_id), now + self.idle_timeout)
+
+    def unwatch(self, game_id):
+        """Annule les échéances d'une partie terminée."""
+        self.wheel.cancel((FLAG, game_id))
+        self.wheel.cancel((IDLE, game_id))
+
+    def watch_pending(self, game_id):
+        """Programme l'expiration d'une partie acceptée en attente de ses joueurs."""
+        self.wheel.schedule((PENDING, game_id), self.clock() + self.pending_timeout)
+
+    def unwatch_pending(self, game_id):
+        """Annule l'expiration d'une partie en attente (elle a commencé)."""
+        self.wheel.cancel((PENDING, game_id))
+
+    def fire_due(self, now=None):
+        """
+        Traite les échéances passées.
+
+        Returns:
+            int: Nombre d'échéances traitées
+        """
+        expired = self.wheel.advance(now)
+        for kind, game_id in expired:
+            handler = self._handlers.get(kind)
+            if handler is None:
+                continue
+            try:
+                handler(game_id)
+                self._fired[kind] += 1
+            except Exception as e:
+                self._errors += 1
+                print(f"❌ Erreur lors du traitement de l'échéance {kind} de la partie {game_id}: {e}")
+        return len(expired)
+
+    def run(self, sleep=time.sleep):
+        """
+        Boucle de la tâche de fond : dort jusqu'au prochain cran puis traite
+        les échéances. À lancer une seule fois (socketio.start_background_task).
+
+        Args:
+            sleep: Fonction d'attente (socketio.sleep en mode gevent)
+        """
+        self._running = True
+        print(f"⏱️ Horloges des parties: un cran toutes les {self.wheel.tick * 1000:.0f} ms")
+        while self._running:
+            sleep(max(0.0, self.wheel.next_tick_time - self.clock()))
+            self.fire_due()
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        return {
+            'running': self._running,
+            'tick_ms': round(self.wheel.tick * 1000, 1),
+            'scheduled': len(self.wheel),
+            'fired': dict(self._fired),
+            'errors': self._errors,
+            'idle_timeout': self.idle_timeout,
+            'pending_timeout': self.pending_timeout,
+        }
+
+
+def create_clock_scheduler():
+    """
+    Crée le scheduler de l'application, configuré par variables
+    d'environnement (CLOCK_TICK_MS, GAME_IDLE_TIMEOUT, PENDING_GAME_TIMEOUT).
+    """
+    return ClockScheduler(
+        tick=float(os.environ.get('CLOCK_TICK_MS', 50)) / 1000.0,
+        idle_timeout=float(os.environ.get('GAME_IDLE_TIMEOUT', 1800)),
+        pending_timeout=float(os.environ.get('PENDING_GAME_TIMEOUT', 300)),
+    )
+
+
+clocks = create_clock_scheduler()
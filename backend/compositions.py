@@ -0,0 +1,214 @@
+"""
+Table exacte des compositions matérielles réalisables.
+
+Pour un triplet (max_material, material_diff, excluded_pieces), on énumère
+une fois pour toutes tous les couples (camp fort, camp faible) de multiensembles
+de pièces qui respectent les cibles matérielles (material_bounds), la
+différence matérielle et la règle de différence de pièces. Le tirage se
+fait ensuite en O(1) par la méthode des alias, avec des poids réglables.
+"""
+import itertools
+from functools import lru_cache
+
+import chess
+import numpy as np
+
+MATERIAL_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+}
+
+# Réserve de pièces par camp
+PIECE_LIMITS = {
+    chess.QUEEN: 1,
+    chess.ROOK: 2,
+    chess.BISHOP: 2,
+    chess.KNIGHT: 2,
+    chess.PAWN: 6,
+}
+
+PIECE_NAMES = {
+    'queen': chess.QUEEN,
+    'rook': chess.ROOK,
+    'bishop': chess.BISHOP,
+    'knight': chess.KNIGHT,
+    'pawn': chess.PAWN,
+}
+
+MIN_WEAK_MATERIAL = 10
+MAX_STRONG_MATERIAL = 22
+
+
+def material_bounds(max_material, material_diff):
+    """
+    Cibles matérielles : le camp fort a entre max_strong - 3 et max_strong
+    (max_material plafonné à MAX_STRONG_MATERIAL), le camp faible au moins
+    MIN_WEAK_MATERIAL, et l'écart va de material_diff à material_diff + 2
+    (au plus 6). Avec material_diff=0, les deux camps ont exactement le même
+    matériel.
+
+    Returns:
+        Tuple (matériel fort min, matériel fort max, écart min, écart max, matériel faible min)
+    """
+    max_strong = min(max_material, MAX_STRONG_MATERIAL)
+    diff_max = 0 if material_diff == 0 else min(material_diff + 2, 6)
+    return max_strong - 3, max_strong, material_diff, diff_max, MIN_WEAK_MATERIAL
+
+
+def _side_compositions(excluded_types):
+    """Énumère tous les multiensembles de pièces possibles pour un camp."""
+    allowed = [pt for pt in PIECE_LIMITS if pt not in excluded_types]
+    sides = []
+    for counts in itertools.product(*(range(PIECE_LIMITS[pt] + 1) for pt in allowed)):
+        pieces = tuple(pt for pt, count in zip(allowed, counts) for _ in range(count))
+        if pieces:
+            sides.append(pieces)
+    return sides
+
+
+def _piece_counts(pieces):
+    majors = sum(1 for p in pieces if p in (chess.ROOK, chess.QUEEN))
+    minors = sum(1 for p in pieces if p in (chess.KNIGHT, chess.BISHOP))
+    return majors, minors
+
+
+class CompositionTable:
+    """Compositions réalisables pour un jeu de paramètres, avec tirage pondéré."""
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries: Liste de tuples (pièces fortes, pièces faibles, matériel fort, matériel faible)
+        """
+        self.entries = entries
+        self.strong_material = np.array([e[2] for e in entries], dtype=np.int16)
+        self.weak_material = np.array([e[3] for e in entries], dtype=np.int16)
+        self._index = None
+        if entries:
+            self.set_weights(None)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, white_pieces, black_pieces):
+        """
+        Indice de la composition formée par deux camps (positions obtenues
+        autrement que par tirage, ex: partie jouée).
+
+        Args:
+            white_pieces: Types des pièces blanches hors roi
+            black_pieces: Types des pièces noires hors roi
+
+        Returns:
+            int ou None si la composition ne respecte pas les paramètres de la table
+        """
+        if self._index is None:
+            self._index = {(tuple(sorted(strong)), tuple(sorted(weak))): i
+                           for i, (strong, weak, _, _) in enumerate(self.entries)}
+        white, black = tuple(sorted(white_pieces)), tuple(sorted(black_pieces))
+        index = self._index.get((white, black))
+        return index if index is not None else self._index.get((black, white))
+
+    def default_weights(self):
+        """
+        Poids par défaut : chaque couple de niveaux matériels (fort, faible) est
+        équiprobable, quel que soit le nombre de compositions qui le réalisent.
+        """
+        pairs = self.strong_material.astype(np.int32) * 64 + self.weak_material
+        _, inverse, counts = np.unique(pairs, return_inverse=True, return_counts=True)
+        return 1.0 / counts[inverse]
+
+    def set_weights(self, weights):
+        """
+        Remplace les poids de tirage et reconstruit les tables d'alias (Vose).
+
+        Args:
+            weights: Tableau de poids positifs (un par composition) ou None
+        """
+        n = len(self.entries)
+        weights = self.default_weights() if weights is None else np.asarray(weights, dtype=np.float64)
+        if len(weights) != n or not np.all(weights >= 0) or weights.sum() <= 0:
+            raise ValueError("Poids de composition invalides")
+
+        self.weights = weights / weights.sum()
+        scaled = self.weights * n
+        prob = np.zeros(n)
+        alias = np.zeros(n, dtype=np.int64)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            prob[i] = 1.0
+        self._prob = prob
+        self._alias = alias
+
+    def sample_indices(self, rng, size):
+        """
+        Tire `size` compositions en O(1) chacune.
+
+        Args:
+            rng: numpy.random.Generator
+            size: Nombre de tirages
+
+        Returns:
+            numpy.ndarray d'indices dans self.entries
+        """
+        columns = rng.integers(0, len(self.entries), size=size)
+        accept = rng.random(size) < self._prob[columns]
+        return np.where(accept, columns, self._alias[columns])
+
+
+@lru_cache(maxsize=256)
+def _build_table(max_material, material_diff, excluded_types):
+    strong_min, strong_max, diff_min, diff_max, weak_min = material_bounds(max_material, material_diff)
+    min_piece_diff = 1 if material_diff >= 2 else 0
+
+    by_material = {}
+    for pieces in _side_compositions(excluded_types):
+        value = sum(MATERIAL_VALUES[p] for p in pieces)
+        by_material.setdefault(value, []).append((pieces, _piece_counts(pieces)))
+
+    entries = []
+    for strong_mat in range(strong_min, strong_max + 1):
+        for diff in range(diff_min, diff_max + 1):
+            weak_mat = strong_mat - diff
+            if weak_mat < weak_min:
+                continue
+            for strong, (s_majors, s_minors) in by_material.get(strong_mat, []):
+                for weak, (w_majors, w_minors) in by_material.get(weak_mat, []):
+                    if abs(s_majors - w_majors) >= min_piece_diff or abs(s_minors - w_minors) >= min_piece_diff:
+                        entries.append((strong, weak, strong_mat, weak_mat))
+    return CompositionTable(entries)
+
+
+def composition_table(max_material, material_diff, excluded_pieces=None):
+    """
+    Retourne la table (mise en cache) des compositions réalisables.
+
+    Args:
+        max_material: Matériel maximum par côté
+        material_diff: Différence matérielle minimum
+        excluded_pieces: Liste des types de pièces à exclure (ex: ['queen', 'rook'])
+
+    Returns:
+        CompositionTable
+
+    Raises:
+        ValueError: Si aucune composition ne respecte les paramètres
+    """
+    excluded_types = frozenset(PIECE_NAMES[p] for p in (excluded_pieces or []) if p in PIECE_NAMES)
+    table = _build_table(max_material, material_diff, excluded_types)
+    if not len(table):
+        excluded = ', '.join(sorted(excluded_pieces or [])) or 'aucune'
+        raise ValueError(
+            f"Aucune composition possible pour max_material={max_material}, "
+            f"material_diff={material_diff} (pièces exclues: {excluded})")
+    return table
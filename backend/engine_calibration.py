@@ -0,0 +1,374 @@
+"""
+Calibration de la configuration moteur sur la machine hôte.
+
+Mesure, pour chaque combinaison de Threads, Hash, taille du pool et limite
+de recherche (profondeur / temps / nœuds), avec ou sans épinglage des
+moteurs sur des cœurs :
+- le temps CPU consommé par les moteurs pour évaluer un même lot de
+  candidats (ceux que l'échantillonneur soumettrait au moteur) ;
+- l'accord avec une analyse de référence profonde : décision
+  accepté/rejeté identique, écart moyen de la ligne 1.
+
+Le critère est le nombre de positions acceptées à raison (acceptées aussi
+par la référence) par seconde CPU, parmi les configurations dont l'accord
+avec la référence atteint le seuil demandé. La meilleure configuration est
+écrite dans un profil JSON chargé par chess_generator au démarrage.
+
+Exemples:
+    python -m backend.engine_calibration --samples 300
+    python -m backend.engine_calibration --threads 1,2 --hash 16,256 --limit depth=22,time=0.5 --limit nodes=400000 --pin
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Permet aussi l'exécution directe (python backend/engine_calibration.py)
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Clés du profil lues par chess_generator
+PROFILE_KEYS = ('threads', 'hash_mb', 'pool_size', 'depth', 'time_limit', 'nodes', 'pin_cpus')
+
+DEFAULT_LIMITS = ('depth=26,time=0.5', 'depth=22,time=0.5', 'depth=18,time=0.5', 'nodes=500000,time=0.5')
+DEFAULT_REFERENCE = 'depth=30,time=5'
+
+# Écart de ligne 1 plafonné : un mat ne doit pas écraser la moyenne
+MAX_ERROR_CP = 1000
+
+
+def load_engine_profile(path):
+    """
+    Lit le profil écrit par la calibration.
+
+    Args:
+        path: Chemin du fichier JSON (None = pas de profil)
+
+    Returns:
+        dict limité à PROFILE_KEYS ({} si le fichier est absent ou illisible)
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"ATTENTION: profil moteur illisible ({path}): {e}", file=sys.stderr)
+        return {}
+    print(f"INFO: profil moteur chargé depuis {path}", file=sys.stderr)
+    return {key: profile[key] for key in PROFILE_KEYS if key in profile}
+
+
+def parse_limit(text):
+    """
+    'depth=22,time=0.5' -> {'depth': 22, 'time': 0.5}
+
+    Raises:
+        ValueError: Si une clé est inconnue ou la limite vide
+    """
+    casts = {'depth': int, 'time': float, 'nodes': int}
+    limit = {}
+    for part in text.split(','):
+        key, _, value = part.partition('=')
+        key = key.strip()
+        if key not in casts:
+            raise ValueError(f"Limite inconnue: {key!r} (attendu: depth, time, nodes)")
+        limit[key] = casts[key](value)
+    if not limit:
+        raise ValueError("Limite vide")
+    return limit
+
+
+def _parse_ints(text):
+    return [int(v) for v in text.split(',') if v.strip()]
+
+
+def _process_cpu_seconds(pid):
+    """Temps CPU (utilisateur + système) d'un processus, ou None hors Linux."""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # Les champs suivent le nom du processus, entre parenthèses
+            fields = f.read().rsplit(')', 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def sample_candidates(generator, samples, params, seed):
+    """
+    Candidats tels que l'échantillonneur les soumet au moteur (pré-filtre
+    statique compris s'il est actif).
+
+    Returns:
+        Liste de chess.Board
+    """
+    import numpy as np
+    from backend.static_eval import is_plausible
+
+    windows = (params['negative_min'], params['negative_max'], params['positive_min'], params['positive_max'])
+    static_filter = generator.STATIC_FILTER_CONFIG
+    rng = np.random.default_rng(seed)
+    boards = []
+    while len(boards) < samples:
+        candidates, _ = generator.generate_candidate_batch(params['max_material'], params['material_diff'],
+                                                           params['excluded_pieces'], generator.ATTEMPTS_CHUNK, rng)
+        for _, board, _, _, _ in candidates:
+            if (not static_filter['enabled'] or board.is_check()
+                    or is_plausible(board, windows, static_filter['margin'])[0]):
+                boards.append(board)
+    return boards[:samples]
+
+
+def analyse_positions(generator, engine_path, boards, threads, hash_mb, pool_size, limit, pin_cpus=False):
+    """
+    Évalue (2 lignes principales) chaque position avec un pool dédié, un
+    thread par moteur, comme les consommateurs du générateur.
+
+    Returns:
+        dict: scores (liste de [cp ligne 1, cp ligne 2] ou None par position),
+        wall_seconds, cpu_seconds, cpu_measured
+    """
+    import chess.engine
+    from backend.engine_pool import EnginePool, pinned_cpu_sets
+
+    options = {'Threads': threads, 'Hash': hash_mb}
+    cpu_sets = pinned_cpu_sets(threads, pool_size) if pin_cpus else None
+    pool = EnginePool(engine_path, size=pool_size, options=options, cpu_sets=cpu_sets)
+    search_limit = chess.engine.Limit(**limit)
+    try:
+        # Démarrage (chargement du réseau, handshake UCI) hors mesure
+        engines = [pool.checkout() for _ in range(pool_size)]
+        pids = [pooled.engine.transport.get_pid() for pooled in engines]
+        for pooled in engines:
+            pool.checkin(pooled)
+
+        pending = queue.Queue()
+        for i, board in enumerate(boards):
+            pending.put((i, board))
+        scores = [None] * len(boards)
+
+        def worker():
+            with pool.engine() as pooled:
+                while True:
+                    try:
+                        i, board = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        info = pooled.analyse(board, search_limit, multipv=2)
+                    except Exception as e:
+                        print(f"⚠️ Analyse échouée ({board.fen()}): {e}")
+                        if pooled.broken:
+                            return
+                        continue
+                    scores[i] = [generator.format_score(pv['score'].white())[0] for pv in info]
+
+        cpu_before = [_process_cpu_seconds(pid) for pid in pids]
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(pool_size)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        wall_seconds = time.perf_counter() - started
+        cpu_after = [_process_cpu_seconds(pid) for pid in pids]
+    finally:
+        pool.shutdown()
+
+    cpu_measured = None not in cpu_before + cpu_after
+    if cpu_measured:
+        cpu_seconds = sum(after - before for before, after in zip(cpu_before, cpu_after))
+    else:
+        # Sans /proc : temps CPU réservé (tous les threads moteur occupés)
+        cpu_seconds = wall_seconds * threads * pool_size
+    return {'scores': scores, 'wall_seconds': wall_seconds, 'cpu_seconds': cpu_seconds, 'cpu_measured': cpu_measured}
+
+
+def score_configuration(generator, measure, reference, windows):
+    """
+    Compare une mesure à la référence.
+
+    Returns:
+        dict de métriques (accord, positions acceptées par seconde CPU...)
+    """
+    def accepted(lines):
+        return lines is not None and len(lines) >= 2 and all(
+            generator.is_in_eval_window(cp, *windows) for cp in lines[:2])
+
+    pairs = [(lines, ref) for lines, ref in zip(measure['scores'], reference['scores']) if ref is not None]
+    agree = true_accepts = accepts = failures = 0
+    errors = []
+    for lines, ref in pairs:
+        if lines is None:
+            failures += 1
+        else:
+            errors.append(min(MAX_ERROR_CP, abs(lines[0] - ref[0])))
+        ok, ref_ok = accepted(lines), accepted(ref)
+        agree += ok == ref_ok
+        accepts += ok
+        true_accepts += ok and ref_ok
+    reference_accepts = sum(1 for _, ref in pairs if accepted(ref))
+    cpu_seconds = max(measure['cpu_seconds'], 1e-9)
+    return {
+        'positions': len(pairs),
+        'failures': failures,
+        'accepted': accepts,
+        'true_accepted': true_accepts,
+        'reference_accepted': reference_accepts,
+        'agreement': round(agree / len(pairs), 4) if pairs else 0.0,
+        'recall': round(true_accepts / reference_accepts, 4) if reference_accepts else None,
+        'mean_error_cp': round(sum(errors) / len(errors), 1) if errors else None,
+        'wall_seconds': round(measure['wall_seconds'], 2),
+        'cpu_seconds': round(measure['cpu_seconds'], 2),
+        'cpu_measured': measure['cpu_measured'],
+        'accepted_per_cpu_second': round(true_accepts / cpu_seconds, 4),
+        'positions_per_cpu_second': round(len(pairs) / cpu_seconds, 3),
+        'accepted_per_second': round(true_accepts / max(measure['wall_seconds'], 1e-9), 4),
+    }
+
+
+def configurations(threads_list, hash_list, pool_sizes, limits, pin, oversubscribe=False):
+    """Grille des configurations à mesurer (sans dépasser le nombre de cœurs)."""
+    cpu_count = os.cpu_count() or 1
+    for threads, hash_mb, limit in itertools.product(threads_list, hash_list, limits):
+        sizes = pool_sizes or sorted({1, max(1, cpu_count // threads)})
+        for pool_size in sizes:
+            if threads * pool_size > cpu_count and not oversubscribe:
+                continue
+            for pin_cpus in ((False, True) if pin else (False,)):
+                yield {'threads': threads, 'hash_mb': hash_mb, 'pool_size': pool_size,
+                       'limit': limit, 'pin_cpus': pin_cpus}
+
+
+def best_profile(results, min_agreement):
+    """
+    Meilleure configuration : positions acceptées à raison par seconde CPU,
+    puis positions évaluées par seconde CPU, parmi celles assez fidèles à la
+    référence.
+
+    Returns:
+        dict de résultat, ou None si aucune configuration n'atteint le seuil
+    """
+    eligible = [r for r in results if r['metrics']['agreement'] >= min_agreement and not r['metrics']['failures']]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (r['metrics']['accepted_per_cpu_second'],
+                                        r['metrics']['positions_per_cpu_second']))
+
+
+def profile_from_result(result, engine_version, samples):
+    """Profil JSON (clés de PROFILE_KEYS + traçabilité de la calibration)."""
+    config, limit = result['config'], result['config']['limit']
+    return {
+        'threads': config['threads'],
+        'hash_mb': config['hash_mb'],
+        'pool_size': config['pool_size'],
+        'depth': limit.get('depth'),
+        'time_limit': limit.get('time'),
+        'nodes': limit.get('nodes'),
+        'pin_cpus': config['pin_cpus'],
+        'calibration': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'engine_version': engine_version,
+            'cpu_count': os.cpu_count(),
+            'samples': samples,
+            'metrics': result['metrics'],
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibration de Threads, Hash, taille du pool et limites de recherche")
+    parser.add_argument('--samples', type=int, default=200, help="Candidats évalués par configuration")
+    parser.add_argument('--threads', default='1,2', help="Valeurs de Threads à comparer")
+    parser.add_argument('--hash', default='16,128', help="Valeurs de Hash (Mo) à comparer")
+    parser.add_argument('--pool-sizes', help="Tailles de pool (défaut: 1 et nb de cœurs / Threads)")
+    parser.add_argument('--limit', action='append',
+                        help=f"Limite de recherche, répétable (défaut: {' | '.join(DEFAULT_LIMITS)})")
+    parser.add_argument('--reference', default=DEFAULT_REFERENCE, help="Limite de l'analyse de référence")
+    parser.add_argument('--pin', action='store_true', help="Mesurer aussi chaque configuration avec épinglage CPU")
+    parser.add_argument('--oversubscribe', action='store_true', help="Autoriser Threads x pool > nb de cœurs")
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help="Accord minimal avec la référence (décision accepté/rejeté)")
+    parser.add_argument('--engine', help="Exécutable UCI (défaut: celui du générateur)")
+    parser.add_argument('--profile', help="Profil à écrire (défaut: ENGINE_PROFILE_PATH du générateur)")
+    parser.add_argument('--dry-run', action='store_true', help="Mesurer sans écrire le profil")
+    parser.add_argument('-o', '--output', help="Rapport JSON complet")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from backend import chess_generator as generator
+    from backend.position_reservoir import DEFAULT_PARAMS
+
+    engine_path = args.engine or generator.STOCKFISH_PATH
+    profile_path = args.profile or generator.ENGINE_PROFILE_PATH
+    params = dict(DEFAULT_PARAMS)
+    windows = (params['negative_min'], params['negative_max'], params['positive_min'], params['positive_max'])
+    limits = [parse_limit(text) for text in (args.limit or DEFAULT_LIMITS)]
+    grid = list(configurations(_parse_ints(args.threads), _parse_ints(args.hash),
+                               _parse_ints(args.pool_sizes) if args.pool_sizes else None,
+                               limits, args.pin, args.oversubscribe))
+    if not grid:
+        print("❌ Aucune configuration à mesurer (Threads x pool dépasse le nombre de cœurs ?)")
+        return 1
+
+    boards = sample_candidates(generator, args.samples, params, args.seed)
+    cpu_count = os.cpu_count() or 1
+    print(f"🔬 Référence ({args.reference}) sur {len(boards)} candidats, {cpu_count} moteurs...")
+    reference = analyse_positions(generator, engine_path, boards, 1, 256, cpu_count, parse_limit(args.reference))
+    reference_accepts = sum(1 for lines in reference['scores']
+                            if lines and len(lines) >= 2 and all(generator.is_in_eval_window(cp, *windows)
+                                                                 for cp in lines[:2]))
+    print(f"   {reference_accepts} candidats acceptés par la référence ({reference['wall_seconds']:.1f} s)")
+    if reference_accepts < 5:
+        print("⚠️ Peu de positions acceptées par la référence : augmenter --samples pour un classement fiable")
+
+    results = []
+    for config in grid:
+        measure = analyse_positions(generator, engine_path, boards, config['threads'], config['hash_mb'],
+                                    config['pool_size'], config['limit'], config['pin_cpus'])
+        metrics = score_configuration(generator, measure, reference, windows)
+        results.append({'config': config, 'metrics': metrics})
+        print(f"⏱️ Threads={config['threads']} Hash={config['hash_mb']} pool={config['pool_size']} "
+              f"{config['limit']}{' épinglé' if config['pin_cpus'] else ''}: "
+              f"{metrics['accepted_per_cpu_second']} acceptées/s CPU, "
+              f"{metrics['positions_per_cpu_second']} positions/s CPU, accord {metrics['agreement']:.1%}")
+
+    engine_version = None
+    try:
+        import chess.engine
+        engine = chess.engine.SimpleEngine.popen_uci(engine_path)
+        engine_version = engine.id.get('name')
+        engine.quit()
+    except Exception:
+        pass
+
+    best = best_profile(results, args.min_agreement)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'engine_version': engine_version, 'cpu_count': cpu_count, 'samples': len(boards),
+                       'reference': {'limit': args.reference, 'accepted': reference_accepts},
+                       'results': results, 'best': best}, f, indent=2, ensure_ascii=False)
+        print(f"✅ Rapport écrit dans {args.output}")
+
+    if best is None:
+        print(f"❌ Aucune configuration n'atteint {args.min_agreement:.0%} d'accord avec la référence : profil inchangé")
+        return 1
+    profile = profile_from_result(best, engine_version, len(boards))
+    print(f"🏆 Meilleure configuration: {best['config']}")
+    if args.dry_run or not profile_path:
+        return 0
+    tmp_path = f"{profile_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, profile_path)
+    print(f"✅ Profil écrit dans {profile_path} (chargé au prochain démarrage du générateur)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
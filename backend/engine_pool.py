@@ -0,0 +1,370 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import chess.engine
+
+
+class PooledEngine:
+    """Moteur UCI emprunté au pool pour la durée d'un checkout."""
+
+    def __init__(self, pool, engine, slot_id):
+        self.pool = pool
+        self.engine = engine
+        self.slot_id = slot_id
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.broken = False
+        # Jeton de partie : un nouveau jeton à chaque checkout force python-chess
+        # à envoyer 'ucinewgame' avant la première analyse (hygiène du hash).
+        self.game_token = None
+
+    def new_game(self):
+        """Vide le hash du moteur avant la prochaine analyse ('ucinewgame')."""
+        self.game_token = object()
+
+    def analyse(self, board, limit, multipv=None):
+        """
+        Lance une analyse sur le moteur emprunté.
+
+        Un moteur qui plante ou ne répond plus est marqué comme cassé pour
+        être redémarré lors de sa restitution au pool.
+
+        Args:
+            board: Position à analyser (chess.Board)
+            limit: Limite de recherche (chess.engine.Limit)
+            multipv: Nombre de lignes principales demandées
+
+        Returns:
+            InfoDict ou liste d'InfoDict (si multipv est fourni)
+        """
+        started = time.monotonic()
+        try:
+            return self.engine.analyse(board, limit, multipv=multipv, game=self.game_token)
+        except TimeoutError:
+            # Le moteur n'a pas rendu la main dans le délai : considéré bloqué
+            self.broken = True
+            raise
+        except Exception:
+            if not self.is_alive():
+                self.broken = True
+            raise
+        finally:
+            self.pool._record_analysis(time.monotonic() - started)
+
+    def is_alive(self):
+        """Vérifie que le moteur répond toujours (aller-retour 'isready')."""
+        try:
+            self.engine.ping()
+            return True
+        except Exception:
+            return False
+
+    @property
+    def version(self):
+        """Nom et version annoncés par le moteur ('id name')."""
+        return self.engine.id.get('name', 'unknown')
+
+
+class EnginePool:
+    """
+    Pool de processus Stockfish réutilisables.
+
+    Les moteurs sont démarrés à la demande (jusqu'à `size`), prêtés via
+    checkout/checkin, vérifiés avant réutilisation après une période
+    d'inactivité et redémarrés automatiquement s'ils ont planté ou ne
+    répondent plus.
+    """
+
+    def __init__(self, engine_path, size=2, options=None, command_timeout=10.0,
+                 health_check_interval=30.0, cpu_sets=None):
+        """
+        Args:
+            engine_path: Chemin de l'exécutable UCI
+            size: Nombre maximum de moteurs simultanés
+            options: Options UCI appliquées à chaque moteur (ex: {"Threads": 1, "Hash": 64})
+            command_timeout: Délai de réponse au-delà duquel un moteur est considéré bloqué
+            health_check_interval: Inactivité (s) au-delà de laquelle un ping est fait au checkout
+            cpu_sets: Listes de cœurs auxquelles épingler les moteurs (le moteur n°k
+                reçoit cpu_sets[k % len(cpu_sets)]), ou None pour ne pas épingler
+        """
+        self.engine_path = str(engine_path)
+        self.size = max(1, int(size))
+        self.options = dict(options or {})
+        self.cpu_sets = [set(cpus) for cpus in cpu_sets] if cpu_sets else None
+        self.command_timeout = command_timeout
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._next_slot = 0
+        self._closed = False
+
+        # Statistiques d'occupation
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._restarts = 0
+        self._spawn_failures = 0
+        # Échecs de démarrage consécutifs (remis à zéro au premier démarrage réussi)
+        self._consecutive_spawn_failures = 0
+        self._engine_version = None
+        self._analyses = 0
+        self._engine_seconds = 0.0
+
+    def _spawn(self):
+        """Démarre un nouveau processus moteur (hors verrou)."""
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path, timeout=self.command_timeout)
+        try:
+            if self.options:
+                engine.configure(self.options)
+        except Exception:
+            engine.close()
+            raise
+        with self._condition:
+            slot_id = self._next_slot
+            self._next_slot += 1
+            if self._engine_version is None:
+                self._engine_version = engine.id.get('name')
+        if self.cpu_sets:
+            self._pin(engine, self.cpu_sets[slot_id % len(self.cpu_sets)])
+        return PooledEngine(self, engine, slot_id)
+
+    def _pin(self, engine, cpus):
+        """Épingle le processus moteur sur des cœurs (Linux uniquement, sans erreur bloquante)."""
+        try:
+            os.sched_setaffinity(engine.transport.get_pid(), cpus)
+        except (AttributeError, OSError) as e:
+            print(f"ATTENTION: épinglage du moteur sur {sorted(cpus)} impossible: {e}", file=sys.stderr)
+
+    def _record_analysis(self, seconds):
+        """Comptabilise le temps moteur d'une analyse."""
+        with self._condition:
+            self._analyses += 1
+            self._engine_seconds += seconds
+
+    def _discard(self, pooled, graceful=False):
+        """Arrête un moteur sans jamais lever d'exception."""
+        try:
+            if graceful:
+                pooled.engine.quit()
+            else:
+                pooled.engine.close()
+        except Exception:
+            pass
+
+    # Échecs de démarrage consécutifs au-delà desquels le pool est considéré hors service
+    MAX_CONSECUTIVE_SPAWN_FAILURES = 3
+
+    def is_available(self):
+        """
+        Indique si le pool peut fournir des moteurs, sans en emprunter un :
+        l'attente d'un moteur libre revient à l'appelant (engine_scheduler),
+        qui gère les priorités.
+
+        Returns:
+            bool: False si l'exécutable est absent, le pool fermé ou si les
+            derniers démarrages de moteur ont tous échoué
+        """
+        if not os.path.exists(self.engine_path):
+            return False
+        with self._condition:
+            return (not self._closed
+                    and self._consecutive_spawn_failures < self.MAX_CONSECUTIVE_SPAWN_FAILURES)
+
+    def checkout(self, timeout=None):
+        """
+        Emprunte un moteur au pool.
+
+        Args:
+            timeout: Attente maximale en secondes (None = illimitée)
+
+        Returns:
+            PooledEngine prêt à analyser
+
+        Raises:
+            TimeoutError: Si aucun moteur ne se libère à temps
+            RuntimeError: Si le pool est fermé
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._condition:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Le pool de moteurs est fermé")
+                    if self._idle:
+                        pooled = self._idle.popleft()
+                        spawn = False
+                        break
+                    if self._created < self.size:
+                        self._created += 1
+                        pooled = None
+                        spawn = True
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Aucun moteur Stockfish disponible dans le délai imparti")
+                    self._condition.wait(remaining)
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+
+        try:
+            if spawn:
+                pooled = self._spawn()
+            elif time.monotonic() - pooled.last_used > self.health_check_interval and not pooled.is_alive():
+                self._discard(pooled)
+                with self._condition:
+                    self._restarts += 1
+                pooled = self._spawn()
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._created -= 1
+                self._spawn_failures += 1
+                self._consecutive_spawn_failures += 1
+                self._condition.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._condition:
+            if spawn or pooled.uses == 0:
+                self._consecutive_spawn_failures = 0
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        pooled.new_game()
+        pooled.uses += 1
+        return pooled
+
+    def checkin(self, pooled):
+        """
+        Restitue un moteur au pool. Un moteur cassé est arrêté et sa place
+        libérée, il sera remplacé au prochain checkout.
+
+        Args:
+            pooled: PooledEngine obtenu par checkout()
+        """
+        pooled.last_used = time.monotonic()
+        with self._condition:
+            self._in_use -= 1
+            if pooled.broken or self._closed:
+                self._created -= 1
+                if pooled.broken:
+                    self._restarts += 1
+                discard = True
+            else:
+                self._idle.append(pooled)
+                discard = False
+            self._condition.notify()
+
+        if discard:
+            self._discard(pooled, graceful=not pooled.broken)
+
+    @contextmanager
+    def engine(self, timeout=None):
+        """
+        Context manager : emprunte un moteur et le restitue automatiquement.
+
+        Exemple:
+            with pool.engine() as eng:
+                info = eng.analyse(board, chess.engine.Limit(depth=12))
+        """
+        pooled = self.checkout(timeout=timeout)
+        try:
+            yield pooled
+        except BaseException:
+            # Une erreur pendant le checkout peut laisser le moteur au milieu
+            # d'une recherche : on vérifie qu'il répond encore avant de le rendre.
+            if not pooled.broken and not pooled.is_alive():
+                pooled.broken = True
+            raise
+        finally:
+            self.checkin(pooled)
+
+    def stats(self):
+        """
+        Retourne l'occupation du pool et les temps d'attente.
+
+        Returns:
+            dict: Statistiques du pool
+        """
+        with self._condition:
+            return {
+                'size': self.size,
+                'started': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'avg_wait_ms': round(1000 * self._total_wait / self._checkouts, 2) if self._checkouts else 0.0,
+                'max_wait_ms': round(1000 * self._max_wait, 2),
+                'restarts': self._restarts,
+                'spawn_failures': self._spawn_failures,
+                'analyses': self._analyses,
+                'engine_seconds': round(self._engine_seconds, 2),
+                'engine_version': self._engine_version,
+                'pinned': self.cpu_sets is not None,
+            }
+
+    def shutdown(self):
+        """Arrête tous les moteurs inactifs et refuse les nouveaux checkouts."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._discard(pooled, graceful=True)
+
+
+def pinned_cpu_sets(threads, engines):
+    """
+    Répartit les cœurs utilisables entre les moteurs : `threads` cœurs
+    consécutifs chacun, en recommençant au début s'il n'y en a pas assez.
+
+    Returns:
+        Liste de listes de cœurs, ou None si l'affinité n'est pas disponible
+    """
+    try:
+        available = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return None
+    threads = max(1, min(int(threads), len(available)))
+    return [[available[(k * threads + i) % len(available)] for i in range(threads)] for k in range(engines)]
+
+
+def create_engine_pool(engine_path, size=None, options=None, pin_cpus=False):
+    """
+    Crée un pool dont la taille peut être fixée par la variable
+    d'environnement STOCKFISH_POOL_SIZE, et l'arrête proprement à la sortie.
+
+    Args:
+        engine_path: Chemin de l'exécutable UCI
+        size: Taille du pool (défaut: STOCKFISH_POOL_SIZE ou nb de cœurs - 1)
+        options: Options UCI appliquées à chaque moteur
+        pin_cpus: Épingler chaque moteur sur ses propres cœurs (voir pinned_cpu_sets)
+    """
+    if size is None:
+        default_size = max(1, (os.cpu_count() or 2) - 1)
+        size = int(os.environ.get('STOCKFISH_POOL_SIZE', default_size))
+    cpu_sets = pinned_cpu_sets((options or {}).get('Threads', 1), size) if pin_cpus else None
+    pool = EnginePool(engine_path, size=size, options=options, cpu_sets=cpu_sets)
+    # Les threads de SimpleEngine ne sont pas des démons : l'arrêt doit être
+    # enregistré avant la jointure des threads, sinon l'interpréteur ne quitte jamais.
+    register = getattr(threading, '_register_atexit', atexit.register)
+    register(pool.shutdown)
+    return pool
@@ -0,0 +1,214 @@
+"""
+Ordonnancement des recherches Stockfish.
+
+Toutes les générations (requêtes interactives, matchmaking, remplissage du
+réservoir) demandent un créneau de recherche avant d'emprunter un moteur au
+pool. L'ordonnanceur plafonne le nombre de recherches simultanées et
+attribue chaque créneau libéré :
+1. à la classe de priorité la plus haute qui attend ;
+2. dans une classe, au client qui occupe le moins de créneaux, puis à celui
+   qui a consommé le moins de temps moteur récemment ;
+3. à égalité, au premier arrivé.
+
+La préemption est coopérative : entre deux candidats, un consommateur
+demande s'il doit céder sa place (should_yield) à une classe plus
+prioritaire ou à un client moins servi de sa classe.
+"""
+import itertools
+import math
+import os
+import time
+
+from backend.native_threads import native
+
+# Classes de priorité (plus petit = plus prioritaire)
+INTERACTIVE = 0
+MATCHMAKING = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: 'interactive',
+    MATCHMAKING: 'matchmaking',
+    BACKGROUND: 'background',
+}
+
+
+class SearchSlot:
+    """Créneau de recherche accordé à un consommateur."""
+
+    def __init__(self, scheduler, priority, client):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.client = client
+        self.granted_at = None
+
+    def should_yield(self):
+        """Indique si ce créneau devrait être rendu pour servir un autre demandeur."""
+        return self.scheduler._should_yield(self)
+
+
+class EngineScheduler:
+    """Attribution des créneaux de recherche par priorité et par client."""
+
+    def __init__(self, max_concurrent, usage_half_life=60.0):
+        """
+        Args:
+            max_concurrent: Nombre maximal de recherches simultanées
+            usage_half_life: Demi-vie (s) du temps moteur compté par client
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.usage_half_life = usage_half_life
+
+        self._condition = native('Condition')()
+        self._sequence = itertools.count()
+        self._waiting = {}   # seq -> (SearchSlot, début d'attente)
+        self._running = 0
+        # Par client : créneaux occupés et temps moteur (décroissance exponentielle)
+        self._client_running = {}
+        self._client_usage = {}
+
+        self._class_stats = {
+            priority: {'granted': 0, 'preempted': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+    def _usage(self, client, now):
+        """Temps moteur récent d'un client (verrou requis)."""
+        usage, updated = self._client_usage.get(client, (0.0, now))
+        return usage * math.exp(-math.log(2) * (now - updated) / self.usage_half_life)
+
+    def _rank(self, slot, seq, now):
+        return (slot.priority, self._client_running.get(slot.client, 0), self._usage(slot.client, now), seq)
+
+    def _next_waiter(self, now):
+        """Numéro du demandeur à servir en premier (verrou requis)."""
+        if not self._waiting:
+            return None
+        return min(self._waiting, key=lambda seq: self._rank(self._waiting[seq][0], seq, now))
+
+    def acquire(self, priority=INTERACTIVE, client=None, cancel_event=None, timeout=None):
+        """
+        Attend un créneau de recherche.
+
+        Args:
+            priority: INTERACTIVE, MATCHMAKING ou BACKGROUND
+            client: Identifiant du demandeur (utilisateur, session...) pour le partage équitable
+            cancel_event: Événement (is_set()) qui interrompt l'attente
+            timeout: Attente maximale en secondes (None = illimitée)
+
+        Returns:
+            SearchSlot, ou None si l'attente a été annulée
+
+        Raises:
+            ValueError: Si la priorité est inconnue
+            TimeoutError: Si aucun créneau ne se libère à temps
+        """
+        if priority not in PRIORITY_NAMES:
+            raise ValueError(f"Priorité inconnue: {priority}")
+
+        slot = SearchSlot(self, priority, client)
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._condition:
+            seq = next(self._sequence)
+            self._waiting[seq] = (slot, start)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._running < self.max_concurrent and self._next_waiter(now) == seq:
+                        break
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    if deadline is not None and now >= deadline:
+                        raise TimeoutError("Aucun créneau de recherche disponible dans le délai imparti")
+                    # Réveil périodique pour surveiller cancel_event
+                    wait = 0.1 if deadline is None else min(0.1, deadline - now)
+                    self._condition.wait(wait)
+            finally:
+                del self._waiting[seq]
+                # Un autre demandeur peut être devenu le premier de la file
+                self._condition.notify_all()
+
+            waited = time.monotonic() - start
+            stats = self._class_stats[priority]
+            stats['granted'] += 1
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+            self._running += 1
+            self._client_running[client] = self._client_running.get(client, 0) + 1
+            slot.granted_at = time.monotonic()
+        return slot
+
+    def release(self, slot, preempted=False):
+        """
+        Rend un créneau et comptabilise son temps d'occupation pour le client.
+
+        Args:
+            slot: SearchSlot obtenu par acquire()
+            preempted: True si le créneau est rendu à la demande de should_yield()
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._running -= 1
+            remaining = self._client_running[slot.client] - 1
+            if remaining:
+                self._client_running[slot.client] = remaining
+            else:
+                del self._client_running[slot.client]
+            self._client_usage[slot.client] = (self._usage(slot.client, now) + now - slot.granted_at, now)
+            if preempted:
+                self._class_stats[slot.priority]['preempted'] += 1
+            self._condition.notify_all()
+
+    def _should_yield(self, slot):
+        with self._condition:
+            if self._running < self.max_concurrent:
+                return False
+            now = time.monotonic()
+            seq = self._next_waiter(now)
+            if seq is None:
+                return False
+            waiter = self._waiting[seq][0]
+            if waiter.priority != slot.priority:
+                return waiter.priority < slot.priority
+            # Même classe : céder seulement si le partage devient plus équitable
+            return (waiter.client != slot.client and
+                    self._client_running.get(waiter.client, 0) + 1 < self._client_running.get(slot.client, 0))
+
+    def stats(self):
+        """
+        Occupation et attentes par classe de priorité.
+
+        Returns:
+            dict: Créneaux occupés, profondeur de file et temps d'attente par classe
+        """
+        with self._condition:
+            now = time.monotonic()
+            classes = {}
+            for priority, name in PRIORITY_NAMES.items():
+                stats = self._class_stats[priority]
+                waits = [now - start for slot, start in self._waiting.values() if slot.priority == priority]
+                classes[name] = {
+                    'queued': len(waits),
+                    'oldest_wait_ms': round(1000 * max(waits), 2) if waits else 0.0,
+                    'granted': stats['granted'],
+                    'preempted': stats['preempted'],
+                    'avg_wait_ms': round(1000 * stats['total_wait'] / stats['granted'], 2) if stats['granted'] else 0.0,
+                    'max_wait_ms': round(1000 * stats['max_wait'], 2),
+                }
+            return {
+                'max_concurrent': self.max_concurrent,
+                'running': self._running,
+                'clients': len(self._client_running),
+                'classes': classes,
+            }
+
+
+def create_engine_scheduler(pool_size):
+    """
+    Crée l'ordonnanceur dont le plafond peut être fixé par la variable
+    d'environnement ENGINE_MAX_CONCURRENT_SEARCHES (défaut: taille du pool).
+    """
+    max_concurrent = int(os.environ.get('ENGINE_MAX_CONCURRENT_SEARCHES', pool_size))
+    return EngineScheduler(min(max_concurrent, pool_size),
+                           usage_half_life=float(os.environ.get('ENGINE_USAGE_HALF_LIFE', 60)))
@@ -0,0 +1,207 @@
+"""
+Cache persistant des évaluations Stockfish.
+
+Clé : hash Zobrist (python-chess) + camp au trait. Deux niveaux :
+- un LRU en mémoire, propre au processus ;
+- une base SQLite sur disque, partagée entre processus et conservée entre
+  les redémarrages.
+
+Chaque entrée mémorise les scores multipv, la profondeur atteinte et la
+version du moteur. Une recherche exige une profondeur minimale : un résultat
+peu profond ne satisfait jamais une demande profonde.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+
+def position_key(board: chess.Board):
+    """
+    Calcule la clé de cache d'une position.
+
+    Returns:
+        Tuple (hash Zobrist signé sur 64 bits, camp au trait)
+    """
+    zobrist = chess.polyglot.zobrist_hash(board)
+    # SQLite ne stocke que des entiers signés 64 bits
+    if zobrist >= 1 << 63:
+        zobrist -= 1 << 64
+    return zobrist, int(board.turn)
+
+
+class EvaluationCache:
+    """Cache d'évaluations à deux niveaux (LRU mémoire + SQLite)."""
+
+    def __init__(self, path=None, max_memory_entries=100000):
+        """
+        Args:
+            path: Fichier SQLite (None = cache uniquement en mémoire)
+            max_memory_entries: Nombre de positions gardées dans le LRU
+        """
+        self.path = str(path) if path else None
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'disk_errors': 0}
+
+        if self.path:
+            try:
+                self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                self._connection.execute('PRAGMA journal_mode=WAL')
+                self._connection.execute('PRAGMA synchronous=NORMAL')
+                self._connection.execute('''
+                    CREATE TABLE IF NOT EXISTS evaluations (
+                        zobrist INTEGER NOT NULL,
+                        white_to_move INTEGER NOT NULL,
+                        multipv INTEGER NOT NULL,
+                        depth INTEGER NOT NULL,
+                        scores_cp TEXT NOT NULL,
+                        scores_str TEXT NOT NULL,
+                        engine_version TEXT,
+                        created_at REAL NOT NULL,
+                        PRIMARY KEY (zobrist, white_to_move, multipv)
+                    )
+                ''')
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache d'évaluation SQLite indisponible ({self.path}): {e}")
+                self._connection = None
+
+    @staticmethod
+    def _satisfies(entry, min_depth, multipv, engine_version):
+        return (entry['depth'] >= min_depth
+                and entry['multipv'] >= multipv
+                and (engine_version is None or entry['engine_version'] == engine_version))
+
+    def get(self, board: chess.Board, min_depth, multipv=1, engine_version=None):
+        """
+        Cherche une évaluation au moins aussi profonde que demandé.
+
+        Args:
+            board: Position recherchée
+            min_depth: Profondeur minimale exigée
+            multipv: Nombre minimal de lignes principales
+            engine_version: Si fourni, ignore les entrées d'une autre version du moteur
+
+        Returns:
+            dict (scores_cp, scores_str, depth, multipv, engine_version) ou None
+        """
+        key = position_key(board)
+
+        with self._lock:
+            entries = self._memory.get(key)
+            if entries is not None:
+                self._memory.move_to_end(key)
+                for entry in entries.values():
+                    if self._satisfies(entry, min_depth, multipv, engine_version):
+                        self._stats['memory_hits'] += 1
+                        return entry
+
+            entry = self._disk_get(key, min_depth, multipv, engine_version)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            self._stats['disk_hits'] += 1
+            self._remember(key, entry)
+            return entry
+
+    def put(self, board: chess.Board, scores_cp, scores_str, depth, engine_version=None):
+        """
+        Enregistre une évaluation, sauf si une entrée plus profonde existe déjà
+        pour le même nombre de lignes.
+
+        Args:
+            board: Position évaluée
+            scores_cp: Scores en centipions (point de vue des Blancs), un par ligne
+            scores_str: Scores formatés, un par ligne
+            depth: Profondeur atteinte par la recherche
+            engine_version: Version du moteur ('id name')
+        """
+        key = position_key(board)
+        entry = {
+            'scores_cp': list(scores_cp),
+            'scores_str': list(scores_str),
+            'depth': int(depth),
+            'multipv': len(scores_cp),
+            'engine_version': engine_version,
+        }
+
+        with self._lock:
+            previous = self._memory.get(key, {}).get(entry['multipv'])
+            if previous and previous['depth'] > entry['depth'] and previous['engine_version'] == engine_version:
+                return
+            self._remember(key, entry)
+            self._stats['writes'] += 1
+            self._disk_put(key, entry)
+
+    def _remember(self, key, entry):
+        entries = self._memory.setdefault(key, {})
+        entries[entry['multipv']] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key, min_depth, multipv, engine_version):
+        if self._connection is None:
+            return None
+        query = ('SELECT scores_cp, scores_str, depth, multipv, engine_version FROM evaluations '
+                 'WHERE zobrist = ? AND white_to_move = ? AND multipv >= ? AND depth >= ?')
+        args = [key[0], key[1], multipv, min_depth]
+        if engine_version is not None:
+            query += ' AND engine_version = ?'
+            args.append(engine_version)
+        query += ' ORDER BY depth DESC LIMIT 1'
+        try:
+            row = self._connection.execute(query, args).fetchone()
+        except sqlite3.Error:
+            self._stats['disk_errors'] += 1
+            return None
+        if row is None:
+            return None
+        return {
+            'scores_cp': json.loads(row[0]),
+            'scores_str': json.loads(row[1]),
+            'depth': row[2],
+            'multipv': row[3],
+            'engine_version': row[4],
+        }
+
+    def _disk_put(self, key, entry):
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(
+                'INSERT INTO evaluations (zobrist, white_to_move, multipv, depth, scores_cp, '
+                'scores_str, engine_version, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (zobrist, white_to_move, multipv) DO UPDATE SET '
+                'depth = excluded.depth, scores_cp = excluded.scores_cp, scores_str = excluded.scores_str, '
+                'engine_version = excluded.engine_version, created_at = excluded.created_at '
+                'WHERE excluded.depth >= evaluations.depth OR '
+                'excluded.engine_version IS NOT evaluations.engine_version',
+                (key[0], key[1], entry['multipv'], entry['depth'], json.dumps(entry['scores_cp']),
+                 json.dumps(entry['scores_str']), entry['engine_version'], time.time()))
+            self._connection.commit()
+        except sqlite3.Error:
+            self._stats['disk_errors'] += 1
+
+    def stats(self):
+        """
+        Retourne les compteurs de hits/misses par niveau.
+
+        Returns:
+            dict: Statistiques du cache
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        stats['path'] = self.path
+        return stats
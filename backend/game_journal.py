@@ -0,0 +1,522 @@
+"""
+Journal des parties en cours, pour reprendre après un redémarrage.
+
+Les parties (games), les parties acceptées en attente (app.pending_games)
+et les défis ne vivaient qu'en mémoire : un déploiement ou le redémarrage
+d'un worker les perdait toutes. Chaque événement est ajouté à un journal
+local en ajout seul (events.log, une ligne JSON par événement) :
+- create : partie commencée (joueurs, cadence, position de départ) ;
+- move : coup joué (code 16 bits) et état des pendules ;
+- clock : battement périodique, dernier instant où le serveur vivait ;
+- end : partie terminée ou retirée ;
+- pending / pending_end, challenge / challenge_end : parties en attente et défis.
+
+Le coût côté handler se limite à ajouter une liste à un tampon sous verrou
+(quelques microsecondes, voir --bench). Un thread système sérialise le
+tampon, l'écrit et fait un fsync par lot (JOURNAL_FSYNC_INTERVAL) : un arrêt
+brutal perd au plus le dernier intervalle. Le même thread applique les
+événements à une copie de l'état, qu'il écrit régulièrement en instantané
+compact (snapshot.json) avant de vider le journal ; chaque événement porte
+un numéro de séquence, ce qui rend la reprise correcte même si l'arrêt
+survient entre l'instantané et la remise à zéro du journal.
+
+Au démarrage, instantané + fin du journal reconstruisent l'état ; les
+pendules sont décalées de la durée de l'interruption. Les joueurs d'une
+partie restaurée la rejoignent avec join_game (nouveau SID).
+
+La file d'attente du matchmaking n'est pas journalisée : elle est liée aux
+SID des sockets, qui changent à la reconnexion.
+
+Variables d'environnement :
+    JOURNAL_DIR                Répertoire du journal ('' = désactivé, défaut: backend/game_journal)
+    JOURNAL_FSYNC_INTERVAL     Secondes entre deux écritures + fsync (défaut: 0.2)
+    JOURNAL_SNAPSHOT_INTERVAL  Secondes entre deux instantanés (défaut: 60)
+    JOURNAL_HEARTBEAT          Secondes entre deux battements avec des parties en cours (défaut: 5)
+
+Exemples:
+    python -m backend.game_journal backend/game_journal
+    python -m backend.game_journal --bench 1000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from backend.native_threads import native, start_native_thread
+
+# Types d'événements
+CREATE = 'create'
+MOVE = 'move'
+CLOCK = 'clock'
+END = 'end'
+PENDING = 'pending'
+PENDING_END = 'pending_end'
+CHALLENGE = 'challenge'
+CHALLENGE_END = 'challenge_end'
+
+EVENTS_FILE = 'events.log'
+SNAPSHOT_FILE = 'snapshot.json'
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.timestamp()}
+    raise TypeError(f"Type non journalisable: {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and '$dt' in obj:
+        return datetime.fromtimestamp(obj['$dt'])
+    return obj
+
+
+def dumps(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=_encode)
+
+
+def loads(text):
+    return json.loads(text, object_hook=_decode)
+
+
+class JournalState:
+    """État reconstruit à partir des événements (parties, parties en attente, défis)."""
+
+    def __init__(self):
+        self.seq = 0
+        self.last_seen = None  # Horodatage du dernier événement
+        self.games = {}        # game_id -> dict (voir Game.to_journal), 'moves' en liste de codes
+        self.pending = {}      # game_id -> infos de la partie en attente
+        self.challenges = {}   # challenge_id -> défi
+
+    def apply(self, record):
+        """
+        Applique un événement [seq, type, horodatage, ...].
+
+        Returns:
+            False si l'événement était déjà compris dans l'état (seq ancien)
+        """
+        seq, kind, at = record[0], record[1], record[2]
+        if seq <= self.seq:
+            return False
+        self.seq = seq
+        self.last_seen = at
+        if kind == MOVE:
+            game = self.games.get(record[3])
+            if game is not None:
+                game['moves'].append(record[4])
+                game['white_time'], game['black_time'], game['last_move_time'] = record[5:8]
+        elif kind == CREATE:
+            data = dict(record[3], moves=list(record[3].get('moves', ())))
+            self.games[data['game_id']] = data
+            self.pending.pop(data['game_id'], None)
+        elif kind == END:
+            self.games.pop(record[3], None)
+        elif kind == PENDING:
+            self.pending[record[3]] = record[4]
+        elif kind == PENDING_END:
+            self.pending.pop(record[3], None)
+        elif kind == CHALLENGE:
+            self.challenges[record[3]] = record[4]
+        elif kind == CHALLENGE_END:
+            self.challenges.pop(record[3], None)
+        return True
+
+    def to_dict(self):
+        return {'seq': self.seq, 'last_seen': self.last_seen, 'games': self.games,
+                'pending': self.pending, 'challenges': self.challenges}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.seq = data.get('seq', 0)
+        state.last_seen = data.get('last_seen')
+        state.games = data.get('games', {})
+        state.pending = data.get('pending', {})
+        state.challenges = data.get('challenges', {})
+        return state
+
+
+def truncate_torn_tail(path):
+    """
+    Supprime une dernière ligne incomplète (arrêt pendant une écriture), pour
+    que les événements ajoutés ensuite commencent sur une ligne propre.
+
+    Returns:
+        int: Octets supprimés
+    """
+    if not path.exists():
+        return 0
+    with open(path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        valid_size = size
+        # Remonter par blocs jusqu'au dernier saut de ligne
+        while valid_size > 0:
+            start = max(0, valid_size - 4096)
+            f.seek(start)
+            block = f.read(valid_size - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                valid_size = start + newline + 1
+                break
+            valid_size = start
+        if valid_size < size:
+            f.truncate(valid_size)
+            f.flush()
+            os.fsync(f.fileno())
+    return size - valid_size
+
+
+def read_state(directory):
+    """
+    Reconstruit l'état d'un répertoire de journal (instantané puis événements plus récents).
+
+    Une dernière ligne incomplète (arrêt pendant une écriture) est ignorée.
+
+    Returns:
+        Tuple (JournalState, événements rejoués, lignes illisibles)
+    """
+    directory = Path(directory)
+    state = JournalState()
+    snapshot_path = directory / SNAPSHOT_FILE
+    if snapshot_path.exists():
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            state = JournalState.from_dict(loads(f.read()))
+    replayed = corrupt = 0
+    events_path = directory / EVENTS_FILE
+    if events_path.exists():
+        with open(events_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = loads(line)
+                except ValueError:
+                    corrupt += 1
+                    continue
+                replayed += state.apply(record)
+    return state, replayed, corrupt
+
+
+class GameJournal:
+    """Journal en ajout seul, écrit et synchronisé par lots par un thread système."""
+
+    def __init__(self, directory=None, fsync_interval=0.2, snapshot_interval=60.0, heartbeat_interval=5.0):
+        """
+        Args:
+            directory: Répertoire du journal (None = journal désactivé, appels sans effet ;
+                de même tant que recover n'a pas ouvert le journal)
+            fsync_interval: Secondes entre deux écritures + fsync
+            snapshot_interval: Secondes entre deux instantanés
+            heartbeat_interval: Secondes entre deux battements (s'il y a des parties en cours)
+        """
+        self.directory = Path(directory) if directory else None
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self.heartbeat_interval = heartbeat_interval
+        # Verrous système : le thread d'écriture n'est pas une greenlet
+        self._lock = native('Lock')()
+        self._io_lock = native('Lock')()
+        self._stop = native('Event')()
+        self._buffer = []
+        self._seq = 0
+        self._state = JournalState()
+        self._file = None
+        self._running = False
+        self._last_write = time.time()
+        self._last_snapshot = time.time()
+        self._since_snapshot = 0
+        self._written = 0
+        self._fsyncs = 0
+        self._snapshots = 0
+        self._fsync_seconds = 0.0
+        self._last_error = None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    # ---- Événements (appelés depuis les handlers) ----
+
+    def _append(self, kind, *payload):
+        if self._file is None:
+            # Journal désactivé, ou pas encore ouvert par recover (scripts, benchmarks)
+            return
+        at = time.time()
+        with self._lock:
+            self._seq += 1
+            self._buffer.append([self._seq, kind, at, *payload])
+
+    def create(self, game):
+        """Partie commencée (après games.add)."""
+        self._append(CREATE, game.to_journal())
+
+    def move(self, game_id, code, white_time, black_time, last_move_time):
+        """Coup joué : code 16 bits (voir socket_manager.encode_move) et pendules après le coup."""
+        self._append(MOVE, game_id, code, white_time, black_time, last_move_time)
+
+    def end(self, game_id, result=None):
+        """Partie terminée ou retirée de la mémoire."""
+        self._append(END, game_id, result)
+
+    def pending(self, game_id, game_info):
+        """Partie acceptée, en attente de ses joueurs (copie sans les SID)."""
+        self._append(PENDING, game_id, {key: value for key, value in game_info.items() if key != 'sids'})
+
+    def pending_end(self, game_id):
+        self._append(PENDING_END, game_id)
+
+    def challenge(self, challenge_id, challenge):
+        self._append(CHALLENGE, challenge_id, dict(challenge))
+
+    def challenge_end(self, challenge_id):
+        self._append(CHALLENGE_END, challenge_id)
+
+    # ---- Écriture (thread système) ----
+
+    def recover(self):
+        """
+        Relit le journal et ouvre le fichier d'événements en ajout. À appeler
+        une fois au démarrage, avant start().
+
+        Returns:
+            JournalState à restaurer (None si le journal est désactivé)
+        """
+        if self.directory is None:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        torn = truncate_torn_tail(self.directory / EVENTS_FILE)
+        if torn:
+            print(f"⚠️ Dernière ligne incomplète supprimée du journal ({torn} octet(s))")
+        state, replayed, corrupt = read_state(self.directory)
+        self._state = state
+        self._seq = state.seq
+        self._file = open(self.directory / EVENTS_FILE, 'a', encoding='utf-8')
+        elapsed = time.perf_counter() - started
+        print(f"📒 Journal relu en {elapsed:.3f} s: {len(state.games)} partie(s) en cours, "
+              f"{len(state.pending)} en attente, {len(state.challenges)} défi(s) "
+              f"({replayed} événement(s) rejoué(s){f', {corrupt} ligne(s) illisible(s)' if corrupt else ''})")
+        return state
+
+    def flush(self):
+        """
+        Écrit le tampon, puis fsync, et l'applique à l'état du journal.
+
+        Returns:
+            int: Nombre d'événements écrits
+        """
+        with self._io_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            if not records or self._file is None:
+                return 0
+            self._file.write(''.join(dumps(record) + '\n' for record in records))
+            self._file.flush()
+            started = time.perf_counter()
+            os.fsync(self._file.fileno())
+            self._fsync_seconds += time.perf_counter() - started
+            self._fsyncs += 1
+            for record in records:
+                self._state.apply(record)
+            self._written += len(records)
+            self._since_snapshot += len(records)
+            self._last_write = time.time()
+            return len(records)
+
+    def snapshot(self):
+        """Écrit l'état en instantané (fichier temporaire, fsync, renommage) puis vide le journal."""
+        with self._io_lock:
+            if self._file is None:
+                return
+            tmp_path = self.directory / (SNAPSHOT_FILE + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(dumps(self._state.to_dict()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.directory / SNAPSHOT_FILE)
+            # Les événements restants du journal ont un seq déjà compris dans l'instantané
+            self._file.close()
+            self._file = open(self.directory / EVENTS_FILE, 'w', encoding='utf-8')
+            os.fsync(self._file.fileno())
+            self._snapshots += 1
+            self._since_snapshot = 0
+            self._last_snapshot = time.time()
+
+    def _run(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                now = time.time()
+                if self._state.games and now - self._last_write >= self.heartbeat_interval:
+                    self._append(CLOCK)
+                self.flush()
+                if self._since_snapshot and now - self._last_snapshot >= self.snapshot_interval:
+                    self.snapshot()
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"❌ Erreur d'écriture du journal des parties: {e}", file=sys.stderr)
+
+    def start(self):
+        """Démarre le thread d'écriture (après recover)."""
+        if self.directory is None or self._running:
+            return
+        self._running = True
+        start_native_thread(self._run)
+
+    def close(self):
+        """Arrêt : écrit le tampon, fait un dernier instantané et ferme le journal."""
+        self._stop.set()
+        if self._file is None:
+            return
+        try:
+            self.flush()
+            self.snapshot()
+        finally:
+            with self._io_lock:
+                self._file.close()
+                self._file = None
+            self._running = False
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'running': self._running,
+            'buffered': len(self._buffer),
+            'appended': self._seq,
+            'written': self._written,
+            'fsyncs': self._fsyncs,
+            'fsync_ms': round(1000 * self._fsync_seconds / self._fsyncs, 2) if self._fsyncs else 0.0,
+            'snapshots': self._snapshots,
+            'live_games': len(self._state.games),
+            'last_error': self._last_error,
+        }
+
+
+def create_game_journal():
+    """
+    Crée le journal de l'application, configuré par variables d'environnement
+    (JOURNAL_DIR, JOURNAL_FSYNC_INTERVAL, JOURNAL_SNAPSHOT_INTERVAL, JOURNAL_HEARTBEAT).
+    """
+    return GameJournal(
+        os.environ.get('JOURNAL_DIR', str(Path(__file__).parent / 'game_journal')) or None,
+        fsync_interval=float(os.environ.get('JOURNAL_FSYNC_INTERVAL', 0.2)),
+        snapshot_interval=float(os.environ.get('JOURNAL_SNAPSHOT_INTERVAL', 60)),
+        heartbeat_interval=float(os.environ.get('JOURNAL_HEARTBEAT', 5)),
+    )
+
+
+journal = create_game_journal()
+
+
+def bench(games=200, moves=80, seed=0):
+    """
+    Coût du journal sur des parties aléatoires jouées avec socket_manager.Game,
+    dans un répertoire temporaire : make_move sans puis avec journal, écriture
+    et fsync par lots, reprise depuis le journal puis depuis l'instantané.
+
+    Returns:
+        dict de métriques
+    """
+    import chess
+
+    from backend import socket_manager
+    from backend.benchmark_game_memory import random_games
+    from backend.socket_manager import Game
+
+    scripts = random_games(games, moves, seed)
+    played = sum(len(script) for script in scripts)
+
+    def play(target):
+        socket_manager.journal = target
+        started = time.perf_counter()
+        for i, script in enumerate(scripts):
+            game = Game('w', 'b', f"user-w{i}", f"user-b{i}", chess.STARTING_FEN, time_control={'minutes': 60},
+                        player1_name=f"w{i}", player2_name=f"b{i}", player1_color=chess.WHITE, game_id=f"bench-{i}")
+            target.create(game)
+            for ply, uci in enumerate(script):
+                game.make_move('w' if ply % 2 == 0 else 'b', uci)
+        return time.perf_counter() - started
+
+    def restore(directory):
+        started = time.perf_counter()
+        state, _, _ = read_state(directory)
+        for data in state.games.values():
+            Game.from_journal(data)
+        return time.perf_counter() - started
+
+    previous = socket_manager.journal
+    try:
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            baseline = play(GameJournal(None))
+            bench_journal = GameJournal(directory, snapshot_interval=3600)
+            bench_journal.recover()
+            journaled = play(bench_journal)
+
+            # Appel seul, sur un journal jamais écrit
+            append_journal = GameJournal(Path(directory) / 'append')
+            append_journal.recover()
+            now = datetime.now()
+            started = time.perf_counter()
+            for _ in range(played):
+                append_journal.move('bench-0', 796, 287.5, 291.25, now)
+            append_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            written = bench_journal.flush()
+            flush_seconds = time.perf_counter() - started
+            from_log = restore(directory)
+
+            started = time.perf_counter()
+            bench_journal.snapshot()
+            snapshot_seconds = time.perf_counter() - started
+            bench_journal.close()
+            from_snapshot = restore(directory)
+    finally:
+        socket_manager.journal = previous
+    return {
+        'games': games,
+        'moves': played,
+        'make_move_us': round(1e6 * baseline / played, 1),
+        'journaled_make_move_us': round(1e6 * journaled / played, 1),
+        'append_us': round(1e6 * append_seconds / played, 2),
+        'flush_us': round(1e6 * flush_seconds / written, 2),
+        'snapshot_seconds': round(snapshot_seconds, 3),
+        'restore_from_log_seconds': round(from_log, 3),
+        'restore_from_snapshot_seconds': round(from_snapshot, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Journal des parties en cours")
+    parser.add_argument('directory', nargs='?', default=str(Path(__file__).parent / 'game_journal'),
+                        help="Répertoire du journal à relire")
+    parser.add_argument('--bench', type=int, metavar='N', help="Mesurer le coût du journal sur N parties aléatoires")
+    parser.add_argument('--moves', type=int, default=80, help="Demi-coups par partie pour --bench (au plus)")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        result = bench(args.bench, args.moves)
+        print(f"📊 {result['games']} parties, {result['moves']} coups")
+        print(f"📊 ajout au journal: {result['append_us']} µs/coup dans le handler "
+              f"(make_move {result['make_move_us']} µs sans journal, {result['journaled_make_move_us']} µs avec)")
+        print(f"📊 écriture + fsync par lot: {result['flush_us']} µs/événement (thread d'écriture)")
+        print(f"📊 reprise: {result['restore_from_log_seconds']} s depuis le journal, "
+              f"{result['restore_from_snapshot_seconds']} s depuis l'instantané "
+              f"(instantané écrit en {result['snapshot_seconds']} s)")
+        return result
+
+    state, replayed, corrupt = read_state(args.directory)
+    print(f"📒 {args.directory}: seq {state.seq}, {replayed} événement(s) après l'instantané, "
+          f"{corrupt} ligne(s) illisible(s)")
+    if state.last_seen:
+        print(f"   dernier événement: {datetime.fromtimestamp(state.last_seen).isoformat()}")
+    for game_id, game in state.games.items():
+        print(f"   {game_id}: {game['white'][1]} - {game['black'][1]}, {len(game['moves'])} coup(s)")
+    print(f"   {len(state.pending)} partie(s) en attente, {len(state.challenges)} défi(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Tâches de génération asynchrones.
+
+Une tâche est soumise avec ses paramètres et reçoit un identifiant ; elle
+tourne dans un thread système (hors de la greenlet de la requête) et publie
+sa progression, que l'application relaie par Socket.IO. Les tâches peuvent
+être annulées et ont un délai maximal d'exécution.
+"""
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from backend.native_threads import native, start_native_thread
+
+# Statuts d'une tâche
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+EXPIRED = 'expired'
+
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED, EXPIRED)
+
+
+class GenerationJob:
+    """Une demande de génération et son état courant."""
+
+    def __init__(self, params, timeout, owner=None):
+        self.id = uuid.uuid4().hex
+        self.params = dict(params)
+        self.owner = owner
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = self.created_at + timeout
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.cancel_event = native('Event')()
+        # Incrémenté à chaque changement, pour ne relayer que les nouveautés
+        self.version = 0
+
+    def to_dict(self):
+        """Représentation JSON de la tâche."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'deadline': self.deadline,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class GenerationJobManager:
+    """File de tâches de génération exécutées par des threads système."""
+
+    def __init__(self, generate_fn, workers=1, default_timeout=300, max_timeout=900,
+                 max_pending=20, retention_seconds=600):
+        """
+        Args:
+            generate_fn: Fonction de génération (generate_fen_position), appelée avec
+                progress_callback, cancel_event, deadline et client
+            workers: Nombre de tâches exécutées simultanément
+            default_timeout: Délai par défaut d'une tâche (s, file d'attente comprise)
+            max_timeout: Délai maximal accepté
+            max_pending: Nombre maximal de tâches en attente ou en cours
+            retention_seconds: Durée de conservation d'une tâche terminée
+        """
+        self.generate_fn = generate_fn
+        self.workers = workers
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._published = {}
+        self._condition = native('Condition')()
+        self._started = False
+
+    def start(self):
+        """Démarre les threads d'exécution (idempotent)."""
+        with self._condition:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.workers):
+            start_native_thread(self._worker)
+
+    def submit(self, params, timeout=None, owner=None):
+        """
+        Met une génération en file d'attente.
+
+        Args:
+            params: Paramètres de generate_fen_position
+            timeout: Délai maximal en secondes (défaut: default_timeout)
+            owner: Identifiant de l'utilisateur (optionnel)
+
+        Returns:
+            GenerationJob
+
+        Raises:
+            ValueError: Si le délai est invalide ou la file est pleine
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        if timeout < 1 or timeout > self.max_timeout:
+            raise ValueError(f"timeout doit être entre 1 et {self.max_timeout:g} secondes")
+
+        self.start()
+        with self._condition:
+            self._purge()
+            pending = sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATUSES)
+            if pending >= self.max_pending:
+                raise ValueError("Trop de générations en cours, réessayez plus tard")
+            job = GenerationJob(params, timeout, owner)
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            job.version += 1
+            self._condition.notify()
+        return job
+
+    def get(self, job_id):
+        """Retourne la tâche (ou None si inconnue ou expirée de la mémoire)."""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        """Retourne l'état JSON d'une tâche (ou None)."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def cancel(self, job_id):
+        """
+        Demande l'annulation d'une tâche. Une tâche en file est annulée tout de
+        suite ; une tâche en cours s'arrête à la prochaine vérification.
+
+        Returns:
+            bool: False si la tâche est inconnue ou déjà terminée
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return False
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED, error="Génération annulée")
+            return True
+
+    def drain_updates(self):
+        """
+        Retourne l'état des tâches modifiées depuis le dernier appel.
+
+        Returns:
+            Liste de dicts (voir GenerationJob.to_dict)
+        """
+        with self._condition:
+            updates = []
+            for job in self._jobs.values():
+                if self._published.get(job.id) != job.version:
+                    self._published[job.id] = job.version
+                    updates.append(job.to_dict())
+            return updates
+
+    def stats(self):
+        """Nombre de tâches par statut."""
+        with self._condition:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'workers': self.workers, 'queued': len(self._queue), 'jobs': counts}
+
+    def _finish(self, job, status, result=None, error=None):
+        """Passe une tâche à un statut final. Verrou requis."""
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.version += 1
+
+    def _purge(self):
+        """Oublie les tâches terminées depuis plus de retention_seconds. Verrou requis."""
+        limit = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self._jobs.values()
+                       if j.status in FINISHED_STATUSES and j.finished_at < limit]:
+            del self._jobs[job_id]
+            self._published.pop(job_id, None)
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait(timeout=30)
+                    self._purge()
+                job = self._queue.popleft()
+                if time.time() >= job.deadline:
+                    self._finish(job, EXPIRED, error="Délai de génération dépassé")
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.version += 1
+            self._run(job)
+
+    def _run(self, job):
+        def on_progress(progress):
+            with self._condition:
+                job.progress = progress
+                job.version += 1
+
+        try:
+            result = self.generate_fn(progress_callback=on_progress, cancel_event=job.cancel_event,
+                                      deadline=job.deadline, client=job.owner, **job.params)
+        except TimeoutError as e:
+            status, result, error = EXPIRED, None, str(e)
+        except Exception as e:
+            if job.cancel_event.is_set():
+                status, result, error = CANCELLED, None, str(e)
+            else:
+                print(f"❌ Erreur de la génération {job.id}: {e}")
+                status, result, error = FAILED, None, str(e)
+        else:
+            status, error = DONE, None
+
+        with self._condition:
+            self._finish(job, status, result=result, error=error)
+
+
+def create_job_manager():
+    """
+    Crée le gestionnaire de tâches de l'application, configuré par variables
+    d'environnement (GENERATION_JOB_WORKERS, GENERATION_JOB_TIMEOUT,
+    GENERATION_JOB_MAX_TIMEOUT, GENERATION_JOB_MAX_PENDING).
+    """
+    from backend.chess_generator import generate_fen_position
+
+    return GenerationJobManager(
+        generate_fen_position,
+        workers=int(os.environ.get('GENERATION_JOB_WORKERS', 1)),
+        default_timeout=float(os.environ.get('GENERATION_JOB_TIMEOUT', 300)),
+        max_timeout=float(os.environ.get('GENERATION_JOB_MAX_TIMEOUT', 900)),
+        max_pending=int(os.environ.get('GENERATION_JOB_MAX_PENDING', 20)),
+    )
+
+
+job_manager = create_job_manager()
@@ -0,0 +1,309 @@
+"""
+Stratégies de génération des candidats.
+
+- 'placement' : placement aléatoire des pièces selon la table des
+  compositions (échantillonneurs vectorisés, sans moteur) ;
+- 'playout' : partie semi-aléatoire guidée par le moteur depuis la position
+  initiale (coups parmi les 3 meilleurs d'une analyse rapide, parfois un coup
+  au hasard), arrêtée dès que la composition matérielle respecte les
+  paramètres.
+
+Chaque génération est attribuée à une stratégie. Par bucket de paramètres
+et par stratégie, on compte les générations, les positions trouvées, les
+évaluations et les acceptations du moteur, et le temps moteur (évaluations
+et guidage). En mode 'auto', la stratégie la moins chère en secondes moteur
+par position trouvée l'emporte ; seules les générations d'arrière-plan
+explorent les autres.
+
+Rapport :
+    python -m backend.generation_strategies backend/strategy_stats.json
+"""
+import abc
+import argparse
+import json
+import os
+import random
+import threading
+from pathlib import Path
+
+import chess
+import chess.engine
+
+AUTO = 'auto'
+
+STRATEGIES = {}
+
+
+def register_strategy(strategy):
+    """Ajoute une stratégie au registre (la première enregistrée est la stratégie par défaut)."""
+    if strategy.name in STRATEGIES or strategy.name == AUTO:
+        raise ValueError(f"Stratégie déjà enregistrée: {strategy.name}")
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+def get_strategy(name):
+    """
+    Raises:
+        ValueError: Si la stratégie est inconnue
+    """
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Stratégie inconnue: {name} (disponibles: {', '.join(STRATEGIES)}, {AUTO})") from None
+
+
+class GenerationStrategy:
+    """
+    Stratégie de génération.
+
+    Une stratégie sans moteur (engine_guided = False) est servie par les
+    processus échantillonneurs ; une stratégie guidée par le moteur produit
+    ses candidats dans les consommateurs, avec le moteur qu'ils ont emprunté.
+    """
+
+    name = None
+    description = ''
+    engine_guided = False
+
+
+class GuidedStrategy(GenerationStrategy, metaclass=abc.ABCMeta):
+    """Stratégie guidée par le moteur : les consommateurs appellent candidate()."""
+
+    engine_guided = True
+
+    @abc.abstractmethod
+    def candidate(self, pooled, table, rng, should_stop):
+        """
+        Produit un candidat avec un moteur du pool.
+
+        Args:
+            pooled: PooledEngine emprunté par le consommateur
+            table: CompositionTable des paramètres de la génération
+            rng: random.Random
+            should_stop: Fonction sans argument, vraie quand le consommateur doit
+                rendre la main (arrêt, annulation, délai, créneau à céder) ;
+                consultée à chaque analyse
+
+        Returns:
+            Tuple (board ou None, white_mat, black_mat, indice de composition, positions examinées)
+        """
+
+
+class PlacementStrategy(GenerationStrategy):
+    name = 'placement'
+    description = "Placement aléatoire des pièces (sans moteur)"
+
+
+class PlayoutStrategy(GuidedStrategy):
+    name = 'playout'
+    description = "Partie semi-aléatoire guidée par le moteur depuis la position initiale"
+
+    def __init__(self, guide_depth=4, random_move_rate=0.2, max_plies=200):
+        """
+        Args:
+            guide_depth: Profondeur de l'analyse (3 lignes) qui choisit les coups
+            random_move_rate: Probabilité de jouer un coup légal au hasard
+            max_plies: Longueur maximale d'une partie
+        """
+        self.guide_limit = chess.engine.Limit(depth=guide_depth)
+        self.random_move_rate = random_move_rate
+        self.max_plies = max_plies
+
+    def candidate(self, pooled, table, rng, should_stop):
+        from backend.compositions import MATERIAL_VALUES
+
+        strong_min = int(table.strong_material.min())
+        board = chess.Board()
+        plies = 0
+        while plies < self.max_plies and not board.is_game_over():
+            if should_stop():
+                return None, 0, 0, None, plies
+            legal_moves = list(board.legal_moves)
+            move = None
+            if rng.random() >= self.random_move_rate:
+                try:
+                    analysis = pooled.analyse(board, self.guide_limit, multipv=3)
+                    lines = [info['pv'][0] for info in analysis if info.get('pv')]
+                    move = rng.choice(lines) if lines else None
+                except Exception:
+                    move = None
+                if pooled.broken:
+                    return None, 0, 0, None, plies
+            board.push(move or rng.choice(legal_moves))
+            plies += 1
+
+            sides = [[pt for pt in MATERIAL_VALUES for _ in board.pieces(pt, color)]
+                     for color in (chess.WHITE, chess.BLACK)]
+            white_mat, black_mat = (sum(MATERIAL_VALUES[pt] for pt in side) for side in sides)
+            if max(white_mat, black_mat) < strong_min:
+                # Plus assez de matériel pour aucune composition de la table
+                break
+            index = table.find(*sides)
+            if index is not None:
+                return board, white_mat, black_mat, index, plies
+        return None, 0, 0, None, plies
+
+
+register_strategy(PlacementStrategy())
+register_strategy(PlayoutStrategy(
+    guide_depth=int(os.environ.get('PLAYOUT_GUIDE_DEPTH', 4)),
+    random_move_rate=float(os.environ.get('PLAYOUT_RANDOM_MOVE_RATE', 0.2)),
+    max_plies=int(os.environ.get('PLAYOUT_MAX_PLIES', 200)),
+))
+
+
+class StrategyStats:
+    """Coût des stratégies par bucket de paramètres, persisté en JSON."""
+
+    FIELDS = ('generations', 'found', 'evaluations', 'accepted', 'engine_seconds', 'attempts')
+
+    def __init__(self, path=None, exploration=0.1, min_generations=5):
+        """
+        Args:
+            path: Fichier JSON (None = statistiques uniquement en mémoire)
+            exploration: Probabilité, pour une génération d'arrière-plan, d'essayer une autre stratégie
+            min_generations: Générations d'une stratégie avant de se fier à son coût
+        """
+        if not 0.0 <= exploration <= 1.0:
+            raise ValueError("exploration doit être entre 0 et 1")
+        self.path = Path(path) if path else None
+        self.exploration = exploration
+        self.min_generations = min_generations
+        self._lock = threading.Lock()
+        self._dirty = False
+        # {bucket: {stratégie: {champ: valeur}}}
+        self._buckets = {}
+
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._buckets = json.load(f).get('buckets', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Statistiques des stratégies illisibles ({self.path}): {e}")
+
+    def record(self, bucket, strategy, found, evaluations, accepted, engine_seconds, attempts):
+        """
+        Enregistre le bilan d'une génération.
+
+        Args:
+            bucket: Clé du bucket (voir adaptive_sampling.sampling_bucket)
+            strategy: Nom de la stratégie
+            found: Une position a été trouvée
+            evaluations: Candidats soumis au moteur
+            accepted: Candidats acceptés par le moteur
+            engine_seconds: Temps moteur consommé (évaluations et guidage)
+            attempts: Positions examinées
+        """
+        with self._lock:
+            counts = self._buckets.setdefault(bucket, {}).setdefault(
+                strategy, {field: 0 for field in self.FIELDS})
+            counts['generations'] += 1
+            counts['found'] += int(bool(found))
+            counts['evaluations'] += evaluations
+            counts['accepted'] += accepted
+            counts['engine_seconds'] = round(counts['engine_seconds'] + engine_seconds, 3)
+            counts['attempts'] += attempts
+            self._dirty = True
+
+    def save(self):
+        """Écrit les statistiques si elles ont changé (fichier temporaire puis renommage)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'buckets': self._buckets}, separators=(',', ':'))
+            self._dirty = False
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Impossible d'enregistrer les statistiques des stratégies ({self.path}): {e}")
+
+    @staticmethod
+    def _cost(counts):
+        """Secondes moteur par position trouvée (une génération sans résultat compte pour une demi)."""
+        return counts['engine_seconds'] / max(counts['found'], 0.5)
+
+    def choose(self, bucket, explore=False, rng=random):
+        """
+        Stratégie la moins chère pour un bucket.
+
+        Args:
+            bucket: Clé du bucket
+            explore: Autoriser l'essai des stratégies peu ou pas mesurées
+                (générations d'arrière-plan : le coût de l'exploration n'est
+                pas supporté par un utilisateur qui attend)
+            rng: Générateur aléatoire
+
+        Returns:
+            str: Nom de la stratégie
+        """
+        with self._lock:
+            counts = {name: dict(c) for name, c in self._buckets.get(bucket, {}).items() if name in STRATEGIES}
+        default = next(iter(STRATEGIES))
+        if explore:
+            untried = [name for name in STRATEGIES
+                       if counts.get(name, {}).get('generations', 0) < self.min_generations]
+            if untried:
+                return min(untried, key=lambda name: counts.get(name, {}).get('generations', 0))
+            if rng.random() < self.exploration:
+                return rng.choice(list(STRATEGIES))
+        measured = {name: c for name, c in counts.items() if c['generations'] >= self.min_generations}
+        if not measured:
+            return default
+        return min(measured, key=lambda name: self._cost(measured[name]))
+
+    def report(self, bucket):
+        """
+        Indicateurs par stratégie pour un bucket.
+
+        Returns:
+            dict {stratégie: {générations, taux de réussite, taux d'acceptation, secondes moteur par position...}}
+        """
+        with self._lock:
+            counts = {name: dict(c) for name, c in self._buckets.get(bucket, {}).items()}
+        return {
+            name: {
+                'generations': c['generations'],
+                'found': c['found'],
+                'success_rate': round(c['found'] / c['generations'], 4) if c['generations'] else 0.0,
+                'acceptance_rate': round(c['accepted'] / c['evaluations'], 4) if c['evaluations'] else 0.0,
+                'engine_seconds_per_position': round(self._cost(c), 2),
+                'attempts_per_position': round(c['attempts'] / max(c['found'], 1), 1),
+            }
+            for name, c in counts.items()
+        }
+
+    def stats(self):
+        """Résumé par bucket (indicateurs de chaque stratégie)."""
+        with self._lock:
+            buckets = list(self._buckets)
+        return {'exploration': self.exploration, 'buckets': {bucket: self.report(bucket) for bucket in buckets}}
+
+    def buckets(self):
+        with self._lock:
+            return list(self._buckets)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coût des stratégies de génération par bucket")
+    parser.add_argument('path', nargs='?', default=str(Path(__file__).parent / 'strategy_stats.json'),
+                        help="Fichier de statistiques")
+    args = parser.parse_args(argv)
+
+    stats = StrategyStats(args.path)
+    for bucket in stats.buckets():
+        print(f"📊 {bucket} → {stats.choose(bucket)}")
+        for name, report in stats.report(bucket).items():
+            print(f"   {name}: {report['found']}/{report['generations']} générations réussies, "
+                  f"acceptation moteur {report['acceptance_rate']:.1%}, "
+                  f"{report['engine_seconds_per_position']} s moteur/position, "
+                  f"{report['attempts_per_position']} positions examinées/position")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Threads système, même sous gevent.
+
+En production (gunicorn --worker-class gevent) le module threading est
+patché : un threading.Thread y est une greenlet du hub principal, et une
+génération qui bloque (processus, moteurs UCI) y gèle toutes les sockets.
+Ces utilitaires donnent accès aux threads et primitives d'origine pour que
+les recherches longues tournent à côté de la boucle gevent.
+"""
+import threading
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def native(name):
+    """
+    Retourne une primitive du module threading d'origine (Lock, Event, Condition...).
+
+    Args:
+        name: Nom de l'attribut dans threading
+
+    Returns:
+        La classe non patchée (ou celle de threading sans gevent)
+    """
+    if _gevent_patched():
+        from gevent import monkey
+        return monkey.get_original('threading', name)
+    return getattr(threading, name)
+
+
+def start_native_thread(target, *args):
+    """
+    Démarre `target(*args)` dans un vrai thread système (démon).
+
+    Args:
+        target: Fonction à exécuter
+        *args: Arguments positionnels
+    """
+    if _gevent_patched():
+        from gevent import monkey
+        start_new_thread = monkey.get_original('_thread', 'start_new_thread')
+        start_new_thread(target, args)
+    else:
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+
+def run_in_native_thread(fn, *args, **kwargs):
+    """
+    Exécute un appel bloquant hors de la boucle gevent et attend son résultat.
+
+    Sous gevent, seule la greenlet appelante attend (threadpool du hub) ;
+    sans gevent, l'appel est fait directement.
+
+    Returns:
+        Le résultat de fn(*args, **kwargs)
+    """
+    if _gevent_patched():
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,223 @@
+"""
+Enregistrement différé des parties terminées.
+
+Game.save_to_database tournait dans les handlers Socket.IO (make_move,
+resign, accept_draw) : deux User.query.get, un insert et un commit avant
+la diffusion du dernier coup. Les parties terminées sont désormais mises
+en file et le handler rend la main aussitôt. Une tâche de fond écrit la
+file par lots, dans une transaction par lot :
+- un INSERT multi-lignes dans game_history ;
+- les statistiques des joueurs en UPDATE ensemblistes
+  (UPDATE users SET games_played = games_played + n ... WHERE id IN (...)),
+  une requête par incrément distinct et non plus un objet User par joueur.
+
+Les erreurs passagères (connexion perdue, base verrouillée) sont retentées
+avec une attente croissante ; un lot refusé par la base (contrainte
+violée) est réécrit partie par partie pour isoler la fautive. La file est
+vidée à l'arrêt du processus.
+
+Variables d'environnement :
+    PERSISTENCE_BATCH_SIZE   Parties par lot (défaut: 50)
+    PERSISTENCE_MAX_RETRIES  Tentatives d'un lot à l'arrêt, avant abandon (défaut: 5)
+    PERSISTENCE_RETRY_DELAY  Première attente avant une nouvelle tentative, en s (défaut: 0.5)
+"""
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+
+from backend.db_models import GameHistory, User, db
+
+# Erreurs pour lesquelles le même lot a des chances de passer plus tard
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError)
+
+
+def stats_increments(records):
+    """
+    Incréments des statistiques des joueurs pour un lot de parties.
+
+    Returns:
+        dict {(parties jouées, parties gagnées): [user_id, ...]}
+    """
+    played, won = Counter(), Counter()
+    for record in records:
+        for user_id in (record['white_player_id'], record['black_player_id']):
+            played[user_id] += 1
+        if record['result'] == 'white_win':
+            won[record['white_player_id']] += 1
+        elif record['result'] == 'black_win':
+            won[record['black_player_id']] += 1
+    groups = {}
+    for user_id, count in played.items():
+        groups.setdefault((count, won[user_id]), []).append(user_id)
+    return groups
+
+
+class PersistenceQueue:
+    """File d'écriture différée des parties terminées."""
+
+    def __init__(self, batch_size=50, max_retries=5, retry_delay=0.5, max_retry_delay=30.0):
+        """
+        Args:
+            batch_size: Parties écrites par transaction
+            max_retries: Tentatives d'un lot pendant la vidange finale (en
+                fonctionnement, une erreur passagère est retentée sans limite)
+            retry_delay: Attente avant la première nouvelle tentative (doublée ensuite)
+            max_retry_delay: Attente maximale entre deux tentatives
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être positif")
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.app = None
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        # Un seul écrivain à la fois (tâche de fond ou vidange finale)
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._running = False
+        self._written = 0
+        self._batches = 0
+        self._retries = 0
+        self._failed = 0
+        self._last_error = None
+
+    def init_app(self, app):
+        """Application Flask dont le contexte sert aux écritures."""
+        self.app = app
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, record):
+        """
+        Met une partie terminée en file (ne touche pas à la base).
+
+        Args:
+            record: dict des colonnes de game_history (voir Game.to_record)
+        """
+        self._pending.append(record)
+        self._wakeup.set()
+
+    def _take_batch(self):
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popleft())
+        return batch
+
+    def _write(self, records):
+        """Écrit un lot dans une seule transaction."""
+        db.session.execute(insert(GameHistory).values(records))
+        for (played, won), user_ids in stats_increments(records).items():
+            values = {'games_played': User.games_played + played}
+            if won:
+                values['games_won'] = User.games_won + won
+            db.session.execute(update(User).where(User.id.in_(user_ids)).values(**values))
+        db.session.commit()
+
+    def _persist(self, records):
+        """Écrit un lot, en retentant les erreurs passagères et en isolant les parties refusées."""
+        attempt = 0
+        while True:
+            try:
+                self._write(records)
+                self._written += len(records)
+                self._batches += 1
+                return
+            except TRANSIENT_ERRORS as e:
+                db.session.rollback()
+                attempt += 1
+                self._retries += 1
+                self._last_error = str(e)
+                if self._stopping and attempt > self.max_retries:
+                    self._failed += len(records)
+                    print(f"❌ {len(records)} partie(s) non enregistrée(s) à l'arrêt: {e}")
+                    return
+                delay = min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
+                print(f"⚠️ Écriture des parties impossible ({e}), nouvelle tentative dans {delay:.1f} s")
+                time.sleep(delay)
+            except Exception as e:
+                db.session.rollback()
+                self._last_error = str(e)
+                if len(records) > 1:
+                    # Isoler la ou les parties refusées
+                    for record in records:
+                        self._persist([record])
+                    return
+                self._failed += 1
+                print(f"❌ Partie {records[0]['id']} non enregistrée: {e}")
+                return
+
+    def flush(self):
+        """
+        Écrit toutes les parties en file.
+
+        Returns:
+            int: Nombre de parties écrites
+        """
+        if self.app is None:
+            raise RuntimeError("PersistenceQueue.init_app doit être appelé avant d'écrire")
+        written = self._written
+        with self._flush_lock, self.app.app_context():
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                self._persist(batch)
+            db.session.remove()
+        written = self._written - written
+        if written:
+            print(f"💾 {written} partie(s) enregistrée(s)")
+        return written
+
+    def run(self):
+        """Boucle de la tâche de fond : écrit la file dès qu'elle reçoit des parties."""
+        self._running = True
+        while not self._stopping:
+            self._wakeup.wait(1.0)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"❌ Erreur de la file d'enregistrement des parties: {e}")
+        self._running = False
+
+    def drain(self):
+        """Arrêt : écrit les parties restantes (tentatives limitées) puis arrête la boucle."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._pending:
+            print(f"💾 Vidange de la file: {len(self._pending)} partie(s)")
+            self.flush()
+
+    def stats(self):
+        return {
+            'running': self._running,
+            'pending': len(self._pending),
+            'written': self._written,
+            'batches': self._batches,
+            'retries': self._retries,
+            'failed': self._failed,
+            'last_error': self._last_error,
+        }
+
+
+def create_persistence_queue():
+    """
+    Crée la file de l'application, configurée par variables d'environnement
+    (PERSISTENCE_BATCH_SIZE, PERSISTENCE_MAX_RETRIES, PERSISTENCE_RETRY_DELAY).
+    """
+    return PersistenceQueue(
+        batch_size=int(os.environ.get('PERSISTENCE_BATCH_SIZE', 50)),
+        max_retries=int(os.environ.get('PERSISTENCE_MAX_RETRIES', 5)),
+        retry_delay=float(os.environ.get('PERSISTENCE_RETRY_DELAY', 0.5)),
+    )
+
+
+persistence_queue = create_persistence_queue()
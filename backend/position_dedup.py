@@ -0,0 +1,191 @@
+"""
+Détection des doublons de positions.
+
+Chaque position est ramenée à une forme canonique : la plus petite (ordre
+lexicographique de ses bitboards, trait et droits) de ses formes symétriques
+(miroir des colonnes, inversion des couleurs, voir backend/symmetry.py). La clé est
+le hash Zobrist de cette forme : deux positions équivalentes ont la même clé.
+
+Les clés sont gardées dans un tableau uint64 trié (8 octets par position,
+recherche dichotomique) complété par un petit ensemble d'ajouts récents,
+fusionné dans le tableau par paquets : l'index reste compact à plusieurs
+millions de positions.
+"""
+import threading
+
+import chess
+import chess.polyglot
+import numpy as np
+
+from backend.symmetry import symmetric_boards
+
+MERGE_THRESHOLD = 65536
+
+
+def _form_key(board):
+    # Décrit entièrement la position hors compteurs, sans passer par la FEN
+    return (board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.pawns, board.knights,
+            board.bishops, board.rooks, board.queens, board.kings, board.turn, board.castling_rights,
+            -1 if board.ep_square is None else board.ep_square)
+
+
+def _sorted_unique(keys):
+    """Clés triées sans doublons (un seul tri)."""
+    keys = np.sort(keys)
+    if len(keys) > 1:
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return keys
+
+
+def canonical_board(board, symmetric=True):
+    """
+    Forme canonique d'une position.
+
+    Args:
+        board: chess.Board
+        symmetric: Confondre les formes symétriques (sinon la position elle-même)
+
+    Returns:
+        chess.Board
+    """
+    if not symmetric:
+        return board
+    return min((form for _, form in symmetric_boards(board)), key=_form_key)
+
+
+def position_hash(board, symmetric=True):
+    """Hash Zobrist (uint64) de la forme canonique d'une position."""
+    return chess.polyglot.zobrist_hash(canonical_board(board, symmetric))
+
+
+class DedupIndex:
+    """Ensemble compact de positions déjà vues."""
+
+    def __init__(self, symmetric=True, merge_threshold=MERGE_THRESHOLD):
+        """
+        Args:
+            symmetric: Considérer les formes symétriques comme des doublons
+            merge_threshold: Taille de l'ensemble d'ajouts récents avant fusion
+        """
+        self.symmetric = symmetric
+        self.merge_threshold = merge_threshold
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._recent = set()
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sorted) + len(self._recent)
+
+    def _key(self, position):
+        board = position if isinstance(position, chess.Board) else chess.Board(position)
+        return position_hash(board, self.symmetric)
+
+    def _contains_key(self, key):
+        """Verrou requis."""
+        if key in self._recent:
+            return True
+        i = int(np.searchsorted(self._sorted, np.uint64(key)))
+        return i < len(self._sorted) and int(self._sorted[i]) == key
+
+    def _merge(self):
+        """Verse les ajouts récents dans le tableau trié (verrou requis)."""
+        if self._recent:
+            recent = np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent))
+            self._sorted = _sorted_unique(np.concatenate((self._sorted, recent)))
+            self._recent.clear()
+
+    def contains(self, position):
+        """
+        Indique si la position (ou une forme équivalente) est déjà connue.
+
+        Args:
+            position: chess.Board ou FEN
+        """
+        key = self._key(position)
+        with self._lock:
+            found = self._contains_key(key)
+            self._hits += found
+            return found
+
+    def add(self, position):
+        """
+        Ajoute une position.
+
+        Args:
+            position: chess.Board ou FEN
+
+        Returns:
+            bool: False si la position était déjà connue
+        """
+        key = self._key(position)
+        with self._lock:
+            if self._contains_key(key):
+                return False
+            self._recent.add(key)
+            if len(self._recent) >= self.merge_threshold:
+                self._merge()
+            return True
+
+    def add_many(self, fens):
+        """
+        Ajoute un lot de positions en une seule fusion.
+
+        Args:
+            fens: Itérable de FEN
+
+        Returns:
+            int: Nombre de doublons rencontrés (dans le lot ou déjà connus)
+        """
+        return self.add_hashes(np.fromiter((self._key(fen) for fen in fens), dtype=np.uint64))
+
+    def add_hashes(self, keys):
+        """
+        Ajoute des clés déjà calculées (colonne position_hash d'un PositionStore).
+
+        Args:
+            keys: Tableau de hashs canoniques (uint64), calculés avec le même `symmetric`
+
+        Returns:
+            int: Nombre de doublons rencontrés (dans le lot ou déjà connus)
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        unique = _sorted_unique(keys)
+        with self._lock:
+            self._merge()
+            before = len(self._sorted)
+            self._sorted = _sorted_unique(np.concatenate((self._sorted, unique)))
+            known = before + len(unique) - len(self._sorted)
+        return len(keys) - len(unique) + known
+
+    def stats(self):
+        with self._lock:
+            return {
+                'positions': len(self._sorted) + len(self._recent),
+                'symmetric': self.symmetric,
+                'duplicate_hits': self._hits,
+                'memory_bytes': int(self._sorted.nbytes) + 8 * len(self._recent),
+            }
+
+
+def dedupe_positions(positions, index=None, symmetric=True):
+    """
+    Filtre les doublons d'une suite de positions (ingestion d'une bibliothèque).
+
+    Args:
+        positions: Itérable de dicts de positions
+        index: DedupIndex déjà alimenté (défaut: index vide)
+        symmetric: Écarter aussi les formes symétriques (si index n'est pas fourni)
+
+    Returns:
+        Tuple (positions gardées, nombre de doublons écartés)
+    """
+    index = index if index is not None else DedupIndex(symmetric=symmetric)
+    kept, duplicates = [], 0
+    for position in positions:
+        if index.add(position['fen']):
+            kept.append(position)
+        else:
+            duplicates += 1
+    return kept, duplicates
@@ -0,0 +1,229 @@
+"""
+Index en colonnes de la bibliothèque de positions.
+
+Les champs filtrables (trait, différence matérielle, matériel de chaque camp,
+évaluations, types de pièces présents) sont rangés dans des tableaux NumPy.
+Les positions sont triées par bucket (trait, différence matérielle, masque
+des pièces présentes) puis par évaluation de la ligne 1, et les bornes de
+chaque bucket sont précalculées : une requête ne parcourt que les buckets
+compatibles et y borne l'évaluation par recherche dichotomique, sans jamais
+balayer toute la bibliothèque.
+
+Une bibliothèque augmentée contient les formes symétriques (miroir,
+inversion des couleurs) d'une même position : le tirage se fait alors une
+fois par forme canonique (colonne position_hash), puis parmi ses variantes
+compatibles, pour que les positions augmentées ne pèsent pas plus lourd.
+"""
+import random
+
+import chess
+import numpy as np
+
+# Bit de chaque type de pièce dans le masque des pièces présentes (deux camps confondus)
+PIECE_BITS = {
+    'queen': 1,
+    'rook': 2,
+    'bishop': 4,
+    'knight': 8,
+    'pawn': 16,
+}
+
+_FEN_PIECE_BITS = {
+    'q': PIECE_BITS['queen'],
+    'r': PIECE_BITS['rook'],
+    'b': PIECE_BITS['bishop'],
+    'n': PIECE_BITS['knight'],
+    'p': PIECE_BITS['pawn'],
+}
+
+MATE_CP = 99999
+
+
+def piece_mask(fen):
+    """Masque des types de pièces présents sur l'échiquier (hors rois)."""
+    mask = 0
+    for char in fen.split(' ', 1)[0].lower():
+        mask |= _FEN_PIECE_BITS.get(char, 0)
+    return mask
+
+
+def parse_eval(text):
+    """
+    Convertit une évaluation formatée ('+0.53', 'Mat en -3') en centipions.
+
+    Returns:
+        int (±MATE_CP pour un mat, 0 si illisible)
+    """
+    if not text:
+        return 0
+    text = str(text).strip()
+    if text.startswith('Mat'):
+        return MATE_CP if not text.split()[-1].startswith('-') else -MATE_CP
+    try:
+        return int(round(float(text) * 100))
+    except ValueError:
+        return 0
+
+
+class PositionIndex:
+    """Index en colonnes pour des tirages aléatoires filtrés."""
+
+    def __init__(self, positions):
+        """
+        Args:
+            positions: Liste de dicts de positions (format de positions.json)
+                ou PositionStore (colonnes lues sans décoder les positions)
+        """
+        columns = positions.columns() if hasattr(positions, 'columns') else self._columns(positions)
+        n = len(positions)
+
+        # Tri par bucket puis par évaluation (np.lexsort : dernière clé = clé principale)
+        order = np.lexsort((columns['eval_line1'], columns['piece_mask'],
+                            columns['material_difference'], columns['white_to_move']))
+
+        self.positions = positions
+        self.order = order
+        self.white_to_move = np.asarray(columns['white_to_move'], dtype=bool)[order]
+        self.material_difference = np.asarray(columns['material_difference'], dtype=np.int16)[order]
+        self.piece_mask = np.asarray(columns['piece_mask'], dtype=np.uint8)[order]
+        self.eval_line1 = np.asarray(columns['eval_line1'], dtype=np.int32)[order]
+        self.eval_line2 = np.asarray(columns['eval_line2'], dtype=np.int32)[order]
+        self.white_material = np.asarray(columns['white_material'], dtype=np.int16)[order]
+        self.black_material = np.asarray(columns['black_material'], dtype=np.int16)[order]
+        self.position_hash = np.asarray(columns['position_hash'], dtype=np.uint64)[order]
+        # Tirage par forme canonique seulement si des variantes symétriques sont présentes
+        self.has_variants = len(np.unique(self.position_hash)) < n
+
+        # Bornes [début, fin) de chaque bucket dans l'ordre trié
+        self.buckets = {}
+        if n:
+            keys = np.stack([self.white_to_move.astype(np.int16), self.material_difference,
+                             self.piece_mask.astype(np.int16)], axis=1)
+            change = np.nonzero(np.any(keys[1:] != keys[:-1], axis=1))[0] + 1
+            starts = np.concatenate(([0], change))
+            ends = np.concatenate((change, [n]))
+            for start, end in zip(starts, ends):
+                key = (bool(self.white_to_move[start]), int(self.material_difference[start]),
+                       int(self.piece_mask[start]))
+                self.buckets[key] = (int(start), int(end))
+
+    @staticmethod
+    def _columns(positions):
+        """Colonnes filtrables extraites d'une liste de dicts."""
+        # Import différé : position_dedup dépend (via symmetry) de ce module
+        from backend.position_dedup import position_hash
+        n = len(positions)
+
+        def column(fn, dtype):
+            return np.fromiter((fn(p) for p in positions), dtype=dtype, count=n)
+
+        return {
+            'white_to_move': column(lambda p: p.get('fen', '').split(' ')[1:2] == ['w'], bool),
+            'material_difference': column(lambda p: p.get('material_difference', 0), np.int16),
+            'white_material': column(lambda p: p.get('white_material', 0), np.int16),
+            'black_material': column(lambda p: p.get('black_material', 0), np.int16),
+            'piece_mask': column(lambda p: piece_mask(p.get('fen', '')), np.uint8),
+            'eval_line1': column(lambda p: parse_eval(p.get('eval_line1')), np.int32),
+            'eval_line2': column(lambda p: parse_eval(p.get('eval_line2')), np.int32),
+            'position_hash': column(lambda p: position_hash(chess.Board(p['fen'])), np.uint64),
+        }
+
+    def __len__(self):
+        return len(self.order)
+
+    def _segments(self, turn=None, min_diff=None, max_diff=None, include_pieces=None, exclude_pieces=None,
+                  eval_min=None, eval_max=None):
+        """Intervalles [début, fin) des lignes compatibles, bucket par bucket."""
+        required_mask = sum(PIECE_BITS[p] for p in set(include_pieces or []))
+        excluded_mask = sum(PIECE_BITS[p] for p in set(exclude_pieces or []))
+        segments = []
+        for (white_turn, diff, mask), (start, end) in self.buckets.items():
+            if turn is not None and white_turn != turn:
+                continue
+            if min_diff is not None and diff < min_diff:
+                continue
+            if max_diff is not None and diff > max_diff:
+                continue
+            if mask & required_mask != required_mask or mask & excluded_mask:
+                continue
+            if eval_min is not None or eval_max is not None:
+                evals = self.eval_line1[start:end]
+                if eval_min is not None:
+                    start += int(np.searchsorted(evals, eval_min, side='left'))
+                    evals = self.eval_line1[start:end]
+                if eval_max is not None:
+                    end = start + int(np.searchsorted(evals, eval_max, side='right'))
+            if end > start:
+                segments.append((start, end))
+        return segments
+
+    def query(self, white_material=None, black_material=None, **filters):
+        """
+        Retourne les rangs (dans l'ordre trié) des positions qui respectent les filtres.
+
+        Args:
+            white_material, black_material: Tuples (min, max) de matériel (None = indifférent)
+            **filters:
+                turn: True = Blancs au trait, False = Noirs, None = indifférent
+                min_diff, max_diff: Bornes de la différence matérielle
+                include_pieces: Types de pièces devant être présents (['queen', ...])
+                exclude_pieces: Types de pièces devant être absents
+                eval_min, eval_max: Bornes de l'évaluation de la ligne 1 (centipions)
+
+        Returns:
+            numpy.ndarray des rangs compatibles
+        """
+        segments = self._segments(**filters)
+        if not segments:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate([np.arange(start, end) for start, end in segments])
+        for column, bounds in ((self.white_material, white_material), (self.black_material, black_material)):
+            if bounds is None:
+                continue
+            low, high = bounds
+            values = column[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            rows = rows[keep]
+        return rows
+
+    def random_position(self, rng=None, white_material=None, black_material=None, **filters):
+        """
+        Tire une position uniformément parmi celles qui respectent les filtres.
+
+        Sans filtre de matériel ni variantes symétriques, le tirage se fait sur
+        les bornes des buckets (aucune ligne n'est parcourue) ; sinon les lignes
+        des buckets retenus sont filtrées de façon vectorisée. Avec des variantes,
+        chaque forme canonique compatible a la même probabilité.
+
+        Args:
+            rng: Générateur (random.Random ou module random)
+            white_material, black_material: Tuples (min, max) de matériel
+            **filters: Voir query()
+
+        Returns:
+            dict de position ou None si aucune ne correspond
+        """
+        rng = rng or random
+        if self.has_variants or white_material is not None or black_material is not None:
+            rows = self.query(white_material=white_material, black_material=black_material, **filters)
+            if not len(rows):
+                return None
+            if self.has_variants:
+                # Une forme canonique au hasard, puis une de ses variantes compatibles
+                hashes, inverse = np.unique(self.position_hash[rows], return_inverse=True)
+                rows = rows[inverse == rng.randrange(len(hashes))]
+            return self.positions[self.order[rows[rng.randrange(len(rows))]]]
+
+        segments = self._segments(**filters)
+        total = sum(end - start for start, end in segments)
+        if not total:
+            return None
+        pick = rng.randrange(total)
+        for start, end in segments:
+            if pick < end - start:
+                return self.positions[self.order[start + pick]]
+            pick -= end - start
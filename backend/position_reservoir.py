@@ -0,0 +1,314 @@
+"""
+Réservoir de positions pré-générées.
+
+Un réservoir par jeu de paramètres (« bucket ») est maintenu à un niveau
+cible par des threads de fond qui travaillent pendant les temps morts, avec
+un budget CPU réglable (rapport cyclique génération / pause). Les requêtes
+sont servies depuis le réservoir en quelques millisecondes et ne basculent
+sur une génération en direct que si le bucket est vide.
+"""
+import os
+import time
+from collections import OrderedDict, deque
+
+from backend.engine_scheduler import BACKGROUND, INTERACTIVE, MATCHMAKING, PRIORITY_NAMES
+from backend.native_threads import native, run_in_native_thread, start_native_thread
+
+# Paramètres de génération acceptés par generate_fen_position (hors max_attempts)
+BUCKET_PARAMS = ('negative_min', 'negative_max', 'positive_min', 'positive_max',
+                 'material_diff', 'max_material', 'excluded_pieces')
+
+DEFAULT_PARAMS = {
+    'negative_min': -99,
+    'negative_max': -15,
+    'positive_min': 15,
+    'positive_max': 99,
+    'material_diff': 3,
+    'max_material': 22,
+    'excluded_pieces': [],
+}
+
+# Positions de matchmaking : écart d'évaluation entre 0.25 et 0.99 pion
+MATCHMAKING_PARAMS = dict(DEFAULT_PARAMS, negative_max=-25, positive_min=25)
+
+
+def bucket_key(params):
+    """
+    Normalise un jeu de paramètres en clé de bucket.
+
+    Args:
+        params: Dictionnaire de paramètres (valeurs manquantes = défauts)
+
+    Returns:
+        Tuple hashable
+    """
+    merged = dict(DEFAULT_PARAMS, **{k: v for k, v in params.items() if k in BUCKET_PARAMS})
+    return tuple(
+        tuple(sorted(merged[name])) if name == 'excluded_pieces' else merged[name]
+        for name in BUCKET_PARAMS
+    )
+
+
+def bucket_params(key):
+    """Reconstruit le dictionnaire de paramètres d'une clé de bucket."""
+    params = dict(zip(BUCKET_PARAMS, key))
+    params['excluded_pieces'] = list(params['excluded_pieces'])
+    return params
+
+
+class _Bucket:
+    def __init__(self, key):
+        self.key = key
+        self.positions = deque()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.augmented = 0
+        self.failures = 0
+        self.retry_after = 0.0
+        self.last_requested = time.monotonic()
+
+
+class PositionReservoir:
+    """Réservoirs de positions par bucket, réalimentés en arrière-plan."""
+
+    def __init__(self, generate_fn, target_per_bucket=3, cpu_budget=0.5, workers=1,
+                 max_buckets=32, refill_attempts=20000, is_busy=None, live_generate_fn=None, augment=False):
+        """
+        Args:
+            generate_fn: Fonction de génération de fond (generate_fen_position)
+            target_per_bucket: Nombre de positions visé par bucket
+            cpu_budget: Fraction du temps (0-1] passée à générer par chaque worker
+            workers: Nombre de threads de réalimentation
+            max_buckets: Nombre maximum de buckets suivis (les moins demandés sont oubliés)
+            refill_attempts: max_attempts utilisé pour la réalimentation
+            is_busy: Callable indiquant une activité interactive (le fond attend alors)
+            live_generate_fn: Fonction de génération en direct (défaut: generate_fn)
+            augment: Ajoute au bucket les positions symétriques de chaque position
+                générée (sans appel moteur supplémentaire)
+        """
+        self.generate_fn = generate_fn
+        self.live_generate_fn = live_generate_fn or generate_fn
+        self.augment = augment
+        self.target_per_bucket = target_per_bucket
+        self.cpu_budget = min(max(cpu_budget, 0.01), 1.0)
+        self.workers = workers
+        self.max_buckets = max_buckets
+        self.refill_attempts = refill_attempts
+        self.is_busy = is_busy or (lambda: False)
+
+        self._buckets = OrderedDict()
+        self._refilling = set()
+        self._condition = native('Condition')()
+        self._running = 0
+        self._stopped = False
+        self._busy_seconds = 0.0
+
+    def _bucket(self, key):
+        """Retourne (en le créant si besoin) le bucket d'une clé. Verrou requis."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        bucket.last_requested = time.monotonic()
+        return bucket
+
+    def register(self, params):
+        """
+        Déclare un bucket à maintenir plein, sans rien consommer.
+
+        Args:
+            params: Paramètres de génération
+        """
+        with self._condition:
+            self._bucket(bucket_key(params))
+            self._condition.notify_all()
+
+    def take(self, params, live_fallback=True, live_attempts=None, **live_options):
+        """
+        Sert une position depuis le réservoir du bucket correspondant.
+
+        Args:
+            params: Paramètres de génération
+            live_fallback: Générer en direct si le bucket est vide
+            live_attempts: max_attempts de la génération en direct (défaut: celui de params)
+            **live_options: Options transmises à la génération en direct (priority, client)
+
+        Returns:
+            dict de position (avec 'served_from') ou None si vide et sans repli
+        """
+        key = bucket_key(params)
+        with self._condition:
+            bucket = self._bucket(key)
+            if bucket.positions:
+                bucket.hits += 1
+                position = bucket.positions.popleft()
+                self._condition.notify_all()
+                return dict(position, served_from='reservoir')
+            bucket.misses += 1
+            self._condition.notify_all()
+
+        if not live_fallback:
+            return None
+
+        live_params = bucket_params(key)
+        max_attempts = live_attempts or params.get('max_attempts')
+        if max_attempts:
+            live_params['max_attempts'] = max_attempts
+        position = run_in_native_thread(self.live_generate_fn, **live_params, **live_options)
+        return dict(position, served_from='live')
+
+    def _next_bucket(self):
+        """Choisit le bucket le moins rempli (verrou requis)."""
+        now = time.monotonic()
+        candidates = [
+            b for b in self._buckets.values()
+            if len(b.positions) < self.target_per_bucket
+            and b.retry_after <= now
+            and b.key not in self._refilling
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: (len(b.positions), -b.last_requested))
+
+    def _worker(self):
+        try:
+            self._refill_loop()
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    def _refill_loop(self):
+        while True:
+            with self._condition:
+                bucket = None
+                while not self._stopped:
+                    bucket = self._next_bucket()
+                    if bucket is not None:
+                        break
+                    self._condition.wait(timeout=5)
+                if self._stopped:
+                    return
+                self._refilling.add(bucket.key)
+
+            try:
+                # Ne démarre une génération de fond que pendant les temps morts
+                while self.is_busy() and not self._stopped:
+                    time.sleep(0.5)
+
+                started = time.monotonic()
+                try:
+                    options = {'augment': True} if self.augment else {}
+                    position = self.generate_fn(max_attempts=self.refill_attempts, **options,
+                                                **bucket_params(bucket.key))
+                except Exception as e:
+                    position = None
+                    print(f"⚠️ Réservoir: échec de génération pour {bucket_params(bucket.key)}: {e}")
+                elapsed = time.monotonic() - started
+
+                with self._condition:
+                    self._busy_seconds += elapsed
+                    if position is not None:
+                        variants = position.pop('augmented', [])
+                        bucket.positions.append(position)
+                        bucket.generated += 1
+                        for variant in variants[:max(0, self.target_per_bucket - len(bucket.positions))]:
+                            bucket.positions.append(variant)
+                            bucket.augmented += 1
+                        bucket.failures = 0
+                    else:
+                        bucket.failures += 1
+                        bucket.retry_after = time.monotonic() + min(600, 30 * 2 ** bucket.failures)
+            finally:
+                with self._condition:
+                    self._refilling.discard(bucket.key)
+
+            # Rapport cyclique : pause proportionnelle au temps de génération
+            pause = elapsed * (1.0 - self.cpu_budget) / self.cpu_budget
+            with self._condition:
+                if not self._stopped and pause > 0:
+                    self._condition.wait(timeout=pause)
+
+    def start(self):
+        """Démarre les threads de réalimentation (idempotent)."""
+        with self._condition:
+            if self._running:
+                return
+            self._stopped = False
+            self._running = self.workers
+        # Threads système : sous gevent, la génération ne bloque pas la boucle
+        for _ in range(self.workers):
+            start_native_thread(self._worker)
+        print(f"✅ Réservoir de positions démarré ({self.workers} worker(s), "
+              f"cible {self.target_per_bucket}/bucket, budget CPU {self.cpu_budget:.0%})")
+
+    def stop(self):
+        """Arrête les threads de réalimentation après leur génération en cours."""
+        deadline = time.monotonic() + 1
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            while self._running and time.monotonic() < deadline:
+                self._condition.wait(timeout=deadline - time.monotonic())
+
+    def stats(self):
+        """
+        Retourne le remplissage et les hits/misses de chaque bucket.
+
+        Returns:
+            dict: Statistiques du réservoir
+        """
+        with self._condition:
+            buckets = [{
+                'params': bucket_params(b.key),
+                'available': len(b.positions),
+                'target': self.target_per_bucket,
+                'hits': b.hits,
+                'misses': b.misses,
+                'generated': b.generated,
+                'augmented': b.augmented,
+                'failures': b.failures,
+            } for b in self._buckets.values()]
+            return {
+                'running': self._running > 0 and not self._stopped,
+                'workers': self.workers,
+                'cpu_budget': self.cpu_budget,
+                'background_seconds': round(self._busy_seconds, 1),
+                'buckets': buckets,
+            }
+
+
+def _engine_pool_busy():
+    """Activité interactive : des requêtes interactives ou de matchmaking attendent un moteur."""
+    from backend.chess_generator import engine_scheduler
+    classes = engine_scheduler.stats()['classes']
+    return any(classes[PRIORITY_NAMES[priority]]['queued'] > 0 for priority in (INTERACTIVE, MATCHMAKING))
+
+
+def create_reservoir():
+    """
+    Crée le réservoir de l'application, configuré par variables d'environnement
+    (RESERVOIR_TARGET, RESERVOIR_CPU_BUDGET, RESERVOIR_WORKERS, RESERVOIR_MAX_BUCKETS,
+    RESERVOIR_AUGMENT).
+    """
+    from backend.chess_generator import generate_fen_position
+
+    reservoir = PositionReservoir(
+        lambda **params: generate_fen_position(sampler_processes=1, priority=BACKGROUND, client='reservoir', **params),
+        target_per_bucket=int(os.environ.get('RESERVOIR_TARGET', 3)),
+        cpu_budget=float(os.environ.get('RESERVOIR_CPU_BUDGET', 0.5)),
+        workers=int(os.environ.get('RESERVOIR_WORKERS', 1)),
+        max_buckets=int(os.environ.get('RESERVOIR_MAX_BUCKETS', 32)),
+        is_busy=_engine_pool_busy,
+        live_generate_fn=generate_fen_position,
+        augment=os.environ.get('RESERVOIR_AUGMENT', '0') == '1',
+    )
+    reservoir.register(DEFAULT_PARAMS)
+    reservoir.register(MATCHMAKING_PARAMS)
+    return reservoir
+
+
+reservoir = create_reservoir()
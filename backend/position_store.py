@@ -0,0 +1,330 @@
+"""
+Stockage binaire compact de la bibliothèque de positions.
+
+Format (petit-boutiste) :
+- un en-tête de HEADER_SIZE octets (magie, version, taille d'enregistrement,
+  nombre de positions, position de la table annexe) ;
+- `count` enregistrements de taille fixe (RECORD_DTYPE) : échiquier codé sur
+  32 octets (un quartet par case), trait / roques / prise en passant,
+  matériel, masque des pièces présentes, évaluations en centipions et hash
+  de la forme canonique (voir position_dedup) ;
+- une table annexe de chaînes JSON pour les champs hors format fixe.
+
+Le fichier est ouvert avec mmap : les colonnes sont des vues NumPy sans
+copie, partagées entre workers par le cache de pages du système, et un
+enregistrement n'est décodé en dict qu'à la demande.
+
+Conversion depuis le JSON / JSONL actuel (doublons exacts écartés ; les
+formes symétriques d'une bibliothèque augmentée sont gardées, comme au
+chargement de positions.json, et tirées une fois par forme canonique) :
+    python -m backend.position_store backend/positions.json backend/positions.bin
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+import chess
+import numpy as np
+
+from backend.position_dedup import DedupIndex, dedupe_positions, position_hash
+from backend.position_index import piece_mask
+
+MAGIC = b'CHESSPOS'
+VERSION = 2
+HEADER = struct.Struct('<8sIIQQ')
+HEADER_SIZE = 32
+
+RECORD_DTYPE = np.dtype([
+    ('board', 'u1', 32),
+    ('flags', 'u1'),
+    ('ep_square', 'i1'),
+    ('halfmove', 'u1'),
+    ('fullmove', '<u2'),
+    ('white_material', 'u1'),
+    ('black_material', 'u1'),
+    ('material_difference', 'u1'),
+    ('piece_mask', 'u1'),
+    ('eval_line1', '<i4'),
+    ('eval_line2', '<i4'),
+    ('attempts', '<u4'),
+    ('engine_evaluations', '<u4'),
+    ('time_seconds', '<f4'),
+    ('extra_offset', '<u4'),
+    ('extra_length', '<u4'),
+    ('position_hash', '<u8'),
+])
+
+# Bits de 'flags'
+FLAG_WHITE_TO_MOVE = 1
+FLAG_CASTLING = {'K': 2, 'Q': 4, 'k': 8, 'q': 16}
+FLAG_ENGINE_EVALUATIONS = 32
+# Champ 'turn' tel qu'enregistré (les anciennes positions ne suivent pas toujours la FEN)
+FLAG_TURN_LABEL_WHITE = 64
+
+# Quartet d'une case : 0 = vide, type de pièce (1-6) + 8 pour les noirs
+_SYMBOL_CODES = {chess.Piece(pt, color).symbol(): pt | (0 if color else 8)
+                 for pt in chess.PIECE_TYPES for color in chess.COLORS}
+_CODE_SYMBOLS = {code: symbol for symbol, code in _SYMBOL_CODES.items()}
+
+# Les mats sont stockés comme ±(MATE_BASE + n)
+MATE_BASE = 1000000
+
+FIXED_FIELDS = ('fen', 'white_material', 'black_material', 'material_difference', 'turn',
+                'eval_line1', 'eval_line2', 'attempts', 'engine_evaluations', 'time_seconds')
+
+
+def encode_eval(text):
+    """'+0.53' -> 53, 'Mat en -3' -> -(MATE_BASE + 3)."""
+    text = str(text or '').strip()
+    if text.startswith('Mat'):
+        moves = int(text.split()[-1])
+        return MATE_BASE + moves if moves > 0 else -(MATE_BASE - moves)
+    try:
+        return int(round(float(text) * 100))
+    except ValueError:
+        return 0
+
+
+def decode_eval(value):
+    """Inverse de encode_eval (même format que format_score)."""
+    value = int(value)
+    if value >= MATE_BASE:
+        return f"Mat en {value - MATE_BASE}"
+    if value <= -MATE_BASE:
+        return f"Mat en {-(-value - MATE_BASE)}"
+    return f"{value / 100.0:+.2f}"
+
+
+def eval_cp(values):
+    """Colonne d'évaluations ramenée en centipions (mats = ±99999, comme format_score)."""
+    values = np.asarray(values, dtype=np.int32)
+    return np.where(values >= MATE_BASE, 99999, np.where(values <= -MATE_BASE, -99999, values))
+
+
+def _encode_record(position, record, extras):
+    """Remplit un enregistrement à partir d'un dict de position."""
+    placement, turn, castling, ep, halfmove, fullmove = (position['fen'].split() + ['w', '-', '-', '0', '1'])[:6]
+
+    codes = np.zeros(64, dtype=np.uint8)
+    square = 56
+    for char in placement:
+        if char == '/':
+            square -= 16
+        elif char.isdigit():
+            square += int(char)
+        else:
+            codes[square] = _SYMBOL_CODES[char]
+            square += 1
+    record['board'] = codes[0::2] | (codes[1::2] << 4)
+
+    flags = FLAG_WHITE_TO_MOVE if turn == 'w' else 0
+    if position.get('turn', 'Blanc' if turn == 'w' else 'Noir') == 'Blanc':
+        flags |= FLAG_TURN_LABEL_WHITE
+    for char in castling.replace('-', ''):
+        flags |= FLAG_CASTLING[char]
+    if 'engine_evaluations' in position:
+        flags |= FLAG_ENGINE_EVALUATIONS
+        record['engine_evaluations'] = position['engine_evaluations']
+    record['flags'] = flags
+    record['ep_square'] = chess.parse_square(ep) if ep != '-' else -1
+    record['halfmove'] = int(halfmove)
+    record['fullmove'] = int(fullmove)
+
+    record['white_material'] = position.get('white_material', 0)
+    record['black_material'] = position.get('black_material', 0)
+    record['material_difference'] = position.get('material_difference', 0)
+    record['piece_mask'] = piece_mask(position['fen'])
+    record['position_hash'] = position_hash(chess.Board(position['fen']))
+    record['eval_line1'] = encode_eval(position.get('eval_line1'))
+    record['eval_line2'] = encode_eval(position.get('eval_line2'))
+    record['attempts'] = position.get('attempts', 0)
+    record['time_seconds'] = position.get('time_seconds', 0.0)
+
+    others = {k: v for k, v in position.items() if k not in FIXED_FIELDS}
+    if others:
+        blob = json.dumps(others, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        record['extra_offset'] = extras.tell()
+        record['extra_length'] = len(blob)
+        extras.write(blob)
+
+
+def _decode_fen(record):
+    codes = np.empty(64, dtype=np.uint8)
+    codes[0::2] = record['board'] & 0x0F
+    codes[1::2] = record['board'] >> 4
+
+    rows = []
+    for rank in range(7, -1, -1):
+        row, empty = [], 0
+        for code in codes[rank * 8:rank * 8 + 8]:
+            if code:
+                if empty:
+                    row.append(str(empty))
+                    empty = 0
+                row.append(_CODE_SYMBOLS[int(code)])
+            else:
+                empty += 1
+        if empty:
+            row.append(str(empty))
+        rows.append(''.join(row))
+
+    flags = int(record['flags'])
+    castling = ''.join(char for char, bit in FLAG_CASTLING.items() if flags & bit) or '-'
+    ep = chess.square_name(int(record['ep_square'])) if record['ep_square'] >= 0 else '-'
+    turn = 'w' if flags & FLAG_WHITE_TO_MOVE else 'b'
+    return f"{'/'.join(rows)} {turn} {castling} {ep} {int(record['halfmove'])} {int(record['fullmove'])}"
+
+
+def write_store(path, positions):
+    """
+    Écrit une bibliothèque de positions au format binaire.
+
+    Le fichier est écrit à côté puis renommé : les workers qui ont encore
+    l'ancien fichier en mmap ne sont pas affectés.
+
+    Args:
+        path: Fichier de sortie
+        positions: Itérable de dicts de positions
+    """
+    positions = list(positions)
+    records = np.zeros(len(positions), dtype=RECORD_DTYPE)
+    extras = io.BytesIO()
+    for position, record in zip(positions, records):
+        _encode_record(position, record, extras)
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, len(records),
+                            HEADER_SIZE + records.nbytes).ljust(HEADER_SIZE, b'\0'))
+        f.write(records.tobytes())
+        f.write(extras.getvalue())
+    os.replace(tmp_path, path)
+
+
+class PositionStore:
+    """Bibliothèque de positions en lecture seule, projetée en mémoire."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Fichier au format binaire
+
+        Raises:
+            ValueError: Si le fichier n'est pas au format attendu
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise ValueError(f"Fichier de positions invalide: {self.path}")
+            magic, version, record_size, count, extras_offset = HEADER.unpack_from(header)
+            if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+                raise ValueError(f"Format de positions non supporté: {self.path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+
+        self._count = count
+        self._extras_offset = extras_offset
+        if count:
+            self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """Décode une position en dict (même format que positions.json)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        record = self.records[index]
+        flags = int(record['flags'])
+        position = {
+            'fen': _decode_fen(record),
+            'white_material': int(record['white_material']),
+            'black_material': int(record['black_material']),
+            'material_difference': int(record['material_difference']),
+            'turn': 'Blanc' if flags & FLAG_TURN_LABEL_WHITE else 'Noir',
+            'eval_line1': decode_eval(record['eval_line1']),
+            'eval_line2': decode_eval(record['eval_line2']),
+            'attempts': int(record['attempts']),
+            'time_seconds': round(float(record['time_seconds']), 1),
+        }
+        if flags & FLAG_ENGINE_EVALUATIONS:
+            position['engine_evaluations'] = int(record['engine_evaluations'])
+        if record['extra_length']:
+            start = self._extras_offset + int(record['extra_offset'])
+            position.update(json.loads(self._mmap[start:start + int(record['extra_length'])]))
+        return position
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def columns(self):
+        """
+        Colonnes filtrables (vues sans copie, évaluations en centipions).
+
+        Returns:
+            dict de numpy.ndarray
+        """
+        return {
+            'white_to_move': (self.records['flags'] & FLAG_WHITE_TO_MOVE) != 0,
+            'material_difference': self.records['material_difference'],
+            'white_material': self.records['white_material'],
+            'black_material': self.records['black_material'],
+            'piece_mask': self.records['piece_mask'],
+            'eval_line1': eval_cp(self.records['eval_line1']),
+            'eval_line2': eval_cp(self.records['eval_line2']),
+            'position_hash': self.records['position_hash'],
+        }
+
+
+def read_positions(path):
+    """
+    Lit une bibliothèque de positions, quel que soit son format.
+
+    Args:
+        path: Fichier binaire (PositionStore), JSON (liste) ou JSONL
+
+    Returns:
+        PositionStore ou liste de dicts
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            return PositionStore(path)
+    if path.suffix == '.jsonl':
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convertit une bibliothèque JSON/JSONL au format binaire")
+    parser.add_argument('inputs', nargs='+', help="Fichiers JSON ou JSONL à convertir (concaténés)")
+    parser.add_argument('output', help="Fichier binaire de sortie")
+    args = parser.parse_args(argv)
+
+    index = DedupIndex(symmetric=False)
+    positions = []
+    for input_path in args.inputs:
+        loaded, duplicates = dedupe_positions(read_positions(input_path), index)
+        positions.extend(loaded)
+        print(f"✅ {len(loaded)} positions lues depuis {input_path} ({duplicates} doublon(s) écarté(s))")
+
+    write_store(args.output, positions)
+    size = os.path.getsize(args.output)
+    print(f"✅ {len(positions)} positions écrites dans {args.output} ({size} octets)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,239 @@
+import os
+import threading
 import uuid
-from collections import deque
+from array import array
+from collections import Counter, deque
 import chess
+import chess.polyglot
 import random
 from flask_socketio import join_room, leave_room
-from datetime import datetime
+from datetime import datetime, timedelta
 
-# Dictionnaire global pour stocker toutes les parties actives
+from .clock_scheduler import clocks
+from .game_journal import journal
+from .persistence_queue import persistence_queue
+
+
+class GameRegistry:
+    """
+    Parties actives, indexées par game_id, par SID et par utilisateur.
+
+    S'utilise comme un dictionnaire en lecture (games[game_id], games.get,
+    in, items...). Les ajouts et suppressions passent par add() et remove(),
+    qui tiennent les index à jour sous un même verrou : trouver la partie
+    d'un joueur ne parcourt plus toutes les parties.
+    """
+
+    def __init__(self, debug=False):
+        """
+        Args:
+            debug: Vérifier la cohérence des index (parcours complet) après chaque modification
+        """
+        self.debug = debug
+        self._games = {}
+        # SID / user_id -> {game_id: None} (ensemble ordonné : la plus ancienne partie d'abord)
+        self._by_sid = {}
+        self._by_user = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, game_id):
+        return game_id in self._games
+
+    def __getitem__(self, game_id):
+        return self._games[game_id]
+
+    def __iter__(self):
+        return iter(list(self._games))
+
+    def __len__(self):
+        return len(self._games)
+
+    def get(self, game_id, default=None):
+        return self._games.get(game_id, default)
+
+    def items(self):
+        with self._lock:
+            return list(self._games.items())
+
+    def values(self):
+        with self._lock:
+            return list(self._games.values())
+
+    @staticmethod
+    def _seats(game):
+        """(sid, user_id) des deux joueurs ; sid vaut None pour une partie restaurée pas encore rejointe."""
+        return ((game.white_sid, game.white_user_id), (game.black_sid, game.black_user_id))
+
+    @staticmethod
+    def _index(index, key, game_id):
+        index.setdefault(key, {})[game_id] = None
+
+    @staticmethod
+    def _unindex(index, key, game_id):
+        game_ids = index.get(key)
+        if game_ids is not None:
+            game_ids.pop(game_id, None)
+            if not game_ids:
+                del index[key]
+
+    def add(self, game):
+        """
+        Enregistre une partie et indexe ses joueurs.
+
+        Args:
+            game: Game (game_id et players renseignés)
+        """
+        with self._lock:
+            if game.game_id in self._games:
+                self.remove(game.game_id)
+            self._games[game.game_id] = game
+            for sid, user_id in self._seats(game):
+                if sid is not None:
+                    self._index(self._by_sid, sid, game.game_id)
+                self._index(self._by_user, user_id, game.game_id)
+            if self.debug:
+                self._assert_consistent()
+
+    def remove(self, game_id):
+        """
+        Retire une partie et ses entrées d'index.
+
+        Returns:
+            Game retirée ou None si elle n'existait pas
+        """
+        with self._lock:
+            game = self._games.pop(game_id, None)
+            if game is not None:
+                for sid, user_id in self._seats(game):
+                    self._unindex(self._by_sid, sid, game_id)
+                    self._unindex(self._by_user, user_id, game_id)
+            if self.debug:
+                self._assert_consistent()
+            return game
+
+    def rebind(self, game_id, user_id, sid):
+        """
+        Associe un nouveau SID au joueur d'une partie (reconnexion, partie restaurée).
+        
+        Returns:
+            chess.WHITE ou chess.BLACK, ou None si l'utilisateur ne joue pas cette partie
+        """
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None:
+                return None
+            if game.white_user_id == user_id and (game.white_sid is None or game.black_user_id != user_id):
+                color, old_sid = chess.WHITE, game.white_sid
+            elif game.black_user_id == user_id:
+                color, old_sid = chess.BLACK, game.black_sid
+            else:
+                return None
+            if old_sid != sid:
+                if old_sid is not None:
+                    self._unindex(self._by_sid, old_sid, game_id)
+                if color == chess.WHITE:
+                    game.white_sid = sid
+                else:
+                    game.black_sid = sid
+                self._index(self._by_sid, sid, game_id)
+            if self.debug:
+                self._assert_consistent()
+            return color
+
+    def game_id_for_sid(self, sid):
+        """game_id de la partie (la plus ancienne) d'un SID, ou None."""
+        with self._lock:
+            game_ids = self._by_sid.get(sid)
+            game_id = next(iter(game_ids)) if game_ids else None
+            if self.debug:
+                expected = next((gid for gid, game in self._games.items()
+                                 if sid is not None and sid in (game.white_sid, game.black_sid)), None)
+                assert game_id == expected, f"Index SID incohérent pour {sid}: {game_id} au lieu de {expected}"
+            return game_id
+
+    def game_ids_for_user(self, user_id):
+        """game_id des parties en cours d'un utilisateur."""
+        with self._lock:
+            return list(self._by_user.get(user_id, ()))
+
+    def is_playing(self, user_id):
+        """Indique si l'utilisateur joue au moins une partie."""
+        with self._lock:
+            playing = user_id in self._by_user
+            if self.debug:
+                expected = any(user_id in (game.white_user_id, game.black_user_id) for game in self._games.values())
+                assert playing == expected, f"Index utilisateur incohérent pour {user_id}"
+            return playing
+
+    def check_consistency(self):
+        """
+        Compare les index à un parcours complet des parties.
+
+        Returns:
+            Liste des incohérences (vide si les index sont exacts)
+        """
+        with self._lock:
+            by_sid, by_user = {}, {}
+            for game_id, game in self._games.items():
+                for sid, user_id in self._seats(game):
+                    if sid is not None:
+                        self._index(by_sid, sid, game_id)
+                    self._index(by_user, user_id, game_id)
+            problems = []
+            for name, index, expected in (('sid', self._by_sid, by_sid), ('user_id', self._by_user, by_user)):
+                for key in set(index) | set(expected):
+                    if list(index.get(key, ())) != list(expected.get(key, ())):
+                        problems.append(f"{name} {key}: {list(index.get(key, ()))} au lieu de "
+                                        f"{list(expected.get(key, ()))}")
+            return problems
+
+    def _assert_consistent(self):
+        problems = self.check_consistency()
+        assert not problems, "Index des parties incohérents: " + '; '.join(problems)
+
+
+# Registre global de toutes les parties actives
 # Clé: game_id (str), Valeur: Game object
-games = {}
+games = GameRegistry(debug=os.environ.get('GAME_REGISTRY_DEBUG', '0') != '0')
+
+# Une partie ne se termine qu'une fois (coup, abandon, nulle, chute du drapeau, inactivité)
+_end_lock = threading.Lock()
+
+# Pièce de promotion <-> 3 bits de poids fort du code d'un coup
+_PROMOTION_CODES = {None: 0, chess.KNIGHT: 1, chess.BISHOP: 2, chess.ROOK: 3, chess.QUEEN: 4}
+_PROMOTION_PIECES = {code: piece for piece, code in _PROMOTION_CODES.items()}
+
+
+def encode_move(move):
+    """Coup -> entier 16 bits (case de départ | case d'arrivée << 6 | promotion << 12)."""
+    return move.from_square | move.to_square << 6 | _PROMOTION_CODES[move.promotion] << 12
+
+
+def decode_move(code):
+    """Entier 16 bits (voir encode_move) -> chess.Move."""
+    return chess.Move(code & 63, (code >> 6) & 63, _PROMOTION_PIECES[code >> 12])
+
 
 class Game:
-    """Représente une partie d'échecs active avec gestion complète."""
+    """
+    Représente une partie d'échecs active avec gestion complète.
+    
+    Empreinte mémoire réduite pour des milliers de parties simultanées :
+    attributs en __slots__, joueurs réduits à des scalaires, coups rangés
+    dans un array('H') (16 bits par coup) et échiquier sans pile de coups.
+    Les données dérivées (coups UCI, FEN successives, dict des joueurs) sont
+    reconstruites à la demande.
+    """
+    
+    __slots__ = (
+        'game_id', 'starting_fen', 'board', 'moves', 'started_at', 'time_control',
+        'white_time', 'black_time', 'increment', 'last_move_time',
+        'white_sid', 'black_sid', 'white_user_id', 'black_user_id', 'white_username', 'black_username',
+        'result', '_repetitions',
+    )
     
-    def __init__(self, player1_sid, player2_sid, player1_user_id, player2_user_id, fen_start, time_control=None):
+    def __init__(self, player1_sid, player2_sid, player1_user_id, player2_user_id, fen_start, time_control=None,
+                 player1_name=None, player2_name=None, player1_color=None, game_id=None, started_at=None):
         """
         Initialise une nouvelle partie d'échecs.
         
@@ -22,67 +243,137 @@ class Game:
             player1_user_id: ID utilisateur du premier joueur (base de données)
             player2_user_id: ID utilisateur du second joueur (base de données)
             fen_start: Position FEN de départ
-        """
-        self.game_id = str(uuid.uuid4())
+            time_control: {'minutes': int, 'increment': int} (défaut: 5 minutes sans incrément)
+            player1_name: Nom affiché du premier joueur (défaut: lu en base)
+            player2_name: Nom affiché du second joueur (défaut: lu en base)
+            player1_color: chess.WHITE ou chess.BLACK pour le premier joueur (défaut: tirage au sort)
+            game_id: Identifiant de la partie (défaut: nouvel UUID)
+            started_at: Début de la partie (défaut: maintenant)
+        """
+        self.game_id = game_id or str(uuid.uuid4())
         self.board = chess.Board(fen_start)
         self.starting_fen = fen_start
-        self.moves_history = []  # Liste des coups en notation UCI
-        self.started_at = datetime.now()
-        time_control = fen_start if isinstance(fen_start, dict) else {'minutes': 5, 'increment': 0}
+        self.moves = array('H')  # Coups encodés sur 16 bits (voir encode_move)
+        # Hashs des positions depuis le dernier coup irréversible (répétitions)
+        self._repetitions = array('Q', [chess.polyglot.zobrist_hash(self.board)])
+        self.started_at = started_at or datetime.now()
         self.time_control = time_control or {'minutes': 5, 'increment': 0}
-        self.white_time = time_control.get('minutes', 5) * 60  # en secondes
-        self.black_time = time_control.get('minutes', 5) * 60
-        self.increment = time_control.get('increment', 0)
+        self.white_time = self.time_control.get('minutes', 5) * 60  # en secondes
+        self.black_time = self.time_control.get('minutes', 5) * 60
+        self.increment = self.time_control.get('increment', 0)
+        # La pendule des blancs démarre à la création de l'objet (les deux joueurs sont là)
         self.last_move_time = datetime.now()
+        self.result = None  # Résultat une fois la partie terminée (voir end)
         
-        # Importer ici pour éviter les imports circulaires
-        from .db_models import User
-        
-        # Récupérer les utilisateurs depuis la base de données
-        self.user1 = User.query.get(player1_user_id)
-        self.user2 = User.query.get(player2_user_id)
-        
-        # Attribution aléatoire des couleurs
-        if random.choice([True, False]):
-            self.players = {
-                player1_sid: {
-                    'color': chess.WHITE,
-                    'user_id': player1_user_id,
-                    'username': self.user1.username if self.user1 else 'Joueur 1'
-                },
-                player2_sid: {
-                    'color': chess.BLACK,
-                    'user_id': player2_user_id,
-                    'username': self.user2.username if self.user2 else 'Joueur 2'
-                }
-            }
-        else:
-            self.players = {
-                player1_sid: {
-                    'color': chess.BLACK,
-                    'user_id': player1_user_id,
-                    'username': self.user1.username if self.user1 else 'Joueur 1'
-                },
-                player2_sid: {
-                    'color': chess.WHITE,
-                    'user_id': player2_user_id,
-                    'username': self.user2.username if self.user2 else 'Joueur 2'
-                }
-            }
+        if player1_name is None or player2_name is None:
+            # Importer ici pour éviter les imports circulaires
+            from .db_models import User
+            if player1_name is None:
+                user1 = User.query.get(player1_user_id)
+                player1_name = user1.username if user1 else 'Joueur 1'
+            if player2_name is None:
+                user2 = User.query.get(player2_user_id)
+                player2_name = user2.username if user2 else 'Joueur 2'
         
-        # Joindre les joueurs à la "salle" SocketIO pour la partie
-        join_room(self.game_id, sid=player1_sid)
-        join_room(self.game_id, sid=player2_sid)
+        # Attribution aléatoire des couleurs (sauf si imposée)
+        if player1_color is None:
+            player1_color = random.choice([chess.WHITE, chess.BLACK])
+        first = (player1_sid, player1_user_id, player1_name)
+        second = (player2_sid, player2_user_id, player2_name)
+        white, black = (first, second) if player1_color == chess.WHITE else (second, first)
+        self.white_sid, self.white_user_id, self.white_username = white
+        self.black_sid, self.black_user_id, self.black_username = black
         
-        player1_name = self.user1.username if self.user1 else player1_user_id
-        player2_name = self.user2.username if self.user2 else player2_user_id
         print(f"Nouvelle partie créée: {self.game_id}")
         print(f"  {player1_name} vs {player2_name}")
         
+    def to_journal(self):
+        """
+        État de la partie pour le journal (voir game_journal).
+        
+        Returns:
+            dict sérialisable (dates comprises, voir game_journal.dumps)
+        """
+        return {
+            'game_id': self.game_id,
+            'starting_fen': self.starting_fen,
+            'white': [self.white_user_id, self.white_username],
+            'black': [self.black_user_id, self.black_username],
+            'time_control': self.time_control,
+            'started_at': self.started_at,
+            'white_time': self.white_time,
+            'black_time': self.black_time,
+            'last_move_time': self.last_move_time,
+            'moves': list(self.moves)
+        }
+    
+    @classmethod
+    def from_journal(cls, data, downtime=0.0):
+        """
+        Recrée une partie journalisée. Les joueurs n'ont pas encore de SID :
+        ils sont rattachés quand ils rejoignent la partie (GameRegistry.rebind).
+        
+        Args:
+            data: dict de Game.to_journal, coups compris
+            downtime: Durée de l'interruption (s), rendue au camp au trait
+            
+        Returns:
+            Game
+        """
+        game = cls(None, None, data['white'][0], data['black'][0], data['starting_fen'],
+                   time_control=data['time_control'], player1_name=data['white'][1],
+                   player2_name=data['black'][1], player1_color=chess.WHITE,
+                   game_id=data['game_id'], started_at=data['started_at'])
+        board = game.board
+        for code in data['moves']:
+            board.push(decode_move(code))
+            game.moves.append(code)
+        # Hashs de répétition : seules comptent les positions depuis le dernier coup irréversible
+        tail = [board.pop() for _ in range(min(board.halfmove_clock, len(game.moves)))]
+        game._repetitions = array('Q', [chess.polyglot.zobrist_hash(board)])
+        for move in reversed(tail):
+            board.push(move)
+            game._repetitions.append(chess.polyglot.zobrist_hash(board))
+        board.clear_stack()
+        game.white_time = data['white_time']
+        game.black_time = data['black_time']
+        game.last_move_time = data['last_move_time'] + timedelta(seconds=downtime)
+        return game
+    
     @property
     def fen(self):
         """Retourne la position FEN actuelle."""
         return self.board.fen()
+    
+    @property
+    def players(self):
+        """
+        Joueurs indexés par SID, au format {sid: {'color', 'user_id', 'username'}}.
+        Reconstruit à chaque appel : ne pas modifier.
+        """
+        return {
+            self.white_sid: {'color': chess.WHITE, 'user_id': self.white_user_id, 'username': self.white_username},
+            self.black_sid: {'color': chess.BLACK, 'user_id': self.black_user_id, 'username': self.black_username},
+        }
+    
+    @property
+    def moves_history(self):
+        """Liste des coups en notation UCI (décodée à la demande)."""
+        return [decode_move(code).uci() for code in self.moves]
+    
+    def fen_history(self):
+        """
+        Positions successives de la partie, rejouées depuis la position de départ.
+        
+        Returns:
+            Liste de FEN (position de départ comprise)
+        """
+        board = chess.Board(self.starting_fen)
+        history = [board.fen()]
+        for code in self.moves:
+            board.push(decode_move(code))
+            history.append(board.fen())
+        return history
 
     def get_player_color(self, sid):
         """
@@ -94,10 +385,10 @@ class Game:
         Returns:
             'white' ou 'black'
         """
-        player_data = self.players.get(sid)
-        if player_data:
-            return 'white' if player_data['color'] == chess.WHITE else 'black'
-        return None
+        color = self.get_player_color_enum(sid)
+        if color is None:
+            return None
+        return 'white' if color == chess.WHITE else 'black'
     
     def get_player_color_enum(self, sid):
         """
@@ -109,8 +400,13 @@ class Game:
         Returns:
             chess.WHITE ou chess.BLACK
         """
-        player_data = self.players.get(sid)
-        return player_data['color'] if player_data else None
+        if sid is None:
+            return None
+        if sid == self.white_sid:
+            return chess.WHITE
+        if sid == self.black_sid:
+            return chess.BLACK
+        return None
         
     def get_opponent_id(self, sid):
         """
@@ -122,10 +418,7 @@ class Game:
         Returns:
             Session ID de l'adversaire ou None
         """
-        for player_sid in self.players.keys():
-            if player_sid != sid:
-                return player_sid
-        return None
+        return self.black_sid if sid == self.white_sid else self.white_sid
     
     def get_player_info(self, sid):
         """
@@ -137,7 +430,12 @@ class Game:
         Returns:
             Dictionnaire avec les infos du joueur
         """
-        return self.players.get(sid)
+        color = self.get_player_color_enum(sid)
+        if color is None:
+            return None
+        if color == chess.WHITE:
+            return {'color': chess.WHITE, 'user_id': self.white_user_id, 'username': self.white_username}
+        return {'color': chess.BLACK, 'user_id': self.black_user_id, 'username': self.black_username}
     
     def get_game_info(self):
         """
@@ -146,23 +444,104 @@ class Game:
         Returns:
             Dictionnaire avec toutes les infos de la partie
         """
-        players_info = {}
-        for sid, data in self.players.items():
-            color_name = 'white' if data['color'] == chess.WHITE else 'black'
-            players_info[color_name] = {
-                'username': data['username'],
-                'user_id': data['user_id']
-            }
-        
         return {
             'game_id': self.game_id,
             'fen': self.fen,
-            'players': players_info,
+            'players': {
+                'white': {'username': self.white_username, 'user_id': self.white_user_id},
+                'black': {'username': self.black_username, 'user_id': self.black_user_id},
+            },
             'turn': 'white' if self.board.turn == chess.WHITE else 'black',
-            'moves_count': len(self.moves_history),
+            'moves_count': len(self.moves),
             'started_at': self.started_at.isoformat()
         }
 
+    def time_left(self, color, now=None):
+        """
+        Temps restant d'un camp, décompte du coup en cours compris.
+        
+        Args:
+            color: chess.WHITE ou chess.BLACK
+            now: Instant de référence (défaut: maintenant)
+            
+        Returns:
+            Secondes restantes (négatives si le drapeau est tombé)
+        """
+        remaining = self.white_time if color == chess.WHITE else self.black_time
+        if color == self.board.turn:
+            remaining -= ((now or datetime.now()) - self.last_move_time).total_seconds()
+        return remaining
+    
+    def flag_result(self, now=None):
+        """
+        Vérifie la pendule du camp au trait.
+        
+        Returns:
+            Tuple (résultat, vainqueur) si son drapeau est tombé, sinon None.
+            La partie est nulle si l'adversaire ne peut plus mater.
+        """
+        color = self.board.turn
+        if self.time_left(color, now) > 0:
+            return None
+        if self.board.has_insufficient_material(not color):
+            return 'draw', None
+        if color == chess.WHITE:
+            return 'black_win', self.black_username
+        return 'white_win', self.white_username
+    
+    def end(self, result):
+        """
+        Termine la partie et l'enregistre, une seule fois même si plusieurs
+        fins arrivent en même temps (coup joué et chute du drapeau).
+        
+        Args:
+            result: 'white_win', 'black_win', 'draw' ou 'abandoned'
+            
+        Returns:
+            True si cet appel a terminé la partie, False si elle l'était déjà
+        """
+        with _end_lock:
+            if self.result is not None:
+                return False
+            self.result = result
+        self.save_to_database(result)
+        return True
+
+    def _push(self, move):
+        """Joue un coup légal sans garder la pile de coups de l'échiquier."""
+        self.board.push(move)
+        self.board.clear_stack()
+        key = chess.polyglot.zobrist_hash(self.board)
+        if self.board.halfmove_clock == 0:
+            # Prise ou coup de pion : aucune position antérieure ne peut se répéter
+            self._repetitions = array('Q', [key])
+        else:
+            self._repetitions.append(key)
+        self.moves.append(encode_move(move))
+
+    def _can_claim_threefold_repetition(self):
+        """
+        Équivalent de Board.can_claim_threefold_repetition, l'échiquier
+        n'ayant pas de pile de coups : la position actuelle est apparue trois
+        fois, ou un coup légal mène à une position déjà vue deux fois.
+        """
+        counts = Counter(self._repetitions)
+        if counts[self._repetitions[-1]] >= 3:
+            return True
+        if max(counts.values()) < 2:
+            # Aucune position vue deux fois : aucun coup ne peut mener à une triple répétition
+            return False
+        board = self.board
+        for move in board.generate_legal_moves():
+            board.push(move)
+            try:
+                key = chess.polyglot.zobrist_hash(board)
+            finally:
+                board.pop()
+            if counts[key] >= 2:
+                return True
+        return False
+
     def make_move(self, player_sid, uci_move):
         """
         Tente de faire un mouvement.
@@ -177,16 +556,34 @@ class Game:
         Raises:
             ValueError: Si le mouvement est illégal ou ce n'est pas son tour.
         """
-        player_data = self.players.get(player_sid)
+        player_data = self.get_player_info(player_sid)
         
         if not player_data:
             raise ValueError("Vous n'êtes pas dans cette partie.")
         
+        if self.result is not None:
+            raise ValueError("La partie est terminée.")
+        
         player_color = player_data['color']
 
         # Vérifie si c'est le tour du joueur
         if player_color != self.board.turn:
             raise ValueError("Ce n'est pas votre tour de jouer.")
+        
+        # Drapeau tombé avant le coup : le coup n'est pas joué
+        now = datetime.now()
+        flagged = self.flag_result(now)
+        if flagged:
+            result, winner = flagged
+            self.end(result)
+            return self.board.fen(), 'timeout', {
+                'white_time': max(0.0, self.time_left(chess.WHITE, now)),
+                'black_time': max(0.0, self.time_left(chess.BLACK, now)),
+                'moves_count': len(self.moves),
+                'last_move': None,
+                'result': result,
+                'winner': winner
+            }
 
         try:
             # Créer l'objet mouvement à partir de la chaîne UCI
@@ -197,29 +594,18 @@ class Game:
                 raise ValueError("Mouvement illégal.")
 
             # Effectuer le mouvement
-            self.board.push(move)
+            self._push(move)
             
-            # Mise à jour du temps
-            now = datetime.now()
+            # Mise à jour du temps (le drapeau a été vérifié avant le coup)
             elapsed = (now - self.last_move_time).total_seconds()
 
             if player_color == chess.WHITE:
-                self.white_time -= elapsed
-                self.white_time += self.increment
-                if self.white_time <= 0:
-                    status = 'timeout'
-                    result = 'black_win'
-                    winner = self.get_player_info(self.get_opponent_id(player_sid))['username']
+                self.white_time += self.increment - elapsed
             else:
-                self.black_time -= elapsed
-                self.black_time += self.increment
-                if self.black_time <= 0:
-                    status = 'timeout'
-                    result = 'white_win'
-                    winner = self.get_player_info(self.get_opponent_id(player_sid))['username']
+                self.black_time += self.increment - elapsed
 
             self.last_move_time = now
-            self.moves_history.append(uci_move)
+            journal.move(self.game_id, self.moves[-1], self.white_time, self.black_time, now)
             
             # Déterminer le statut de la partie
             status = 'running'
@@ -244,7 +630,7 @@ class Game:
                 status = 'draw_50_moves'
                 result = 'draw'
                 
-            elif self.board.can_claim_threefold_repetition():
+            elif self._can_claim_threefold_repetition():
                 status = 'draw_repetition'
                 result = 'draw'
                 
@@ -253,12 +639,12 @@ class Game:
             
             # Si la partie est terminée, sauvegarder dans la base de données
             if result:
-                self.save_to_database(result)
+                self.end(result)
             
             return self.board.fen(), status, {
                 'white_time': self.white_time,
                 'black_time': self.black_time,
-                'moves_count': len(self.moves_history),
+                'moves_count': len(self.moves),
                 'last_move': uci_move,
                 'result': result,
                 'winner': winner
@@ -271,57 +657,44 @@ class Game:
             # Capturer les erreurs de format UCI ou autres exceptions
             raise ValueError(f"Erreur de mouvement: {str(e)}")
     
+    def to_record(self, result):
+        """
+        Ligne de game_history pour la partie terminée.
+        
+        L'identifiant de la partie sert de clé : une partie enregistrée deux
+        fois est refusée par la base au lieu d'être comptée deux fois.
+        
+        Args:
+            result: Résultat de la partie ('white_win', 'black_win', 'draw', 'abandoned')
+            
+        Returns:
+            dict des colonnes de game_history
+        """
+        ended_at = datetime.now()
+        return {
+            'id': self.game_id,
+            'white_player_id': self.white_user_id,
+            'black_player_id': self.black_user_id,
+            'starting_fen': self.starting_fen,
+            'final_fen': self.board.fen(),
+            'moves': ' '.join(self.moves_history),
+            'result': result,
+            'started_at': self.started_at,
+            'ended_at': ended_at,
+            'duration_seconds': (ended_at - self.started_at).seconds
+        }
+    
     def save_to_database(self, result):
         """
-        Sauvegarde la partie dans la base de données et met à jour les statistiques.
+        Met la partie en file d'enregistrement (historique et statistiques
+        des joueurs, écrits par lots en arrière-plan : voir persistence_queue).
         
         Args:
             result: Résultat de la partie ('white_win', 'black_win', 'draw', 'abandoned')
         """
         try:
-            from .db_models import GameHistory, User, db
-            
-            # Identifier les joueurs blancs et noirs
-            white_player_id = None
-            black_player_id = None
-            
-            for sid, data in self.players.items():
-                if data['color'] == chess.WHITE:
-                    white_player_id = data['user_id']
-                else:
-                    black_player_id = data['user_id']
-            
-            # Créer l'entrée d'historique
-            game_history = GameHistory(
-                white_player_id=white_player_id,
-                black_player_id=black_player_id,
-                starting_fen=self.starting_fen,
-                final_fen=self.board.fen(),
-                moves=' '.join(self.moves_history),
-                result=result,
-                ended_at=datetime.now(),
-                duration_seconds=(datetime.now() - self.started_at).seconds
-            )
-            
-            db.session.add(game_history)
-            
-            # Mettre à jour les statistiques des joueurs
-            white_player = User.query.get(white_player_id)
-            black_player = User.query.get(black_player_id)
-            
-            if white_player:
-                white_player.games_played += 1
-                if result == 'white_win':
-                    white_player.games_won += 1
-            
-            if black_player:
-                black_player.games_played += 1
-                if result == 'black_win':
-                    black_player.games_won += 1
-            
-            db.session.commit()
-            print(f"Partie {self.game_id} sauvegardée. Résultat: {result}")
-            
+            persistence_queue.put(self.to_record(result))
+            print(f"Partie {self.game_id} terminée, enregistrement en file. Résultat: {result}")
         except Exception as e:
             print(f"Erreur lors de la sauvegarde de la partie: {e}")
             # Ne pas lever l'exception pour ne pas bloquer le flux de jeu
@@ -398,16 +771,14 @@ class MatchmakingManager:
             
             print(f"Match trouvé: {player1_data['username']} vs {player2_data['username']}")
             
-            # Générer une position avec le générateur FEN
+            # Position pré-générée par le réservoir (génération en direct si vide)
             try:
-                from .chess_generator import generate_fen_position
+                from .position_reservoir import reservoir, MATCHMAKING_PARAMS
+                from .engine_scheduler import MATCHMAKING
                 
-                # Génération rapide avec moins de tentatives pour le matchmaking
-                fen_result = generate_fen_position(
-                    target_min=25,
-                    target_max=100,
-                    max_attempts=5000  # Moins d'attempts pour ne pas faire attendre
-                )
+                # Moins d'attempts en direct pour ne pas faire attendre
+                fen_result = reservoir.take(MATCHMAKING_PARAMS, live_attempts=5000,
+                                           priority=MATCHMAKING, client='matchmaking')
                 fen_start = fen_result.get('fen', chess.STARTING_FEN)
                 
             except Exception as e:
@@ -421,10 +792,18 @@ class MatchmakingManager:
                 player2_sid,
                 player1_data['user_id'],
                 player2_data['user_id'],
-                fen_start
+                fen_start,
+                player1_name=player1_data['username'],
+                player2_name=player2_data['username']
             )
             
-            games[game.game_id] = game
+            # Joindre les joueurs à la "salle" SocketIO pour la partie
+            join_room(game.game_id, sid=player1_sid)
+            join_room(game.game_id, sid=player2_sid)
+            
+            games.add(game)
+            clocks.watch(game)
+            journal.create(game)
             
             return game.game_id
         
@@ -438,14 +817,16 @@ class MatchmakingManager:
         Args:
             game_id: ID de la partie à supprimer
         """
-        if game_id in games:
-            game = games[game_id]
+        clocks.unwatch(game_id)
+        game = games.remove(game_id)
+        if game is not None:
+            journal.end(game_id, game.result)
+            # Retirer les joueurs de la salle SocketIO (namespace explicite :
+            # aussi appelé hors requête, par les horloges)
+            for player_sid in (game.white_sid, game.black_sid):
+                if player_sid is not None:
+                    leave_room(game_id, sid=player_sid, namespace='/')
             
-            # Retirer les joueurs de la salle SocketIO
-            for player_sid in game.players.keys():
-                leave_room(game_id, sid=player_sid)
-            
-            del games[game_id]
             print(f"Partie {game_id} supprimée de la mémoire.")
 
     @staticmethod
@@ -459,10 +840,7 @@ class MatchmakingManager:
         Returns:
             game_id (str) ou None si le joueur n'est dans aucune partie
         """
-        for game_id, game in games.items():
-            if sid in game.players:
-                return game_id
-        return None
+        return games.game_id_for_sid(sid)
     
     @staticmethod
     def handle_player_disconnect(sid, game_id):
@@ -487,7 +865,7 @@ class MatchmakingManager:
             else:
                 result = 'white_win'
             
-            game.save_to_database('abandoned')
+            game.end('abandoned')
             print(f"Partie {game_id} terminée par abandon de {disconnected_player['username']}")
         
         # Supprimer la partie
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Moteur UCI de substitution pour les benchmarks.
+
+Ne cherche rien : l'évaluation d'une position est un hash déterministe de
+sa FEN (placement, trait, roques, prise en passant), la ligne k étant
+décalée de (k - 1) * STANDIN_LINE_STEP centipions. Chaque recherche dure
+STANDIN_LATENCY_MS millisecondes. Les résultats sont donc identiques d'une
+exécution à l'autre et le temps moteur est maîtrisé.
+
+Variables d'environnement :
+    STANDIN_LATENCY_MS  Durée d'une recherche (défaut: 20)
+    STANDIN_SPREAD_CP   Évaluations tirées dans [-spread, +spread] (défaut: 200)
+    STANDIN_LINE_STEP   Écart entre deux lignes multipv (défaut: 7)
+
+Utilisation :
+    STOCKFISH_PATH=backend/standin_engine.py python -m backend.benchmark_generator
+"""
+import hashlib
+import os
+import sys
+import time
+
+import chess
+
+LATENCY = float(os.environ.get('STANDIN_LATENCY_MS', 20)) / 1000.0
+SPREAD = int(os.environ.get('STANDIN_SPREAD_CP', 200))
+LINE_STEP = int(os.environ.get('STANDIN_LINE_STEP', 7))
+
+
+def evaluation(board):
+    """Évaluation (centipions, point de vue du camp au trait) dérivée de la FEN."""
+    key = ' '.join(board.fen().split(' ')[:4]).encode('ascii')
+    digest = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+    return digest % (2 * SPREAD + 1) - SPREAD
+
+
+def send(line):
+    sys.stdout.write(line + '\n')
+    sys.stdout.flush()
+
+
+def main():
+    board = chess.Board()
+    multipv = 1
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+        if command == 'uci':
+            send('id name Standin 1.0')
+            send('id author benchmark')
+            send('option name MultiPV type spin default 1 min 1 max 500')
+            send('option name Threads type spin default 1 min 1 max 512')
+            send('option name Hash type spin default 16 min 1 max 33554432')
+            send('uciok')
+        elif command == 'isready':
+            send('readyok')
+        elif command == 'setoption' and 'name' in tokens and 'value' in tokens:
+            name = ' '.join(tokens[tokens.index('name') + 1:tokens.index('value')])
+            if name == 'MultiPV':
+                multipv = max(1, int(tokens[-1]))
+        elif command == 'position':
+            moves = tokens.index('moves') if 'moves' in tokens else len(tokens)
+            if tokens[1] == 'fen':
+                board = chess.Board(' '.join(tokens[2:moves]))
+            else:
+                board = chess.Board()
+            for move in tokens[moves + 1:]:
+                board.push_uci(move)
+        elif command == 'go':
+            time.sleep(LATENCY)
+            score = evaluation(board)
+            legal = sorted(board.legal_moves, key=lambda m: m.uci())
+            elapsed = int(LATENCY * 1000)
+            for k in range(1, min(multipv, max(1, len(legal))) + 1):
+                pv = legal[k - 1].uci() if legal else ''
+                send(f'info depth 20 seldepth 20 multipv {k} score cp {score - LINE_STEP * (k - 1)} '
+                     f'nodes 1000 time {elapsed} pv {pv}')
+            send(f"bestmove {legal[0].uci() if legal else '(none)'}")
+        elif command == 'quit':
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Évaluateur statique rapide, utilisé comme pré-filtre avant Stockfish.
+
+Il combine matériel, tables pièce-case, gain par échange (SEE) sur les
+pièces en prise et proximité de la promotion des pions passés. Il ne vise
+pas la précision : il sert à écarter, avant tout appel moteur, les
+candidats dont l'évaluation est de toute évidence hors fenêtre (dame en
+prise, pion qui va à dame...). Une marge de confiance règle le compromis
+entre appels moteur économisés et faux rejets.
+
+Mesure contre Stockfish :
+    python -m backend.static_eval --samples 300 --margins 100,200,300,400
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import chess
+import chess.engine
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 20000,
+}
+
+# Tables pièce-case (point de vue des Blancs, a1 = index 0)
+_PST_RANKS = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    chess.ROOK: [
+        0, 0, 0, 5, 5, 0, 0, 0,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    chess.KING: [
+        20, 30, 10, 0, 0, 10, 30, 20,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+    ],
+}
+
+# Valeur matériel + position, indexée par [couleur][type][case]
+_PIECE_SQUARE = {
+    color: {
+        pt: [PIECE_VALUES[pt] + _PST_RANKS[pt][sq if color else chess.square_mirror(sq)] for sq in chess.SQUARES]
+        for pt in chess.PIECE_TYPES
+    }
+    for color in chess.COLORS
+}
+
+# Bonus d'un pion passé selon sa rangée relative (0 = 1re rangée)
+PASSED_PAWN_BONUS = [0, 5, 10, 20, 35, 60, 100, 0]
+
+# Pion passé imparable (règle du carré) ou promotion immédiate : presque une dame
+PROMOTION_BONUS = PIECE_VALUES[chess.QUEEN] - PIECE_VALUES[chess.PAWN] - 100
+
+_FRONT_SPANS = {}
+for _color in chess.COLORS:
+    for _sq in chess.SQUARES:
+        _file, _rank = chess.square_file(_sq), chess.square_rank(_sq)
+        _ranks = range(_rank + 1, 8) if _color else range(0, _rank)
+        _mask = 0
+        for _r in _ranks:
+            for _f in (_file - 1, _file, _file + 1):
+                if 0 <= _f < 8:
+                    _mask |= chess.BB_SQUARES[chess.square(_f, _r)]
+        _FRONT_SPANS[_color, _sq] = _mask
+
+
+def _attackers(board, color, square, occupied):
+    """Attaquants de `color` sur `square` pour une occupation donnée (rayons X inclus)."""
+    rooks_queens = board.rooks | board.queens
+    bishops_queens = board.bishops | board.queens
+    attackers = (
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights)
+        | (chess.BB_KING_ATTACKS[square] & board.kings)
+        | (chess.BB_PAWN_ATTACKS[not color][square] & board.pawns)
+        | (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & rooks_queens)
+        | (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & rooks_queens)
+        | (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & bishops_queens)
+    )
+    return attackers & board.occupied_co[color] & occupied
+
+
+def _least_valuable(board, attackers):
+    for piece_type in chess.PIECE_TYPES:
+        candidates = attackers & (board.pieces_mask(piece_type, chess.WHITE)
+                                  | board.pieces_mask(piece_type, chess.BLACK))
+        if candidates:
+            return chess.lsb(candidates), piece_type
+    return None, None
+
+
+def see(board, square, color):
+    """
+    Gain matériel (centipions) de la meilleure suite d'échanges sur `square`
+    initiée par `color` (Static Exchange Evaluation, algorithme du swap).
+
+    Returns:
+        int: Gain pour `color` (0 si aucune capture n'est rentable ou possible)
+    """
+    target = board.piece_type_at(square)
+    if target is None:
+        return 0
+    occupied = board.occupied
+    side = color
+    attacker_square, attacker_type = _least_valuable(board, _attackers(board, side, square, occupied))
+    if attacker_square is None:
+        return 0
+
+    gains = [PIECE_VALUES[target]]
+    while attacker_square is not None:
+        gains.append(PIECE_VALUES[attacker_type] - gains[-1])
+        occupied &= ~chess.BB_SQUARES[attacker_square]
+        side = not side
+        attacker_square, attacker_type = _least_valuable(board, _attackers(board, side, square, occupied))
+        if attacker_type == chess.KING and _attackers(board, not side, square, occupied):
+            break  # Le roi ne peut pas reprendre sur une case défendue
+    # La dernière entrée suppose une reprise qui n'existe pas : elle est ignorée
+    for depth in range(len(gains) - 2, 0, -1):
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+    return max(gains[0], 0)
+
+
+def _capture_gains(board, color):
+    """
+    Gains (décroissants, > 0) des coups forcés disponibles pour `color` :
+    captures évaluées par SEE et promotion d'un pion sur une case libre non
+    contrôlée par l'adversaire.
+    """
+    gains = []
+    for square in chess.scan_forward(board.occupied_co[not color] & ~board.kings):
+        if _attackers(board, color, square, board.occupied):
+            gain = see(board, square, color)
+            if gain > 0:
+                gains.append(gain)
+    seventh = chess.BB_RANK_7 if color else chess.BB_RANK_2
+    for square in chess.scan_forward(board.pieces_mask(chess.PAWN, color) & seventh):
+        promotion = square + 8 if color else square - 8
+        if not board.occupied & chess.BB_SQUARES[promotion] and not board.is_attacked_by(not color, promotion):
+            gains.append(PROMOTION_BONUS)
+            break
+    return sorted(gains, reverse=True)
+
+
+def _passed_pawns(board, color):
+    """Bonus des pions passés de `color` (rangée et règle du carré)."""
+    enemy_pawns = board.pieces_mask(chess.PAWN, not color)
+    enemy_king = board.king(not color)
+    enemy_has_pieces = bool(board.occupied_co[not color] & ~board.pawns & ~board.kings)
+    to_move = board.turn == color
+    bonus = 0
+    for square in chess.scan_forward(board.pieces_mask(chess.PAWN, color)):
+        if _FRONT_SPANS[color, square] & enemy_pawns:
+            continue
+        rank = chess.square_rank(square) if color else 7 - chess.square_rank(square)
+        bonus += PASSED_PAWN_BONUS[rank]
+
+        # Règle du carré : le roi adverse ne rattrape pas le pion (la promotion
+        # immédiate est comptée avec les prises, voir _capture_gains)
+        if rank == 6 or enemy_has_pieces or enemy_king is None:
+            continue
+        promotion = chess.square(chess.square_file(square), 7 if color else 0)
+        if (chess.between(square, promotion) | chess.BB_SQUARES[promotion]) & board.occupied:
+            continue
+        king_distance = chess.square_distance(enemy_king, promotion) - (0 if to_move else 1)
+        if king_distance > 7 - rank:
+            bonus += PROMOTION_BONUS
+    return bonus
+
+
+def static_evaluation(board):
+    """
+    Évaluation statique en centipions, du point de vue des Blancs (comme format_score).
+
+    Args:
+        board: Position (chess.Board), roi au trait supposé hors échec
+
+    Returns:
+        int
+    """
+    score = 0
+    for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+        tables = _PIECE_SQUARE[color]
+        for piece_type in chess.PIECE_TYPES:
+            if piece_type == chess.KING:
+                continue
+            table = tables[piece_type]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                score += sign * table[square]
+        king = board.king(color)
+        if king is not None:
+            score += sign * _PST_RANKS[chess.KING][king if color else chess.square_mirror(king)]
+        score += sign * _passed_pawns(board, color)
+
+    # Un coup d'avance : le camp au trait encaisse sa meilleure prise (puis subit
+    # la menace adverse) ou pare la plus grosse menace (et perd la suivante)
+    own_gains = _capture_gains(board, board.turn)
+    threats = _capture_gains(board, not board.turn)
+    take = (own_gains[0] if own_gains else 0) - (threats[0] if threats else 0)
+    parry = -(threats[1] if len(threats) > 1 else 0)
+    tempo = max(take, parry)
+    return score + (tempo if board.turn == chess.WHITE else -tempo)
+
+
+def is_plausible(board, windows, margin):
+    """
+    Indique si une position peut raisonnablement tomber dans la fenêtre.
+
+    Args:
+        board: Position candidate
+        windows: (negative_min, negative_max, positive_min, positive_max)
+        margin: Marge de confiance en centipions
+
+    Returns:
+        Tuple (plausible, évaluation statique)
+    """
+    negative_min, _, _, positive_max = windows
+    cp = static_evaluation(board)
+    return negative_min - margin <= cp <= positive_max + margin, cp
+
+
+def calibrate(samples, margins, params=None, seed=0):
+    """
+    Compare le pré-filtre à Stockfish sur des candidats réels.
+
+    Pour chaque marge : part des appels moteur économisés et taux de faux
+    rejets (candidats écartés alors que Stockfish les place dans la fenêtre).
+
+    Args:
+        samples: Nombre de candidats évalués par Stockfish
+        margins: Marges à comparer (centipions)
+        params: Paramètres de génération (défaut: ceux de l'API)
+        seed: Graine du tirage des candidats
+
+    Returns:
+        list de dicts, un par marge
+    """
+    import numpy as np
+    from backend.chess_generator import (CACHE_DEEP_MIN_DEPTH, analyse_cached, engine_pool,
+                                         generate_candidate_batch, is_in_eval_window, search_limit)
+
+    params = params or {}
+    windows = (params.get('negative_min', -99), params.get('negative_max', -15),
+               params.get('positive_min', 15), params.get('positive_max', 99))
+    rng = np.random.default_rng(seed)
+
+    labelled = []
+    static_seconds = 0.0
+    limit = search_limit()
+    with engine_pool.engine() as pooled:
+        while len(labelled) < samples:
+            candidates, _ = generate_candidate_batch(params.get('max_material', 22), params.get('material_diff', 3),
+                                                     params.get('excluded_pieces', []), 512, rng)
+            for _, board, _, _, _ in candidates[:samples - len(labelled)]:
+                started = time.perf_counter()
+                static_cp = static_evaluation(board)
+                static_seconds += time.perf_counter() - started
+                engine_cp, _ = analyse_cached(pooled, board, limit, 1, CACHE_DEEP_MIN_DEPTH)
+                labelled.append((static_cp, is_in_eval_window(engine_cp[0], *windows)))
+
+    in_window = sum(1 for _, ok in labelled if ok)
+    print(f"📊 {len(labelled)} candidats, {in_window} dans la fenêtre selon Stockfish (ligne 1), "
+          f"{1e6 * static_seconds / len(labelled):.0f} µs par évaluation statique")
+    results = []
+    for margin in margins:
+        rejected = [ok for cp, ok in labelled
+                    if not windows[0] - margin <= cp <= windows[3] + margin]
+        false_rejections = sum(rejected)
+        results.append({
+            'margin': margin,
+            'engine_calls_saved': round(len(rejected) / len(labelled), 4),
+            'false_rejection_rate': round(false_rejections / in_window, 4) if in_window else 0.0,
+        })
+        print(f"   marge {margin:>4} cp : {len(rejected) / len(labelled):6.1%} d'appels moteur économisés, "
+              f"{false_rejections}/{in_window} bonnes positions écartées")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure du pré-filtre statique contre Stockfish")
+    parser.add_argument('--samples', type=int, default=300, help="Candidats évalués par Stockfish")
+    parser.add_argument('--margins', default='100,200,300,400,600', help="Marges à comparer (cp)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    calibrate(args.samples, [int(m) for m in args.margins.split(',')], seed=args.seed)
+
+
+if __name__ == '__main__':
+    sys.path.append(str(Path(__file__).parent.parent))
+    main()
@@ -0,0 +1,107 @@
+"""
+Symétries des positions générées.
+
+Les positions générées n'ont ni droits de roque ni prise en passant : le
+miroir gauche-droite (colonnes a <-> h) conserve exactement l'évaluation, et
+l'inversion des couleurs (échiquier retourné, camps et trait échangés) la
+change exactement de signe. Chaque position acceptée par le moteur donne
+donc jusqu'à trois positions supplémentaires sans nouvel appel au moteur.
+"""
+import chess
+
+from backend.position_index import parse_eval
+
+# Transformations appliquées à une position (nom -> (fonction, évaluation inversée))
+SYMMETRIES = {
+    'mirror_files': (lambda board: board.transform(chess.flip_horizontal), False),
+    'flip_colors': (lambda board: board.mirror(), True),
+    'flip_colors_mirror_files': (lambda board: board.mirror().transform(chess.flip_horizontal), True),
+}
+
+
+def has_symmetries(board):
+    """Les symétries ne sont exactes que sans droits de roque ni prise en passant."""
+    return not board.castling_rights and board.ep_square is None
+
+
+def symmetric_boards(board):
+    """
+    Formes symétriques d'une position (la position elle-même en premier).
+
+    Returns:
+        Liste de tuples (nom de la transformation ou None, chess.Board)
+    """
+    boards = [(None, board)]
+    if has_symmetries(board):
+        boards.extend((name, transform(board)) for name, (transform, _) in SYMMETRIES.items())
+    return boards
+
+
+def negate_score(text):
+    """'+0.53' -> '-0.53', 'Mat en 3' -> 'Mat en -3' (format de format_score)."""
+    text = str(text).strip()
+    if text.startswith('Mat'):
+        return f"Mat en {-int(text.split()[-1])}"
+    try:
+        return f"{-float(text):+.2f}"
+    except ValueError:
+        return text
+
+
+def symmetric_variants(position, windows=None):
+    """
+    Positions équivalentes à une position évaluée, sans appel au moteur.
+
+    Les variantes identiques à la position d'origine (ou entre elles) sont
+    écartées. Avec `windows`, une variante dont l'évaluation inversée sort des
+    fenêtres est également écartée.
+
+    Args:
+        position: dict de position (format de generate_fen_position)
+        windows: (negative_min, negative_max, positive_min, positive_max) ou None
+
+    Returns:
+        Liste de dicts de positions, marquées par 'augmented_from' et 'symmetry'
+    """
+    board = chess.Board(position['fen'])
+    if not has_symmetries(board):
+        return []
+
+    seen = {board.board_fen() + (' w' if board.turn else ' b')}
+    variants = []
+    for name, variant_board in symmetric_boards(board)[1:]:
+        key = variant_board.board_fen() + (' w' if variant_board.turn else ' b')
+        if key in seen or not variant_board.is_valid():
+            continue
+        seen.add(key)
+
+        negate = SYMMETRIES[name][1]
+        evals = [position['eval_line1'], position['eval_line2']]
+        if negate:
+            evals = [negate_score(e) for e in evals]
+        if windows is not None and not all(_in_windows(parse_eval(e), windows) for e in evals):
+            continue
+
+        white_mat, black_mat = position['white_material'], position['black_material']
+        if negate:
+            white_mat, black_mat = black_mat, white_mat
+        variants.append({
+            'fen': variant_board.fen(),
+            'white_material': white_mat,
+            'black_material': black_mat,
+            'material_difference': position['material_difference'],
+            'turn': 'Blanc' if variant_board.turn else 'Noir',
+            'eval_line1': evals[0],
+            'eval_line2': evals[1],
+            'attempts': 0,
+            'engine_evaluations': 0,
+            'time_seconds': 0.0,
+            'augmented_from': position['fen'],
+            'symmetry': name,
+        })
+    return variants
+
+
+def _in_windows(cp, windows):
+    negative_min, negative_max, positive_min, positive_max = windows
+    return negative_min <= cp <= negative_max or positive_min <= cp <= positive_max
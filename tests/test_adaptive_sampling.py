@@ -0,0 +1,52 @@
+"""Échantillonnage adaptatif des compositions."""
+import numpy as np
+
+from backend.adaptive_sampling import SamplingStats, composition_key, sampling_bucket
+from backend.compositions import composition_table
+
+WINDOWS = (-99, -15, 15, 99)
+
+
+def _train(stats, bucket, table, productive):
+    for i, entry in enumerate(table.entries[:40]):
+        for _ in range(10):
+            stats.record(bucket, composition_key(entry), accepted=(i == productive))
+
+
+def test_no_bias_before_min_evaluations():
+    table = composition_table(22, 3)
+    stats = SamplingStats(min_evaluations=1000)
+    bucket = sampling_bucket(WINDOWS, 22, 3, [])
+    _train(stats, bucket, table, productive=5)
+    assert stats.weights(bucket, table) is None
+    assert stats.report(bucket, table) is None
+
+
+def test_weights_favour_productive_compositions_with_an_exploration_floor():
+    table = composition_table(22, 3)
+    stats = SamplingStats(exploration=0.2, min_evaluations=100)
+    bucket = sampling_bucket(WINDOWS, 22, 3, [])
+    _train(stats, bucket, table, productive=5)
+    weights = stats.weights(bucket, table)
+    default = table.default_weights() / table.default_weights().sum()
+    assert np.isclose(weights.sum(), 1.0)
+    assert weights[5] > 5 * default[5]
+    assert np.all(weights >= 0.2 * default - 1e-12)
+
+
+def test_report_expects_fewer_engine_calls():
+    table = composition_table(22, 3)
+    stats = SamplingStats(min_evaluations=100)
+    bucket = sampling_bucket(WINDOWS, 22, 3, [])
+    _train(stats, bucket, table, productive=5)
+    report = stats.report(bucket, table)
+    assert report['engine_evaluations'] == 400 and report['accepted'] == 10
+    assert report['expected_calls_per_accept_adaptive'] < report['expected_calls_per_accept_default']
+
+
+def test_persistence(tmp_path):
+    path = tmp_path / 'sampling_stats.json'
+    stats = SamplingStats(path)
+    stats.record('bucket', 'composition', True)
+    stats.save()
+    assert SamplingStats(path).stats()['buckets']['bucket']['accepted'] == 1
@@ -0,0 +1,89 @@
+"""Roue de temporisation des pendules."""
+import pytest
+
+from backend.clock_scheduler import FLAG, IDLE, ClockScheduler, TimerWheel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run(wheel, until, step):
+    """Avance la roue pas à pas ; retourne {clé: instant où elle est servie}."""
+    fired = {}
+    t = wheel.clock()
+    while t < until:
+        t += step
+        for key in wheel.advance(t):
+            fired[key] = t
+    return fired
+
+
+def test_deadlines_fire_on_time_across_levels():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=0.05, clock=clock)
+    # Délais couvrant les niveaux 0 à 3 (64, 64², 64³ crans)
+    delays = [0.02, 1.0, 3.3, 200.0, 3000.0, 14000.0]
+    for i, delay in enumerate(delays):
+        wheel.schedule(i, clock.now + delay)
+    fired = _run(wheel, clock.now + 14001, 0.5)
+    assert set(fired) == set(range(len(delays)))
+    for i, delay in enumerate(delays):
+        deadline = 1000.0 + delay
+        # Jamais en avance, au plus un tick (et un pas d'avance de la boucle) en retard
+        assert deadline <= fired[i] < deadline + 0.05 + 0.5
+    assert len(wheel) == 0
+
+
+def test_reschedule_and_cancel():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=0.05, clock=clock)
+    wheel.schedule('a', clock.now + 1)
+    wheel.schedule('b', clock.now + 1)
+    wheel.schedule('a', clock.now + 100)
+    wheel.cancel('b')
+    assert wheel.advance(clock.now + 2) == []
+    assert 'a' in wheel and 'b' not in wheel
+    assert wheel.advance(clock.now + 100.1) == ['a']
+
+
+def test_past_deadline_fires_on_next_tick():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=0.05, clock=clock)
+    wheel.schedule('late', clock.now - 5)
+    assert wheel.advance(clock.now) == ['late']
+
+
+def test_invalid_tick():
+    with pytest.raises(ValueError):
+        TimerWheel(tick=0)
+
+
+class FakeGame:
+    game_id = 'g1'
+
+    class board:
+        turn = True
+
+    def time_left(self, color):
+        return 2.0
+
+
+def test_scheduler_dispatches_by_kind():
+    clock = FakeClock()
+    scheduler = ClockScheduler(tick=0.05, idle_timeout=10, clock=clock)
+    fired = []
+    scheduler.on(FLAG, lambda game_id: fired.append((FLAG, game_id)))
+    scheduler.on(IDLE, lambda game_id: fired.append((IDLE, game_id)))
+    scheduler.watch(FakeGame())
+    assert scheduler.fire_due(clock.now + 1) == 0
+    scheduler.fire_due(clock.now + 2.1)
+    assert fired == [(FLAG, 'g1')]
+    scheduler.fire_due(clock.now + 10.1)
+    assert fired == [(FLAG, 'g1'), (IDLE, 'g1')]
+    scheduler.unwatch('g1')
+    assert scheduler.stats()['scheduled'] == 0
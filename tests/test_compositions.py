@@ -0,0 +1,58 @@
+"""Table des compositions et échantillonneur vectorisé."""
+import chess
+import numpy as np
+import pytest
+
+from backend.candidate_sampler import generate_candidate_batch
+from backend.compositions import MATERIAL_VALUES, MIN_WEAK_MATERIAL, composition_table, material_bounds
+
+
+def _differences(table):
+    return set((table.strong_material - table.weak_material).tolist())
+
+
+def test_material_bounds():
+    assert material_bounds(22, 3) == (19, 22, 3, 5, MIN_WEAK_MATERIAL)
+    assert material_bounds(30, 5) == (19, 22, 5, 6, MIN_WEAK_MATERIAL)
+
+
+def test_material_bounds_equal_material():
+    strong_min, strong_max, diff_min, diff_max, _ = material_bounds(22, 0)
+    assert (diff_min, diff_max) == (0, 0)
+
+
+@pytest.mark.parametrize('material_diff, expected', [(0, {0}), (1, {1, 2, 3}), (5, {5, 6})])
+def test_table_differences(material_diff, expected):
+    assert _differences(composition_table(22, material_diff)) == expected
+
+
+def test_table_entries_match_their_material():
+    table = composition_table(20, 2, ['queen'])
+    for strong, weak, strong_mat, weak_mat in table.entries:
+        assert sum(MATERIAL_VALUES[p] for p in strong) == strong_mat
+        assert sum(MATERIAL_VALUES[p] for p in weak) == weak_mat
+        assert chess.QUEEN not in strong + weak
+        assert 17 <= strong_mat <= 20 and weak_mat >= MIN_WEAK_MATERIAL
+
+
+def test_impossible_parameters():
+    with pytest.raises(ValueError):
+        composition_table(10, 6)
+
+
+def test_candidate_batch_is_legal():
+    candidates, n_legal = generate_candidate_batch(22, 3, [], 512, np.random.default_rng(0))
+    assert n_legal == len(candidates) > 0
+    for fen, board, white_mat, black_mat, _ in candidates:
+        assert board.is_valid()
+        assert board.fen() == fen
+        values = [sum(MATERIAL_VALUES[pt] * len(board.pieces(pt, color)) for pt in MATERIAL_VALUES)
+                  for color in (chess.WHITE, chess.BLACK)]
+        assert values == [white_mat, black_mat]
+        assert 3 <= abs(white_mat - black_mat) <= 5
+
+
+def test_candidate_batch_is_seeded():
+    first, _ = generate_candidate_batch(22, 3, [], 256, np.random.default_rng(7))
+    second, _ = generate_candidate_batch(22, 3, [], 256, np.random.default_rng(7))
+    assert [c[0] for c in first] == [c[0] for c in second]
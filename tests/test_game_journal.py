@@ -0,0 +1,65 @@
+"""Journal des parties en cours."""
+from backend.game_journal import EVENTS_FILE, GameJournal, read_state, truncate_torn_tail
+
+
+def _journal(directory):
+    journal = GameJournal(directory)
+    journal.recover()
+    return journal
+
+
+def test_events_survive_a_restart(tmp_path):
+    journal = _journal(tmp_path)
+    journal.challenge('c1', {'from': 1, 'to': 2})
+    journal.challenge('c2', {'from': 3, 'to': 4})
+    journal.challenge_end('c2')
+    assert journal.flush() == 3
+    state, replayed, corrupt = read_state(tmp_path)
+    assert state.challenges == {'c1': {'from': 1, 'to': 2}}
+    assert (replayed, corrupt) == (3, 0)
+
+
+def test_snapshot_then_events(tmp_path):
+    journal = _journal(tmp_path)
+    journal.challenge('c1', {'from': 1})
+    journal.flush()
+    journal.snapshot()
+    journal.challenge('c2', {'from': 2})
+    journal.close()
+    restarted = GameJournal(tmp_path).recover()
+    assert set(restarted.challenges) == {'c1', 'c2'}
+
+
+def test_truncate_torn_tail(tmp_path):
+    path = tmp_path / EVENTS_FILE
+    assert truncate_torn_tail(path) == 0
+    path.write_bytes(b'[1,"clock",0]\n[2,"chal')
+    assert truncate_torn_tail(path) == len(b'[2,"chal')
+    assert path.read_bytes() == b'[1,"clock",0]\n'
+    assert truncate_torn_tail(path) == 0
+
+
+def test_recover_after_a_torn_write(tmp_path):
+    journal = _journal(tmp_path)
+    journal.challenge('c1', {'from': 1})
+    journal.flush()
+    journal._file.close()
+    # Arrêt pendant l'écriture d'un événement
+    with open(tmp_path / EVENTS_FILE, 'a', encoding='utf-8') as f:
+        f.write('[2,"challenge",0,"c')
+
+    journal = _journal(tmp_path)
+    journal.challenge('c2', {'from': 2})
+    journal.flush()
+    journal._file.close()
+
+    state, _, corrupt = read_state(tmp_path)
+    assert set(state.challenges) == {'c1', 'c2'}
+    assert corrupt == 0
+
+
+def test_disabled_journal_is_a_no_op(tmp_path):
+    journal = GameJournal(None)
+    assert journal.recover() is None
+    journal.challenge('c1', {})
+    assert journal.flush() == 0
@@ -0,0 +1,60 @@
+"""Index des doublons et hash canonique."""
+import chess
+import numpy as np
+
+from backend.position_dedup import DedupIndex, canonical_board, dedupe_positions, position_hash
+from backend.symmetry import symmetric_boards
+
+FEN = '4k3/8/3q4/8/8/2N5/1R6/4K3 w - - 0 20'
+
+
+def test_symmetric_forms_share_the_canonical_hash():
+    board = chess.Board(FEN)
+    hashes = {position_hash(form) for _, form in symmetric_boards(board)}
+    assert len(hashes) == 1
+    assert position_hash(board, symmetric=False) != position_hash(board.mirror(), symmetric=False)
+
+
+def test_canonical_board_is_one_of_the_forms():
+    board = chess.Board(FEN)
+    forms = [form.fen() for _, form in symmetric_boards(board)]
+    assert canonical_board(board).fen() in forms
+
+
+def test_counters_are_ignored():
+    assert position_hash(chess.Board(FEN)) == position_hash(chess.Board(FEN.replace('0 20', '3 41')))
+
+
+def test_add_and_contains():
+    index = DedupIndex(merge_threshold=2)
+    assert index.add(FEN)
+    assert not index.add(chess.Board(FEN).mirror())
+    assert index.contains(chess.Board(FEN).transform(chess.flip_horizontal))
+    assert not index.contains(chess.STARTING_FEN)
+    assert index.add(chess.STARTING_FEN)
+    # Fusion dans le tableau trié au-delà de merge_threshold
+    assert len(index) == 2 and index.stats()['positions'] == 2
+
+
+def test_exact_index_keeps_symmetric_forms():
+    index = DedupIndex(symmetric=False)
+    assert index.add(FEN)
+    assert index.add(chess.Board(FEN).mirror())
+    assert not index.add(FEN)
+
+
+def test_add_hashes_counts_duplicates():
+    index = DedupIndex()
+    index.add(FEN)
+    keys = np.array([position_hash(chess.Board(FEN)), 1, 1, 2], dtype=np.uint64)
+    # Un déjà connu, un doublon dans le lot
+    assert index.add_hashes(keys) == 2
+    assert len(index) == 3
+
+
+def test_dedupe_positions():
+    positions = [{'fen': FEN}, {'fen': chess.Board(FEN).mirror().fen()}, {'fen': FEN}]
+    kept, duplicates = dedupe_positions(positions)
+    assert (len(kept), duplicates) == (1, 2)
+    kept, duplicates = dedupe_positions(positions, symmetric=False)
+    assert (len(kept), duplicates) == (2, 1)
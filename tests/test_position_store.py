@@ -0,0 +1,68 @@
+"""Format binaire de la bibliothèque et index de tirage."""
+import random
+from collections import Counter
+
+import chess
+import pytest
+
+from backend.position_dedup import position_hash
+from backend.position_index import PositionIndex
+from backend.position_store import PositionStore, decode_eval, encode_eval, read_positions, write_store
+from backend.symmetry import symmetric_variants
+
+POSITIONS = [
+    {
+        'fen': '4k3/8/3q4/8/8/2N5/1R6/4K3 w - - 0 20',
+        'white_material': 8, 'black_material': 9, 'material_difference': 1, 'turn': 'Blanc',
+        'eval_line1': '+0.42', 'eval_line2': '+0.31', 'attempts': 321, 'engine_evaluations': 12,
+        'time_seconds': 4.5,
+    },
+    {
+        'fen': '8/5k2/8/3r4/8/8/2BN4/6K1 b - - 3 41',
+        'white_material': 6, 'black_material': 5, 'material_difference': 1, 'turn': 'Noir',
+        'eval_line1': 'Mat en -3', 'eval_line2': '-0.80', 'attempts': 7, 'time_seconds': 0.2,
+        'seed': 42, 'strategy': 'playout',
+    },
+]
+
+
+@pytest.mark.parametrize('text', ['+0.42', '-0.80', '+0.00', 'Mat en 3', 'Mat en -12'])
+def test_eval_round_trip(text):
+    assert decode_eval(encode_eval(text)) == text
+
+
+def test_store_round_trip(tmp_path):
+    path = tmp_path / 'positions.bin'
+    write_store(path, POSITIONS)
+    store = read_positions(path)
+    assert isinstance(store, PositionStore)
+    assert list(store) == POSITIONS
+    assert store[-1] == POSITIONS[-1]
+    assert store.columns()['position_hash'].tolist() == [position_hash(chess.Board(p['fen'])) for p in POSITIONS]
+
+
+def test_invalid_store(tmp_path):
+    path = tmp_path / 'positions.bin'
+    path.write_bytes(b'CHESSPOS' + b'\0' * 8)
+    with pytest.raises(ValueError):
+        PositionStore(path)
+
+
+def test_index_filters():
+    index = PositionIndex(POSITIONS)
+    assert index.random_position(turn=True)['fen'] == POSITIONS[0]['fen']
+    assert index.random_position(exclude_pieces=['queen'])['fen'] == POSITIONS[1]['fen']
+    assert index.random_position(eval_min=100) is None
+
+
+def test_index_draws_once_per_canonical_form(tmp_path):
+    # Première position + ses 3 variantes : même poids que la seconde position
+    library = POSITIONS + symmetric_variants(POSITIONS[0])
+    write_store(tmp_path / 'positions.bin', library)
+    for positions in (library, read_positions(tmp_path / 'positions.bin')):
+        index = PositionIndex(positions)
+        assert index.has_variants
+        rng = random.Random(0)
+        draws = Counter(position_hash(chess.Board(index.random_position(rng)['fen'])) for _ in range(4000))
+        assert len(draws) == 2
+        assert abs(draws.most_common()[0][1] - 2000) < 200
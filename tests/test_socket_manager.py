@@ -0,0 +1,20 @@
+"""Codage compact des coups."""
+import chess
+import pytest
+
+from backend.socket_manager import decode_move, encode_move
+
+
+@pytest.mark.parametrize('uci', ['e2e4', 'g1f3', 'e1g1', 'a7a8q', 'b2a1n', 'h7h8r', 'c7c8b'])
+def test_move_round_trip(uci):
+    move = chess.Move.from_uci(uci)
+    code = encode_move(move)
+    assert 0 <= code < 1 << 16
+    assert decode_move(code) == move
+
+
+def test_every_legal_move_of_a_game_round_trips():
+    board = chess.Board('r3k2r/pPppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+    codes = [encode_move(move) for move in board.legal_moves]
+    assert len(set(codes)) == len(codes)
+    assert [decode_move(code) for code in codes] == list(board.legal_moves)
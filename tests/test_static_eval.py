@@ -0,0 +1,35 @@
+"""Pré-filtre statique."""
+import chess
+
+from backend.static_eval import is_plausible, see, static_evaluation
+
+WINDOWS = (-99, -15, 15, 99)
+
+
+def test_symmetric_evaluation():
+    board = chess.Board('4k3/8/3q4/8/8/2N5/1R6/4K3 w - - 0 20')
+    assert static_evaluation(board.mirror()) == -static_evaluation(board)
+
+
+def test_material_dominates():
+    assert static_evaluation(chess.Board('4k3/8/8/8/8/8/8/3QK3 w - - 0 1')) > 800
+    assert static_evaluation(chess.Board('3qk3/8/8/8/8/8/8/4K3 w - - 0 1')) < -800
+
+
+def test_hanging_queen_is_counted():
+    # Dame noire en prise du cavalier blanc, Blancs au trait
+    board = chess.Board('4k3/8/3q4/8/2N5/8/8/4K2R w - - 0 1')
+    assert see(board, chess.D6, chess.WHITE) > 0
+    plausible, cp = is_plausible(board, WINDOWS, 300)
+    assert not plausible and cp > 99 + 300
+
+
+def test_balanced_position_is_plausible():
+    board = chess.Board('r3k3/8/8/8/8/8/8/R3K3 w - - 0 1')
+    assert is_plausible(board, WINDOWS, 100)[0]
+
+
+def test_promotion_is_counted():
+    pushed = chess.Board('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1')
+    home = chess.Board('4k3/8/8/8/8/8/1P6/4K3 w - - 0 1')
+    assert static_evaluation(pushed) - static_evaluation(home) > 300
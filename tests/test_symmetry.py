@@ -0,0 +1,56 @@
+"""Augmentation par symétrie."""
+import chess
+
+from backend.symmetry import negate_score, symmetric_variants
+
+POSITION = {
+    'fen': '4k3/8/3q4/8/8/2N5/1R6/4K3 w - - 0 20',
+    'white_material': 8,
+    'black_material': 9,
+    'material_difference': 1,
+    'turn': 'Blanc',
+    'eval_line1': '+0.42',
+    'eval_line2': '+0.31',
+}
+
+
+def test_negate_score():
+    assert negate_score('+0.42') == '-0.42'
+    assert negate_score('-1.05') == '+1.05'
+    assert negate_score('Mat en 3') == 'Mat en -3'
+
+
+def test_variants():
+    variants = {v['symmetry']: v for v in symmetric_variants(POSITION)}
+    assert set(variants) == {'mirror_files', 'flip_colors', 'flip_colors_mirror_files'}
+
+    mirrored = variants['mirror_files']
+    assert (mirrored['eval_line1'], mirrored['eval_line2']) == ('+0.42', '+0.31')
+    assert (mirrored['white_material'], mirrored['black_material']) == (8, 9)
+    assert mirrored['fen'] == chess.Board(POSITION['fen']).transform(chess.flip_horizontal).fen()
+
+    flipped = variants['flip_colors']
+    assert (flipped['eval_line1'], flipped['eval_line2']) == ('-0.42', '-0.31')
+    assert (flipped['white_material'], flipped['black_material']) == (9, 8)
+    assert flipped['turn'] == 'Noir'
+    for variant in variants.values():
+        assert variant['augmented_from'] == POSITION['fen']
+        assert variant['engine_evaluations'] == 0
+
+
+def test_variants_outside_the_windows_are_dropped():
+    variants = symmetric_variants(POSITION, windows=(-99, -15, 15, 99))
+    assert len(variants) == 3
+    variants = symmetric_variants(POSITION, windows=(-99, -50, 15, 99))
+    assert {v['symmetry'] for v in variants} == {'mirror_files'}
+
+
+def test_no_variants_with_castling_rights():
+    position = dict(POSITION, fen='r3k3/8/3q4/8/8/2N5/1R6/4K3 b q - 0 20')
+    assert symmetric_variants(position) == []
+
+
+def test_variants_are_distinct_and_legal():
+    fens = [POSITION['fen']] + [v['fen'] for v in symmetric_variants(POSITION)]
+    assert len(set(fens)) == 4
+    assert all(chess.Board(fen).is_valid() for fen in fens)